@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# import_time.py
+#
+# Benchmark of the startup time of the pencil package.
+#
+"""
+Measure the time a fresh python process needs for 'import pencil' followed
+by a typical first access, here pencil.read.ts, and fail if the median time
+exceeds the startup budget.
+
+call signature:
+
+python import_time.py [--budget SECONDS] [--repeat N] [--statement STATEMENT]
+
+The heavy dependencies (scipy, matplotlib, h5py, pidly) must not be
+imported by the statement; the script fails if any of them is.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['scipy', 'matplotlib', 'h5py', 'pidly']
+
+CODE = '''
+import sys, time
+t0 = time.perf_counter()
+import pencil
+{statement}
+t1 = time.perf_counter()
+heavy = [m for m in {heavy!r} if m in sys.modules]
+sys.stderr.write('{{0}} {{1}}\\n'.format(t1 - t0, ','.join(heavy)))
+'''
+
+
+def measure(statement, repeat):
+    """
+    Run statement after 'import pencil' in repeat fresh processes.
+    Return the sorted times and the heavy modules imported.
+    """
+
+    env = dict(os.environ)
+    package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.abspath(package_dir)] +
+        [path for path in [env.get('PYTHONPATH')] if path])
+    code = CODE.format(statement=statement, heavy=HEAVY_MODULES)
+
+    times = []
+    heavy = set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], env=env,
+                                stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        line = result.stderr.strip().splitlines()[-1].split(' ')
+        times.append(float(line[0]))
+        if len(line) > 1 and line[1]:
+            heavy.update(line[1].split(','))
+    return sorted(times), sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--budget', type=float, default=0.25,
+                        help='maximum median startup time in seconds')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='number of processes to time')
+    parser.add_argument('--statement', default='pencil.read.ts',
+                        help='statement executed after importing pencil')
+    args = parser.parse_args()
+
+    times, heavy = measure(args.statement, args.repeat)
+    median = times[len(times)//2]
+    print('import pencil; {0}: median {1:.3f} s, min {2:.3f} s, '
+          'max {3:.3f} s ({4} runs), budget {5:.3f} s'.format(
+              args.statement, median, times[0], times[-1], len(times),
+              args.budget))
+
+    failed = False
+    if median > args.budget:
+        print('FAILED: startup time exceeds the budget.')
+        failed = True
+    if heavy:
+        print('FAILED: heavy modules imported: ' + ', '.join(heavy))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,26 +9,43 @@ print("To change your scripts accordingly:")
 print("import pencilnew as pc -> import pencil as pc")
 print("import pencil as pc -> import pencil_old as pc")
 
-try:
-    import h5py
-#except ImportError:
-except:
-    print("Error: You need to install h5py library doing 'pip3 install h5py' (Python 3) \
-           or 'pip install h5py' (Python 2).")
-    import h5py
-
-# Load sub-modules.
-from . import io           # input und output functions, like save data or call IDL scripts
-from . import diag         # diagnostic scripts and functions
-from . import visu         # visualization routines
-from . import calc         # math functions and further calculations
-from . import math         # basic math functions, like products and derivatives
-from . import sim          # handling simulations as python objects
-from . import read         # read data and parameters from pencil code directory
-from . import tool_kit     # all nice workarounds get stored here (e.g., resubmit script)
-from . import export       # exporter (e.g., vtk, xml)
-from . import backpack     # third party modules, tribute to the author!
-from . import ism_dyn      # diagnostics for ism dynamo simulations
+# Sub-modules, imported on first access (PEP 562), so that e.g. pencil.read.ts
+# does not import the visualization routines and their dependencies.
+__submodules__ = [
+    'io',           # input und output functions, like save data or call IDL scripts
+    'diag',         # diagnostic scripts and functions
+    'visu',         # visualization routines
+    'calc',         # math functions and further calculations
+    'math',         # basic math functions, like products and derivatives
+    'sim',          # handling simulations as python objects
+    'read',         # read data and parameters from pencil code directory
+    'tool_kit',     # all nice workarounds get stored here (e.g., resubmit script)
+    'export',       # exporter (e.g., vtk, xml)
+    'backpack',     # third party modules, tribute to the author!
+    'ism_dyn',      # diagnostics for ism dynamo simulations
+    ]
+
+
+def __getattr__(name):
+    """
+    Import the sub-module name on first access.
+    """
+
+    if name in __submodules__:
+        import importlib
+
+        module = importlib.import_module('.' + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
+
+def __dir__():
+    """
+    List the sub-modules also before they are imported.
+    """
+
+    return sorted(set(globals()) | set(__submodules__))
 
 
 # Internal routines.
@@ -37,6 +54,8 @@ def __is_sim_dir__(path='.'):
     Check if a path is pointing at a pencil code simulation.
     """
 
+    from . import sim
+
     return sim.is_sim_dir(path)
 
 
@@ -50,6 +69,8 @@ def get_sim(path='.', quiet=True):
         quiet:  Switches out the output of the function. Default: False.
     """
 
+    from . import sim
+
     return sim.get(path, quiet=quiet)
 
 
@@ -67,6 +88,8 @@ def get_sims(path_root='.', depth=1, unhide_all=False, quiet=True):
         quiet:      Switches out the output of the function. Default: True.
     """
 
+    from . import sim
+
     return sim.get_sims(path_root=path_root, depth=depth, unhide_all=unhide_all, quiet=quiet)
 
 
@@ -90,6 +90,8 @@ class Tracers(object):
             magic.append('bb')
             magic.append('jj')
         dim = read.dim(datadir=datadir)
+        grid = read.grid(datadir=datadir, quiet=True, trim=True)
+        param2 = read.param(datadir=datadir, quiet=True)
         self.params.var_file = var_file
 
         # Check if user wants a tracer time series.
@@ -130,8 +132,6 @@ class Tracers(object):
             # Read the data.
             var = read.var(var_file=var_file, datadir=datadir, magic=magic,
                            quiet=True, trimall=True)
-            grid = read.grid(datadir=datadir, quiet=True, trim=True)
-            param2 = read.param(datadir=datadir, quiet=True)
             self.t[t_idx] = var.t
 
             # Extract the requested vector trace_field.
@@ -111,18 +111,21 @@ def var2vtk(var_file='var.dat', datadir='data', proc=-1,
             magic.append('bb')
 
 
-    for t_idx in range(ti, tf+1):
-        if animation:
-            var_file = 'VAR' + str(t_idx)
-
-        # Read the PencilCode variables and set the dimensions.
-        var = read.var(var_file=var_file, datadir=datadir, proc=proc,
-                       magic=magic, trimall=True, quiet=quiet)
+    # Read the PencilCode variables, the next snapshot is read while
+    # the current one is written.
+    if animation:
+        series = read.var_series(datadir=datadir, ivars=range(ti, tf+1),
+                                 proc=proc, magic=magic, trimall=True,
+                                 quiet=quiet)
+    else:
+        series = [read.var(var_file=var_file, datadir=datadir, proc=proc,
+                           magic=magic, trimall=True, quiet=quiet)]
 
-        grid = read.grid(datadir=datadir, proc=proc, trim=trimall, quiet=True)
+    grid = read.grid(datadir=datadir, proc=proc, trim=trimall, quiet=True)
 
-        params = read.param(quiet=True)
+    params = read.param(quiet=True)
 
+    for t_idx, var in zip(range(ti, tf+1), series):
         # Add external magnetic field.
         if (b_ext == True):
             B_ext = np.array(params.b_ext)
@@ -215,6 +218,7 @@ def slices2vtk(field='', extension='', datadir='data', destination='slices', pro
         Processor which should be read. Set to -1 for all processors.
     """
 
+    import os
     import sys
     import numpy as np
     from .. import read
@@ -227,6 +231,25 @@ def slices2vtk(field='', extension='', datadir='data', destination='slices', pro
         if (len(extension[0]) == 1):
             extension = [extension]
 
+    # Find the existing fields and extensions.
+    if (len(field) == 0) or (len(extension) == 0):
+        if os.path.exists(os.path.join(datadir, 'grid.h5')):
+            names = [file_name[:-3].split('_', 1) for file_name in
+                     os.listdir(os.path.join(datadir, 'slices'))
+                     if file_name[-3:] == '.h5']
+        else:
+            if proc < 0:
+                slice_dir = datadir
+            else:
+                slice_dir = os.path.join(datadir, 'proc{0}'.format(proc))
+            names = [file_name[6:].split('.', 1) for file_name in
+                     os.listdir(slice_dir) if file_name[:6] == 'slice_' and
+                     file_name[6:15] != 'position.']
+        if len(field) == 0:
+            field = sorted(set(name[0] for name in names))
+        if len(extension) == 0:
+            extension = sorted(set(name[1] for name in names))
+
     # Read the grid dimensions.
     grid = read.grid(datadir=datadir, proc=proc, trim=True, quiet=True)
 
@@ -236,9 +259,6 @@ def slices2vtk(field='', extension='', datadir='data', destination='slices', pro
     # Read the user given parameters for the slice positions.
     params = read.param(quiet=True)
 
-    # Read the slice file for all specified variables and extensions.
-    slices = read.slices(field=field, extension=extension, datadir=datadir, proc=proc)
-
     # Determine the position of the slices.
     if params.ix != -1:
         x0 = grid.x[params.ix]
@@ -257,8 +277,12 @@ def slices2vtk(field='', extension='', datadir='data', destination='slices', pro
     elif params.slice_position == 'm':
         z02 = grid.z[int(len(grid.z)/2)]
 
-    for t_idx, t in enumerate(slices.t):
-        for ext in extension:
+    # Stream the frames of all fields of an extension together, so that
+    # only one frame per field is held in memory.
+    for ext in extension:
+        frames = zip(*[read.slices_iter(fi, ext, datadir=datadir, proc=proc)
+                       for fi in field])
+        for t_idx, planes in enumerate(frames):
             # Open the destination file for writing.
             fd = open(destination + '_' + ext + '_' + str(t_idx) + '.vtk', 'wb')
 
@@ -294,15 +318,14 @@ def slices2vtk(field='', extension='', datadir='data', destination='slices', pro
             fd.write('POINT_DATA {0:9}\n'.format(dim_p*dim_q).encode('utf-8'))
 
             # Write the data.
-            for fi in field:
-                data = getattr(getattr(slices, ext), fi)
+            for fi, (t, data) in zip(field, planes):
                 fd.write(('SCALARS ' + ext + '_' + fi + ' float\n').encode('utf-8'))
                 fd.write('LOOKUP_TABLE default\n'.encode('utf-8'))
                 if sys.byteorder == 'little':
                     data = data.astype(np.float32).byteswap()
                 else:
                     data = data.astype(np.float32)
-                fd.write(data[t_idx].tobytes())
+                fd.write(data.tobytes())
 
             fd.close()
 
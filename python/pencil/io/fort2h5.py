@@ -441,7 +441,8 @@ def aver2h5(newdir, olddir,
             todatadir='data/averages', fromdatadir='data', l2D=True,
             precision='d', quiet=True, lremove_old_averages=False,
             aver_by_proc=False,
-            laver2D=False, l_mpi=False, driver=None, comm=None, rank=0, size=1):
+            laver2D=False, l_mpi=False, driver=None, comm=None, rank=0, size=1,
+            layout='groups'):
 
     """
     Copy a simulation set of video slices written in Fortran binary to hdf5.
@@ -452,7 +453,8 @@ def aver2h5(newdir, olddir,
             todatadir='data/averages', fromdatadir='data', l2D=True,
             precision='d', quiet=True, lremove_old_averages=False,
             aver_by_proc=False,
-            laver2D=False, l_mpi=False, driver=None, comm=None, rank=0, size=1):
+            laver2D=False, l_mpi=False, driver=None, comm=None, rank=0, size=1,
+            layout='groups'):
 
     Keyword arguments:
 
@@ -503,6 +505,10 @@ def aver2h5(newdir, olddir,
 
     *size*:
       Number of MPI processes
+
+    *layout*:
+      Layout of the hdf5 averages, 'groups' or 'contiguous'
+      (see write_h5_averages).
     """
 
     import os
@@ -546,7 +552,8 @@ def aver2h5(newdir, olddir,
                                 nt=niter, precision=precision, append=True,
                                 aver_by_proc=True, nproc=nproc,
                                 proc=proc, dim=dim, procdim=procdim, quiet=quiet,
-                                driver=driver, comm=comm, rank=rank, size=size)
+                                driver=driver, comm=comm, rank=rank, size=size,
+                                layout=layout)
                     del(av)
                 else:
                     all_list = np.array_split(np.arange(niter), size)
@@ -560,7 +567,7 @@ def aver2h5(newdir, olddir,
                                       nt=niter, precision=precision,
                                       append=False, indx=iter_list, quiet=quiet,
                                       driver=driver, comm=comm, rank=rank,
-                                      size=size)
+                                      size=size, layout=layout)
                     del(av)
     else:
         #copy old 1D averages to new h5 sim
@@ -578,7 +585,7 @@ def aver2h5(newdir, olddir,
                         write_h5_averages(av, file_name=key, datadir=todatadir,
                                           precision=precision, quiet=quiet,
                                           driver=driver, comm=None, rank=None,
-                                          size=size)
+                                          size=size, layout=layout)
                 del(av)
             if lremove_old_averages:
                 os.chdir(olddir)
@@ -600,7 +607,8 @@ def aver2h5(newdir, olddir,
                         os.chdir(newdir)
                         write_h5_averages(av, file_name=key, datadir=todatadir,
                                           precision=precision, quiet=quiet,
-                                          driver=None, comm=None)
+                                          driver=None, comm=None,
+                                          layout=layout)
                     del(av)
     if lremove_old_averages:
         if l_mpi:
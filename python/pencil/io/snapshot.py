@@ -797,7 +797,7 @@ def write_h5_averages(aver, file_name='xy', datadir='data/averages', nt=None,
                       precision='d', indx=None, trange=None, quiet=True,
                       append=False, procdim=None, dim=None, aver_by_proc=False,
                       proc=-1, driver=None, comm=None, rank=0, size=1,
-                      overwrite=False, nproc=1):
+                      overwrite=False, nproc=1, layout='groups'):
     """
     Write an hdf5 format averages dataset given as an Averages object.
     We assume by default that a run simulation directory has already been
@@ -809,7 +809,8 @@ def write_h5_averages(aver, file_name='xy', datadir='data/averages', nt=None,
     call signature:
 
     write_h5_averages(aver, file_name='xy', datadir='data/averages',
-                   precision='d', indx=None, trange=None, quiet=True)
+                   precision='d', indx=None, trange=None, quiet=True,
+                   layout='groups')
 
     Keyword arguments:
 
@@ -838,6 +839,15 @@ def write_h5_averages(aver, file_name='xy', datadir='data/averages', nt=None,
 
     *dim*
       Dim object required if the large binary files are supplied in chunks.
+
+    *layout*
+      'groups': one group per time holding the time and the averages
+      ('0/time', '0/<var>', ...), as written by the Pencil Code.
+      'contiguous': one chunked and resizable dataset per variable with the
+      time as first axis ('<var>' of shape [nt, n1] or [nt, n1, n2]) and a
+      'time' dataset, so histories or time windows are read at once.
+      With append and no indx the times are appended to those in the file,
+      unless aver_by_proc is set.
     """
 
     import os
@@ -889,6 +899,13 @@ def write_h5_averages(aver, file_name='xy', datadir='data/averages', nt=None,
         nt = aver.t.shape[0]
     with open_h5(filename, state, driver=driver, comm=comm,
                  overwrite=overwrite, rank=rank) as ds:
+        if layout == 'contiguous' and append and not indx and \
+           not aver_by_proc and isinstance(ds.get('time'), h5py.Dataset):
+            # Append after the times already in the file. With
+            # aver_by_proc, append adds the slab of another processor.
+            n_old = ds['time'].shape[0]
+            indx = list(range(n_old, n_old + aver.t.shape[0]))
+            nt = indx[-1] + 1
         if indx:
             if isinstance(indx, list):
                 indx = indx
@@ -899,77 +916,84 @@ def write_h5_averages(aver, file_name='xy', datadir='data/averages', nt=None,
         if not quiet:
             print('rank', rank, 'nt', nt, 'indx', indx)
             sys.stdout.flush()
-        dataset_h5(ds, 'last', status=state, data=(nt-1,),
-                   dtype='i', overwrite=overwrite, rank=rank,
-                               comm=comm, size=size)
-        #if not ds.__contains__('last'):
-        #    try:
-        #        ds.create_dataset('last', data=(nt-1,), dtype='i')
-        #    except ValueError:
-        #        pass
-        for it in range(0,nt):
-            group_h5(ds, str(it), status=state, delete=False, 
-                            overwrite=overwrite, rank=rank, size=size)
-            #if not ds.__contains__(str(it)):
-            #    ds.create_group(str(it))
-        for it in range(0,nt):
-            dataset_h5(ds[str(it)], 'time', status=state, shape=(1,),
-                       dtype=precision, overwrite=overwrite, rank=rank,
+        if layout == 'contiguous':
+            if not aver_by_proc:
+                n1, n2, nn = None, None, None
+            _write_h5_averages_contiguous(ds, aver, file_name, nt, indx,
+                                          precision, aver_by_proc, proc,
+                                          n1, n2, nn, quiet=quiet, rank=rank)
+        else:
+            dataset_h5(ds, 'last', status=state, data=(nt-1,),
+                       dtype='i', overwrite=overwrite, rank=rank,
                                    comm=comm, size=size)
-            #if not ds[str(it)].__contains__('time'):
+            #if not ds.__contains__('last'):
             #    try:
-            #        ds[str(it)].create_dataset('time',
-            #                                   (1,),
-            #                                   dtype=precision)
+            #        ds.create_dataset('last', data=(nt-1,), dtype='i')
             #    except ValueError:
             #        pass
-        for key in aver.__getattribute__(file_name).__dict__.keys():
-            #if comm:
-            #    key = comm.bcast(key, root=0)
-            data=aver.__getattribute__(file_name).__getattribute__(key)
-            if (file_name == 'y' or file_name == 'z'):
-                data = np.swapaxes(data, 1, 2)
             for it in range(0,nt):
-                if aver_by_proc:
-                    dataset_h5(ds[str(it)], key, status=state, shape=(n1,n2),
-                       dtype=precision, overwrite=overwrite, rank=rank,
-                                   comm=comm, size=size)
-                else:
-                    dataset_h5(ds[str(it)], key, status=state, shape=data[0].shape,
-                       dtype=precision, overwrite=overwrite, rank=rank,
-                                   comm=comm, size=size)
-                #if not ds[str(it)].__contains__(key):
+                group_h5(ds, str(it), status=state, delete=False, 
+                                overwrite=overwrite, rank=rank, size=size)
+                #if not ds.__contains__(str(it)):
+                #    ds.create_group(str(it))
+            for it in range(0,nt):
+                dataset_h5(ds[str(it)], 'time', status=state, shape=(1,),
+                           dtype=precision, overwrite=overwrite, rank=rank,
+                                       comm=comm, size=size)
+                #if not ds[str(it)].__contains__('time'):
                 #    try:
-                #        if aver_by_proc:
-                #            ds[str(it)].create_dataset(key,
-                #                                       (n1,n2),
-                #                                       dtype=precision)
-                #        else:
-                #            ds[str(it)].create_dataset(key,
-                #                                       data[0].shape,
-                #                                       dtype=precision)
+                #        ds[str(it)].create_dataset('time',
+                #                                   (1,),
+                #                                   dtype=precision)
                 #    except ValueError:
                 #        pass
-        #if comm:
-        #    comm.Barrier()
-        for it in indx:
-            ds[str(it)]['time'][:] = aver.t[it-indx[0]]
-        for key in aver.__getattribute__(file_name).__dict__.keys():
-            #key needs to be broadcast as order of keys may vary on each process
-            #causing segmentation fault
+            for key in aver.__getattribute__(file_name).__dict__.keys():
+                #if comm:
+                #    key = comm.bcast(key, root=0)
+                data=aver.__getattribute__(file_name).__getattribute__(key)
+                if (file_name == 'y' or file_name == 'z'):
+                    data = np.swapaxes(data, 1, 2)
+                for it in range(0,nt):
+                    if aver_by_proc:
+                        dataset_h5(ds[str(it)], key, status=state, shape=(n1,n2),
+                           dtype=precision, overwrite=overwrite, rank=rank,
+                                       comm=comm, size=size)
+                    else:
+                        dataset_h5(ds[str(it)], key, status=state, shape=data[0].shape,
+                           dtype=precision, overwrite=overwrite, rank=rank,
+                                       comm=comm, size=size)
+                    #if not ds[str(it)].__contains__(key):
+                    #    try:
+                    #        if aver_by_proc:
+                    #            ds[str(it)].create_dataset(key,
+                    #                                       (n1,n2),
+                    #                                       dtype=precision)
+                    #        else:
+                    #            ds[str(it)].create_dataset(key,
+                    #                                       data[0].shape,
+                    #                                       dtype=precision)
+                    #    except ValueError:
+                    #        pass
             #if comm:
-            #    key = comm.bcast(key, root=0)
-            data = aver.__getattribute__(file_name).__getattribute__(key)
-            if (file_name == 'y' or file_name == 'z'):
-                data = np.swapaxes(data, 1, 2)
-            if not quiet:
-                print('writing', key, 'on rank', rank)
-                sys.stdout.flush()
+            #    comm.Barrier()
             for it in indx:
-                if aver_by_proc:
-                    ds[str(it)][key][proc*nn:(proc+1)*nn] = data[it-indx[0]]
-                else:
-                    ds[str(it)][key][:] = data[it-indx[0]]
+                ds[str(it)]['time'][:] = aver.t[it-indx[0]]
+            for key in aver.__getattribute__(file_name).__dict__.keys():
+                #key needs to be broadcast as order of keys may vary on each process
+                #causing segmentation fault
+                #if comm:
+                #    key = comm.bcast(key, root=0)
+                data = aver.__getattribute__(file_name).__getattribute__(key)
+                if (file_name == 'y' or file_name == 'z'):
+                    data = np.swapaxes(data, 1, 2)
+                if not quiet:
+                    print('writing', key, 'on rank', rank)
+                    sys.stdout.flush()
+                for it in indx:
+                    if aver_by_proc:
+                        ds[str(it)][key][proc*nn:(proc+1)*nn] = data[it-indx[0]]
+                    else:
+                        ds[str(it)][key][:] = data[it-indx[0]]
     if not quiet:
         print(filename+' written on rank {}'.format(rank))
         sys.stdout.flush()
@@ -1052,6 +1076,129 @@ def write_h5_averages(aver, file_name='xy', datadir='data/averages', nt=None,
     #    print(filename+' written on rank {}'.format(rank))
     #    sys.stdout.flush()
 
+def _write_h5_averages_contiguous(ds, aver, file_name, nt, indx, precision,
+                                  aver_by_proc=False, proc=-1, n1=None, n2=None,
+                                  nn=None, quiet=True, rank=0):
+    """
+    Write the averages for the times indx into one dataset per variable of
+    the open hdf5 file ds, resizing the datasets to nt times if required.
+    With aver_by_proc the [nn, n2] data of processor proc is written into
+    its part of the global [n1, n2] planes.
+    """
+
+    import numpy as np
+    import h5py
+
+    def chunks(shape):
+        # Chunks of about 1 MB holding whole planes.
+        n_plane = int(np.prod(shape))*np.dtype(precision).itemsize
+        return (int(max(1, min(nt, 2**20//max(n_plane, 1)))),) + shape
+
+    def require(name, shape):
+        if isinstance(ds.get(name), h5py.Dataset):
+            dset = ds[name]
+            if dset.shape[0] < nt:
+                dset.resize(nt, axis=0)
+        else:
+            dset = ds.create_dataset(name, shape=(nt,) + shape,
+                                     maxshape=(None,) + shape,
+                                     chunks=chunks(shape), dtype=precision)
+        return dset
+
+    indx = np.array(indx)
+    # Write contiguous times as one hyperslab.
+    if indx[-1] - indx[0] + 1 == indx.size:
+        selection = slice(indx[0], indx[-1] + 1)
+    else:
+        selection = list(indx)
+    local = indx - indx[0]
+
+    require('time', ())[selection] = aver.t[local]
+    for key in aver.__getattribute__(file_name).__dict__.keys():
+        data = aver.__getattribute__(file_name).__getattribute__(key)
+        if (file_name == 'y' or file_name == 'z'):
+            data = np.swapaxes(data, 1, 2)
+        if not quiet:
+            print('writing', key, 'on rank', rank)
+            sys.stdout.flush()
+        if aver_by_proc:
+            dset = require(key, (n1, n2))
+            dset[selection, proc*nn:(proc+1)*nn] = data[local]
+        else:
+            require(key, data.shape[1:])[selection] = data[local]
+
+
+def convert_h5_averages(file_name='xy', datadir='data/averages', quiet=True):
+    """
+    Convert an hdf5 averages file with one group per time ('0/time',
+    '0/<var>', ...), as written by the Pencil Code, into the contiguous
+    layout of write_h5_averages with one [nt, ...] dataset per variable
+    and a 'time' dataset. The file is replaced once the conversion is
+    complete.
+
+    call signature:
+
+    convert_h5_averages(file_name='xy', datadir='data/averages', quiet=True)
+
+    Keyword arguments:
+
+    *file_name*:
+      Name of the averages file, e.g. 'xy', 'xz', 'yz', 'y', 'z'.
+
+    *datadir*:
+      Directory where the averages are stored.
+
+    *quiet*
+      Option not to print output.
+    """
+
+    import os
+    from os.path import join
+    import numpy as np
+    import h5py
+
+    filename = join(datadir, file_name+'.h5')
+    with h5py.File(filename, 'r') as src:
+        if isinstance(src.get('time'), h5py.Dataset):
+            if not quiet:
+                print(filename+' has the contiguous layout already')
+                sys.stdout.flush()
+            return 0
+        nt = len([key for key in src.keys() if key.isdigit()])
+        if nt == 0:
+            print("ERROR: "+filename+" contains no averages")
+            sys.stdout.flush()
+            return -1
+        keys = [key for key in src['0'].keys() if key != 'time']
+        with h5py.File(filename+'.tmp', 'w') as dst:
+            dst.create_dataset('time', dtype=src['0/time'].dtype,
+                               data=[src[str(it)+'/time'][()].item()
+                                     for it in range(nt)],
+                               maxshape=(None,), chunks=True)
+            for key in keys:
+                if not quiet:
+                    print('converting', key)
+                    sys.stdout.flush()
+                shape = src['0/'+key].shape
+                dtype = src['0/'+key].dtype
+                # Blocks of about 1 MB holding whole planes.
+                n_block = max(1, min(nt, 2**20//max(int(np.prod(shape))*
+                                                   dtype.itemsize, 1)))
+                dset = dst.create_dataset(key, shape=(nt,)+shape,
+                                          maxshape=(None,)+shape,
+                                          chunks=(n_block,)+shape,
+                                          dtype=dtype)
+                for it in range(0, nt, n_block):
+                    dset[it:it+n_block] = np.stack(
+                        [src[str(jt)+'/'+key][()]
+                         for jt in range(it, min(it+n_block, nt))])
+    os.replace(filename+'.tmp', filename)
+    if not quiet:
+        print(filename+' converted')
+        sys.stdout.flush()
+    return 0
+
+
 def write_h5_slices(vslice, coordinates, positions, datadir='data/slices',
                    precision='d', indx=None, trange=None, quiet=True,
                    append=False, dim=None):
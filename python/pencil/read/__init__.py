@@ -12,11 +12,14 @@ from .pencil_record_types import record_types
 from .dim import dim
 from .param import param
 from .grid import grid
-from .var import var
-from .slices import slices
+from .var import var, var_series
+from .slices import slices, slices_iter
 from .averages import aver
 from .pvar import pvar
 from .phiaverages import phiaver
 
 # idl workarounds
 from .pstalk import pstalk
+
+# metadata cache
+from .metadata_cache import clear_cache
@@ -14,7 +14,9 @@ def aver(*args, **kwargs):
 
     call signature:
 
-    read(plane_list=['xy', 'xz', 'yz'], datadir='data', proc=-1):
+    read(plane_list=['xy', 'xz', 'yz'], datadir='data', proc=-1,
+         iter_list=None, tmin=None, tmax=None, cache=False, n_workers=1,
+         out=None):
 
     Keyword arguments:
 
@@ -25,6 +27,9 @@ def aver(*args, **kwargs):
    *iter_list*
      list of iteration indices for which to sample the slices
 
+    *tmin*, *tmax*:
+      Only read the times tmin <= t <= tmax.
+
    *var_index*:
      Index of single variable taken from among the 'y' or 'z' averages.
      Takes an integer value < len(yaver.in or zaver.in).
@@ -35,6 +40,22 @@ def aver(*args, **kwargs):
     *proc*:
       Processor to be read. If -1 read all and assemble to one array.
       Only affects the reading of 'yaverages.dat' and 'zaverages.dat'.
+
+    *cache*:
+      Keep a binary copy of the 'xy', 'xz' and 'yz' text averages next to
+      them (e.g. 'xyaverages.dat.npy'). Later reads only parse the lines
+      appended to the text files since.
+
+    *n_workers*:
+      Number of threads reading the processor files of the 'y' and 'z'
+      averages concurrently.
+
+    *out*:
+      Array of shape (nt, nvar, nx, nz) for 'y' or (nt, nvar, nx, ny) for
+      'z' averages to read the data into, e.g. the buffer of a previous
+      read. Ignored if its shape or type does not match, the type is
+      float64 if all processors are read and the precision of the run
+      otherwise.
     """
 
     averages_tmp = Averages()
@@ -58,13 +79,16 @@ class Averages(object):
 
 
     def read(self, plane_list=None, var_index=-1, datadir='data',
-             proc=-1, iter_list=None):
+             proc=-1, iter_list=None, tmin=None, tmax=None, cache=False,
+             n_workers=1, out=None):
         """
         Read Pencil Code average data.
 
         call signature:
 
-        read(plane_list=['xy', 'xz', 'yz'], datadir='data', proc=-1):
+        read(plane_list=['xy', 'xz', 'yz'], datadir='data', proc=-1,
+             iter_list=None, tmin=None, tmax=None, cache=False, n_workers=1,
+             out=None):
 
         Keyword arguments:
 
@@ -75,6 +99,12 @@ class Averages(object):
         *iter_list*
           list of iteration indices for which to sample the slices
 
+        *tmin*, *tmax*:
+          Only read the times tmin <= t <= tmax. For HDF5 averages written
+          with one dataset per variable (see
+          pencil.io.write_h5_averages) the selected times are read in a
+          single hyperslab.
+
         *var_index*:
           Index of variable from among within the 'y' or 'z' averages.
           Takes an integer value < len(yaver.in or zaver.in).
@@ -85,6 +115,22 @@ class Averages(object):
         *proc*:
           Processor to be read. If -1 read all and assemble to one array.
           Only affects the reading of 'yaverages.dat' and 'zaverages.dat'.
+
+        *cache*:
+          Keep a binary copy of the 'xy', 'xz' and 'yz' text averages next
+          to them (e.g. 'xyaverages.dat.npy'). Later reads only parse the
+          lines appended to the text files since.
+
+        *n_workers*:
+          Number of threads reading the processor files of the 'y' and 'z'
+          averages concurrently.
+
+        *out*:
+          Array of shape (nt, nvar, nx, nz) for 'y' or (nt, nvar, nx, ny)
+          for 'z' averages to read the data into, e.g. the buffer of a
+          previous read. Ignored if its shape or type does not match, the
+          type is float64 if all processors are read and the precision of
+          the run otherwise.
         """
 
         import os
@@ -175,11 +221,15 @@ class Averages(object):
 
             if plane == 'xy' or plane == 'xz' or plane == 'yz':
                 t, raw_data = self.__read_2d_aver(plane, datadir, variables,
-                                                  aver_file_name, n_vars, l_h5=l_h5)
+                                                  aver_file_name, n_vars,
+                                                  iter_list, tmin, tmax,
+                                                  l_h5=l_h5, cache=cache)
             if plane == 'y' or plane == 'z':
                 t, raw_data = self.__read_1d_aver(plane, datadir, variables,
                                                   aver_file_name, n_vars,
-                                                  var_index, iter_list, proc, l_h5=l_h5)
+                                                  var_index, iter_list, proc, l_h5=l_h5,
+                                                  tmin=tmin, tmax=tmax,
+                                                  n_workers=n_workers, out=out)
 
             # Add the raw data to self.
             var_idx = 0
@@ -208,7 +258,8 @@ class Averages(object):
 
 
     def __read_1d_aver(self, plane, datadir, variables, aver_file_name,
-                       n_vars, var_index, iter_list, proc, l_h5=False):
+                       n_vars, var_index, iter_list, proc, l_h5=False,
+                       tmin=None, tmax=None, n_workers=1, out=None):
         """
         Read the yaverages.dat, zaverages.dat.
         Return the raw data and the time array.
@@ -216,32 +267,20 @@ class Averages(object):
 
         import os
         import numpy as np
-        from scipy.io import FortranFile
+        from concurrent.futures import ThreadPoolExecutor
         from .. import read
 
         # Read the data
         if l_h5:
-            import h5py
             file_id = os.path.join(datadir, aver_file_name)
             print(file_id)
             sys.stdout.flush()
-            with h5py.File(file_id, 'r') as tmp:
-                n_times = len(tmp.keys()) - 1
-                # Determine the structure of the xy/xz/yz averages.
-                for var in variables:
-                    nu = tmp[str(0) + '/' + var.strip()].shape[0]
-                    nv = tmp[str(0) + '/' + var.strip()].shape[1]
-                    break
-            raw_data = np.zeros([n_times, n_vars, nv, nu])
-            t = np.zeros(n_times, dtype=np.float32)
-            with h5py.File(file_id, 'r') as tmp:
-                for t_idx in range(0, n_times):
-                    t[t_idx] = tmp[str(t_idx) + '/time'][()]
-                    raw_idx = 0
-                    for var in variables:
-                        raw_data[t_idx, raw_idx] = \
-                                    tmp[str(t_idx) + '/' +var.strip()][()]
-                        raw_idx += 1
+            if var_index >= 0:
+                variables = variables[var_index:var_index+1]
+            t, raw_data = self.__read_h5_aver(file_id, variables, iter_list,
+                                              tmin, tmax)
+            # The datasets are stored as [nz, nx] or [ny, nx].
+            raw_data = np.swapaxes(raw_data, 2, 3)
         else:
             glob_dim = read.dim(datadir)
             if plane == 'y':
@@ -272,114 +311,153 @@ class Averages(object):
             if dim.precision == 'D':
                 dtype = np.float64
 
-            # Prepare the raw data.
-            # This will be reformatted at the end.
-            raw_data = []
+            # Locate the records in the processor files.
+            proc_files = []
             for proc in proc_list:
-                proc_dir = 'proc{0}'.format(proc)
                 proc_dim = read.dim(datadir, proc)
                 if plane == 'y':
                     pnu = proc_dim.nx
                     pnv = proc_dim.nz
+                    idx_u = proc_dim.ipx*proc_dim.nx
+                    idx_v = proc_dim.ipz*proc_dim.nz
                 if plane == 'z':
                     pnu = proc_dim.nx
                     pnv = proc_dim.ny
-                if var_index >= 0:
-                    inx1 = var_index*pnu*pnv
-                    inx2 = (var_index+1)*pnu*pnv
-                # Read the data.
-                t = []
-                proc_data = []
-                try:
-                    file_id = FortranFile(os.path.join(datadir, proc_dir,
-                                                       aver_file_name))
-                except:
+                    idx_u = proc_dim.ipx*proc_dim.nx
+                    idx_v = proc_dim.ipy*proc_dim.ny
+                if not all_procs:
+                    idx_u = 0
+                    idx_v = 0
+                file_name = os.path.join(datadir, 'proc{0}'.format(proc),
+                                         aver_file_name)
+                if not os.path.exists(file_name):
                     # Not all proc dirs have a [yz]averages.dat.
                     print("Averages of processor {0} missing.".format(proc))
                     sys.stdout.flush()
-                    break
-                if iter_list:
-                    if isinstance(iter_list, list):
-                        iter_list = iter_list
-                    else:
-                        iter_list = [iter_list]
-                    # split by iteration overrules split by variable
-                    var_index = -1
-                    iiter = 0
-                    while True:
-                        try:
-                            if iiter in iter_list:
-                                t.append(file_id.read_record(dtype=dtype)[0])
-                                proc_data.append(
-                                            file_id.read_record(dtype=dtype))
-                                if iiter >= iter_list[-1]:
-                                    # Finished reading.
-                                    break
-                                iiter += 1
-                            else:
-                                file_id.read_record(dtype=dtype)[0]
-                                file_id.read_record(dtype=dtype)
-                                iiter += 1
-                        except:
-                            # Finished reading.
-                            break
-                else:
-                    while True:
-                        try:
-                            t.append(file_id.read_record(dtype=dtype)[0])
-                            if var_index >= 0:
-                                proc_data.append(
-                                    file_id.read_record(dtype=dtype)[inx1:inx2])
-                            else:
-                                proc_data.append(
-                                    file_id.read_record(dtype=dtype))
-                        except:
-                            # Finished reading.
-                            break
-                file_id.close()
-                # Reshape the proc data into [len(t), pnu, pnv].
-                proc_data = np.array(proc_data)
-                if var_index >= 0:
-                    proc_data = proc_data.reshape([len(t), 1, pnv, pnu])
-                else:
-                    proc_data = proc_data.reshape([len(t), n_vars, pnv, pnu])
-
-                if not all_procs:
-                    return np.array(t), proc_data.swapaxes(2, 3)
+                    continue
+                offset, record_dtype, n_times = self.__index_1d_records(
+                    file_name, dtype, n_vars, pnu, pnv)
+                proc_files.append((file_name, offset, record_dtype, n_times,
+                                   slice(idx_u, idx_u+pnu),
+                                   slice(idx_v, idx_v+pnv)))
+            if not proc_files:
+                raise IOError("No {0} found in {1}.".format(aver_file_name,
+                                                            datadir))
+
+            # Select the times written by all processors.
+            n_times = min(proc_file[3] for proc_file in proc_files)
+            if tmin is None and tmax is None:
+                t_all = np.zeros(n_times)
+            else:
+                file_name, offset, record_dtype = proc_files[0][:3]
+                t_all = np.array(np.memmap(file_name, dtype=record_dtype,
+                                           mode='r', offset=offset,
+                                           shape=(n_times,))['t'])
+            t_indices = self.__select_times(t_all, iter_list, tmin, tmax)
+            if var_index >= 0:
+                var_slice = slice(var_index, var_index+1)
+            else:
+                var_slice = slice(0, n_vars)
 
-                # Add the proc_data (one proc) to the raw_data (all procs)
-                if plane == 'y':
-                    if all_procs:
-                        idx_u = proc_dim.ipx*proc_dim.nx
-                        idx_v = proc_dim.ipz*proc_dim.nz
-                    else:
-                        idx_v = 0
-                        idx_u = 0
-                if plane == 'z':
-                    if all_procs:
-                        idx_u = proc_dim.ipx*proc_dim.nx
-                        idx_v = proc_dim.ipy*proc_dim.ny
-                    else:
-                        idx_v = 0
-                        idx_u = 0
-
-                if not isinstance(raw_data, np.ndarray):
-                    #Initialize the raw_data array with correct dimensions.
-                    if var_index >= 0:
-                        raw_data = np.zeros([len(t), 1, nv, nu])
-                    else:
-                        raw_data = np.zeros([len(t), n_vars, nv, nu])
-                raw_data[:, :, idx_v:idx_v+pnv, idx_u:idx_u+pnu] = \
-                                                                proc_data.copy()
-
-            t = np.array(t)
-            raw_data = np.swapaxes(raw_data, 2, 3)
+            if all_procs:
+                shape = (len(t_indices), var_slice.stop - var_slice.start,
+                         nu, nv)
+                out_dtype = np.float64
+            else:
+                shape = (len(t_indices), var_slice.stop - var_slice.start,
+                         pnu, pnv)
+                out_dtype = dtype
+            if isinstance(out, np.ndarray) and out.shape == shape and \
+               out.dtype == np.dtype(out_dtype) and out.flags.writeable:
+                raw_data = out
+            else:
+                raw_data = np.zeros(shape, dtype=out_dtype)
+
+            def read_proc(proc_file):
+                file_name, offset, record_dtype, _, u_slice, v_slice = proc_file
+                return self.__read_1d_records(
+                    file_name, offset, record_dtype, t_indices, var_slice,
+                    raw_data[:, :, u_slice, v_slice])
+
+            # The processor tiles do not overlap, so they can be filled
+            # concurrently.
+            if n_workers > 1 and len(proc_files) > 1:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    times = list(executor.map(read_proc, proc_files))
+            else:
+                times = [read_proc(proc_file) for proc_file in proc_files]
+            t = times[0]
 
         return t, raw_data
 
 
-    def __read_2d_aver(self, plane, datadir, variables,
-                       aver_file_name, n_vars, l_h5=False):
+    def __index_1d_records(self, file_name, dtype, n_vars, pnu, pnv):
+        """
+        Determine the layout of the binary y or z averages of one processor.
+        Every time is stored as a record holding the time followed by a
+        record holding the averages, so all times take the same number of
+        bytes. Return the offset of the first time, the dtype of the records
+        of one time and the number of complete times in the file.
+        """
+
+        import os
+        import numpy as np
+
+        dtype = np.dtype(dtype)
+        record_dtype = np.dtype([('t_head', np.int32), ('t', dtype),
+                                 ('t_tail', np.int32), ('head', np.int32),
+                                 ('data', dtype, (n_vars, pnv, pnu)),
+                                 ('tail', np.int32)])
+        file_size = os.path.getsize(file_name)
+        offset = 0
+        with open(file_name, 'rb') as infile:
+            marker = np.fromfile(infile, dtype=np.int32, count=1)
+        if marker.size > 0 and marker[0] != dtype.itemsize:
+            # Skip a header record written with the first time.
+            offset = 4 + int(marker[0]) + 4
+        n_times = max(file_size - offset, 0)//record_dtype.itemsize
+        return offset, record_dtype, n_times
+
+
+    def __read_1d_records(self, file_name, offset, record_dtype, t_indices,
+                          var_slice, tile, block_size=2**26):
+        """
+        Read the times t_indices of the binary y or z averages of one
+        processor into tile, seeking over the times not selected.
+        Consecutive times are read in blocks of up to block_size bytes.
+        Return the times.
+        """
+
+        import numpy as np
+
+        t = np.zeros(len(t_indices), dtype=record_dtype['t'])
+        if len(t_indices) == 0:
+            return t
+        n_block = max(block_size//record_dtype.itemsize, 1)
+        # Split the selection into runs of consecutive times.
+        breaks = np.flatnonzero(np.diff(t_indices) != 1) + 1
+        starts = np.concatenate([[0], breaks])
+        stops = np.concatenate([breaks, [len(t_indices)]])
+        with open(file_name, 'rb') as infile:
+            for start, stop in zip(starts, stops):
+                for i0 in range(start, stop, n_block):
+                    i1 = min(i0 + n_block, stop)
+                    records = np.empty(i1 - i0, dtype=record_dtype)
+                    infile.seek(offset + int(t_indices[i0])*record_dtype.itemsize)
+                    if infile.readinto(records) != records.nbytes:
+                        raise IOError("Unexpected end of {0}.".format(file_name))
+                    if np.any(records['t_head'] != record_dtype['t'].itemsize) or \
+                       np.any(records['head'] != record_dtype['data'].itemsize):
+                        raise ValueError("Unexpected record length in {0}, "
+                                         "the number of averages or the grid "
+                                         "size do not match.".format(file_name))
+                    t[i0:i1] = records['t']
+                    tile[i0:i1] = np.swapaxes(records['data'][:, var_slice], 2, 3)
+        return t
+
+
+    def __read_2d_aver(self, plane, datadir, variables, aver_file_name,
+                       n_vars, iter_list, tmin, tmax, l_h5=False, cache=False):
         """
         Read the xyaverages.dat, xzaverages.dat, yzaverages.dat
         Return the raw data and the time array.
@@ -390,63 +468,243 @@ class Averages(object):
         from .. import read
 
         if l_h5:
-            import h5py
             file_id = os.path.join(datadir, aver_file_name)
             print(file_id)
             sys.stdout.flush()
-            with h5py.File(file_id, 'r') as tmp:
-                n_times = len(tmp.keys()) - 1
-                # Determine the structure of the xy/xz/yz averages.
-                for var in variables:
-                    nw = tmp[str(0) + '/' + var.strip()].shape[0]
-                    break
+            return self.__read_h5_aver(file_id, variables, iter_list,
+                                       tmin, tmax)
         else:
             # Determine the structure of the xy/xz/yz averages.
             if plane == 'xy':
-                nw = getattr(read.dim(), 'nz')
+                nw = getattr(read.dim(datadir), 'nz')
             if plane == 'xz':
-                nw = getattr(read.dim(), 'ny')
+                nw = getattr(read.dim(datadir), 'ny')
             if plane == 'yz':
-                nw = getattr(read.dim(), 'nx')
-            file_id = open(os.path.join(datadir, aver_file_name))
-            aver_lines = file_id.readlines()
-            file_id.close()
+                nw = getattr(read.dim(datadir), 'nx')
             entry_length = int(np.ceil(nw*n_vars/8.))
-            n_times = int(len(aver_lines)/(1. + entry_length))
+            values = self.__read_2d_text(os.path.join(datadir, aver_file_name),
+                                         1 + nw*n_vars, 1 + entry_length,
+                                         cache)
+            values = values[self.__select_times(values[:, 0], iter_list,
+                                                tmin, tmax)]
+            n_times = values.shape[0]
 
         # Prepare the data arrays.
         t = np.zeros(n_times, dtype=np.float32)
+        t[:] = values[:, 0]
+        raw_data = np.reshape(values[:, 1:], [n_times, n_vars, nw])
+        raw_data = raw_data.astype(np.float64)
 
-        # Read the data
-        if l_h5:
-            raw_data = np.zeros([n_times, n_vars, nw])
-            with h5py.File(file_id, 'r') as tmp:
-                for t_idx in range(0, n_times):
-                    t[t_idx] = tmp[str(t_idx) + '/time'][()]
-                    raw_idx = 0
-                    for var in variables:
-                        raw_data[t_idx, raw_idx] = \
-                                         tmp[str(t_idx) + '/' + var.strip()][()]
-                        raw_idx += 1
-        else:
-            raw_data = np.zeros([n_times, n_vars*nw])
-            line_idx = 0
-            t_idx = -1
-            for current_line in aver_lines:
-                if line_idx % (entry_length+1) == 0:
-                    t_idx += 1
-                    t[t_idx] = np.float32(current_line)
-                    raw_idx = 0
+        return t, raw_data
+
+
+    def __read_h5_aver(self, file_name, variables, iter_list, tmin, tmax):
+        """
+        Read the HDF5 averages of the variables, stored either with one group
+        per time ('0/time', '0/<var>', ...) or with one (nt, ...) dataset per
+        variable and a 'time' dataset.
+        Return the time array and the raw data [nt, n_vars, ...].
+        """
+
+        import h5py
+        import numpy as np
+
+        variables = [var.strip() for var in variables]
+        with h5py.File(file_name, 'r') as tmp:
+            if isinstance(tmp.get('time'), h5py.Dataset):
+                t = tmp['time'][()]
+                t_indices = self.__select_times(t, iter_list, tmin, tmax)
+                # Read contiguous times as one hyperslab.
+                if t_indices.size == 0:
+                    selection = slice(0, 0)
+                elif t_indices[-1] - t_indices[0] + 1 == t_indices.size:
+                    selection = slice(t_indices[0], t_indices[-1] + 1)
                 else:
-                    raw_data[t_idx, raw_idx*8:(raw_idx*8+8)] = \
-                        list(map(np.float32, current_line.split()))
-                    raw_idx += 1
-                line_idx += 1
+                    selection = list(t_indices)
+                raw_data = np.zeros((t_indices.size, len(variables)) +
+                                    tmp[variables[0]].shape[1:])
+                for raw_idx, var in enumerate(variables):
+                    raw_data[:, raw_idx] = tmp[var][selection]
+                t = t[t_indices]
+            else:
+                n_times = len([key for key in tmp.keys() if key.isdigit()])
+                t = np.array([tmp[str(t_idx) + '/time'][()]
+                              for t_idx in range(n_times)]).reshape(n_times)
+                t_indices = self.__select_times(t, iter_list, tmin, tmax)
+                raw_data = np.zeros((t_indices.size, len(variables)) +
+                                    tmp['0/' + variables[0]].shape)
+                for idx, t_idx in enumerate(t_indices):
+                    for raw_idx, var in enumerate(variables):
+                        raw_data[idx, raw_idx] = \
+                            tmp[str(t_idx) + '/' + var][()]
+                t = t[t_indices]
+
+        return t.astype(np.float32), raw_data
+
+
+    def __select_times(self, t, iter_list, tmin, tmax):
+        """
+        Return the sorted indices of the times t which are in iter_list
+        and within [tmin, tmax].
+        """
+
+        import numpy as np
 
-            # Restructure the raw data and add it to the Averages object.
-            raw_data = np.reshape(raw_data, [n_times, n_vars, nw])
+        selected = np.ones(len(t), dtype=bool)
+        if iter_list:
+            if not isinstance(iter_list, list):
+                iter_list = [iter_list]
+            in_list = np.zeros(len(t), dtype=bool)
+            iter_list = np.array(iter_list, dtype=int)
+            in_list[iter_list[(iter_list >= 0) & (iter_list < len(t))]] = True
+            selected &= in_list
+        if tmin is not None:
+            selected &= t >= tmin
+        if tmax is not None:
+            selected &= t <= tmax
+        return np.flatnonzero(selected)
+
+
+    def __read_2d_text(self, file_name, n_columns, lines_per_time, cache):
+        """
+        Read a text average file in which each time is written as lines_per_time
+        lines holding n_columns values in total (time first).
+        Return the (n_times, n_columns) array. An incomplete last time is
+        ignored. With cache, the data is also kept in file_name.npy,
+        described by file_name.json, and only the text appended since is
+        parsed.
+        """
 
-        return t, raw_data
+        import json
+        import os
+        import numpy as np
+
+        stat = os.stat(file_name)
+        cache_name = file_name + '.npy'
+        meta_name = file_name + '.json'
+        with open(file_name, 'rb') as infile:
+            head = infile.read(256).decode('latin-1')
+
+        values = np.zeros([0, n_columns], dtype=np.float32)
+        offset = 0
+        if cache:
+            try:
+                with open(meta_name) as meta_file:
+                    meta = json.load(meta_file)
+                if meta['n_columns'] == n_columns and \
+                   meta['lines_per_time'] == lines_per_time and \
+                   meta['offset'] <= stat.st_size and \
+                   head.startswith(meta['head']):
+                    values = np.load(cache_name, mmap_mode='r')
+                    values = values[:meta['n_times']]
+                    offset = meta['offset']
+                    if meta['size'] == stat.st_size and \
+                       meta['mtime_ns'] == stat.st_mtime_ns:
+                        return np.array(values)
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                values = np.zeros([0, n_columns], dtype=np.float32)
+                offset = 0
+
+        with open(file_name, 'rb') as infile:
+            infile.seek(offset)
+            raw = infile.read()
+        new_values, n_bytes = self.__parse_2d_text(raw, n_columns,
+                                                   lines_per_time)
+        if offset > 0:
+            values = np.concatenate([values, new_values])
+        else:
+            values = new_values
+
+        if cache:
+            try:
+                self.__append_npy(cache_name, new_values,
+                                  values.shape[0] - new_values.shape[0])
+                with open(meta_name, 'w') as meta_file:
+                    json.dump({'n_columns': n_columns,
+                               'lines_per_time': lines_per_time,
+                               'n_times': values.shape[0],
+                               'offset': offset + n_bytes,
+                               'size': stat.st_size,
+                               'mtime_ns': stat.st_mtime_ns,
+                               'head': head[:min(len(head), offset + n_bytes)]},
+                              meta_file)
+            except (IOError, OSError):
+                # E.g. the data directory is not writable.
+                pass
+
+        return values
+
+
+    def __parse_2d_text(self, raw, n_columns, lines_per_time):
+        """
+        Parse the complete times in the bytes raw of a text average file.
+        Return the (n_times, n_columns) float32 array and the number of
+        bytes parsed.
+        """
+
+        import re
+        import warnings
+        import numpy as np
+
+        newlines = np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == 10)
+        n_times = newlines.size//lines_per_time
+        if n_times == 0:
+            return np.zeros([0, n_columns], dtype=np.float32), 0
+        n_bytes = int(newlines[n_times*lines_per_time - 1]) + 1
+
+        text = raw[:n_bytes].decode('ascii', 'replace')
+        # Fortran writes asterisks if a number does not fit its format.
+        if '*' in text:
+            text = re.sub(r'\*+', ' nan ', text)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                values = np.fromstring(text, sep=' ')
+        except ValueError:
+            values = np.array([])
+        if values.size != n_times*n_columns:
+            raise ValueError("Unexpected number of values in the averages, "
+                             "the file may be corrupt.")
+
+        return values.reshape(n_times, n_columns).astype(np.float32), n_bytes
+
+
+    def __append_npy(self, file_name, values, n_rows):
+        """
+        Write values to the .npy file after its first n_rows rows.
+        """
+
+        import io
+        import os
+        import numpy as np
+
+        if n_rows > 0 and os.path.exists(file_name):
+            header = {'descr': np.lib.format.dtype_to_descr(values.dtype),
+                      'fortran_order': False,
+                      'shape': (n_rows + values.shape[0], values.shape[1])}
+            with open(file_name, 'r+b') as outfile:
+                version = np.lib.format.read_magic(outfile)
+                if version == (1, 0):
+                    np.lib.format.read_array_header_1_0(outfile)
+                    write_header = np.lib.format.write_array_header_1_0
+                else:
+                    np.lib.format.read_array_header_2_0(outfile)
+                    write_header = np.lib.format.write_array_header_2_0
+                header_length = outfile.tell()
+                buffer = io.BytesIO()
+                write_header(buffer, header)
+                # Only update in place if the new header fits.
+                if len(buffer.getvalue()) == header_length:
+                    row_bytes = values.shape[1]*values.dtype.itemsize
+                    outfile.seek(header_length + n_rows*row_bytes)
+                    outfile.write(values.tobytes())
+                    outfile.truncate()
+                    outfile.seek(0)
+                    outfile.write(buffer.getvalue())
+                    return
+            old_values = np.load(file_name)[:n_rows]
+            values = np.concatenate([old_values, values])
+        np.save(file_name, values)
 
 
     def __natural_sort(self, l):
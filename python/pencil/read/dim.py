@@ -31,9 +31,35 @@ def dim(*args, **kwargs):
       corresponding processor directory.
     """
 
-    dim_tmp = Dim()
-    dim_tmp.read(*args, **kwargs)
-    return dim_tmp
+    from .metadata_cache import cached_read
+
+    return cached_read(Dim, args, kwargs, dim_files)
+
+
+def dim_files(arguments):
+    """
+    Return the files read by Dim.read for the dictionary of its arguments.
+    """
+
+    import os
+
+    datadir = arguments['datadir']
+    files = [os.path.join(datadir, 'grid.h5')]
+    if os.path.exists(files[0]):
+        files.append(os.path.join(datadir, 'allprocs', 'var.h5'))
+        return files
+    if arguments['ogrid']:
+        file_name = 'ogdim.dat'
+    elif arguments['down']:
+        file_name = 'dim_down.dat'
+    else:
+        file_name = 'dim.dat'
+    if arguments['proc'] < 0:
+        files.append(os.path.join(datadir, file_name))
+    else:
+        files.append(os.path.join(datadir, 'proc{0}'.format(
+            arguments['proc']), file_name))
+    return files
 
 
 class Dim(object):
@@ -39,9 +39,33 @@ def grid(*args, **kwargs):
       Cuts off the ghost points.
     """
 
-    grid_tmp = Grid()
-    grid_tmp.read(*args, **kwargs)
-    return grid_tmp
+    from .metadata_cache import cached_read
+
+    return cached_read(Grid, args, kwargs, grid_files)
+
+
+def grid_files(arguments):
+    """
+    Return the files read by Grid.read for the dictionary of its arguments.
+    """
+
+    import os
+    from .dim import dim_files
+    from .param import param_files
+
+    datadir = arguments['datadir']
+    files = dim_files(dict(arguments, ogrid=False, down=False)) + \
+            param_files(arguments)
+    if os.path.exists(files[0]):
+        return files
+    if arguments['proc'] < 0:
+        proc_dirs = [directory for directory in os.listdir(datadir)
+                     if directory.startswith('proc')] + ['allprocs']
+    else:
+        proc_dirs = ['proc{0}'.format(arguments['proc'])]
+    for directory in proc_dirs:
+        files.append(os.path.join(datadir, directory, 'grid.dat'))
+    return files
 
 
 class Grid(object):
@@ -265,3 +289,37 @@ class Grid(object):
         self.Lx = Lx
         self.Ly = Ly
         self.Lz = Lz
+
+
+    def trimmed(self, dim):
+        """
+        Return a copy of this grid, read with trim=False, without the ghost
+        zones, as read with trim=True.
+
+        call signature:
+
+        trimmed(dim)
+
+        Keyword arguments:
+
+        *dim*:
+          Dim object of the grid.
+        """
+
+        import copy
+
+        grid = copy.copy(self)
+        x_range = slice(dim.l1, dim.l2+1)
+        y_range = slice(dim.m1, dim.m2+1)
+        z_range = slice(dim.n1, dim.n2+1)
+        grid.x = self.x[x_range].copy()
+        grid.y = self.y[y_range].copy()
+        grid.z = self.z[z_range].copy()
+        grid.dx_1 = self.dx_1[x_range].copy()
+        grid.dy_1 = self.dy_1[y_range].copy()
+        grid.dz_1 = self.dz_1[z_range].copy()
+        grid.dx_tilde = self.dx_tilde[x_range].copy()
+        grid.dy_tilde = self.dy_tilde[y_range].copy()
+        grid.dz_tilde = self.dz_tilde[z_range].copy()
+
+        return grid
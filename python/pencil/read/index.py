@@ -30,9 +30,23 @@ def index(*args, **kwargs):
       Dimension object.
     """
 
-    index_tmp = Index()
-    index_tmp.read(*args, **kwargs)
-    return index_tmp
+    from .metadata_cache import cached_read
+
+    return cached_read(Index, args, kwargs, index_files)
+
+
+def index_files(arguments):
+    """
+    Return the files read by Index.read for the dictionary of its arguments.
+    """
+
+    import os
+    from .dim import dim_files
+    from .param import param_files
+
+    arguments = dict(arguments, proc=-1, ogrid=False, down=False)
+    return [os.path.join(arguments['datadir'], 'index.pro')] + \
+           param_files(arguments) + dim_files(arguments)
 
 
 class Index(object):
@@ -0,0 +1,389 @@
+# lazy_arrays.py
+#
+# Read-only array proxies which defer reading data from disk until they
+# are indexed.
+# NB: indexing a proxy returns a numpy array holding only the selection,
+#     use view() to obtain another lazy proxy of a sub-region.
+"""
+Contains the lazy array classes used for memory-mapped and HDF5 data cubes.
+"""
+
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+
+class MappedRecord(object):
+    """
+    MappedRecord -- memory maps a single Fortran record holding an array.
+
+    The file is only mapped for the duration of an indexing operation,
+    so that a data cube spread over thousands of processor files does not
+    keep thousands of file descriptors open.
+    """
+
+    def __init__(self, file_name, offset, shape, dtype, components=None):
+        """
+        Store the location of the record.
+
+        call signature:
+
+        MappedRecord(file_name, offset, shape, dtype, components=None)
+
+        Keyword arguments:
+
+        *file_name*:
+          Name of the binary file.
+
+        *offset*:
+          Byte offset of the record data (after the record marker).
+
+        *shape*:
+          C-ordered shape of the record data.
+
+        *dtype*:
+          Data type of the record data.
+
+        *components*:
+          Indices along the first axis to expose, e.g. the selected
+          variables of an f-array. By default all are exposed.
+        """
+
+        self.file_name = file_name
+        self.offset = offset
+        self.record_shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.components = components
+        if components is None:
+            self.shape = self.record_shape
+        else:
+            self.shape = (len(components),) + self.record_shape[1:]
+
+
+    def __getitem__(self, key):
+        """
+        Map the record and return the requested part as a memmap view.
+        """
+
+        data = np.memmap(self.file_name, dtype=self.dtype, mode='r',
+                         offset=self.offset, shape=self.record_shape)
+        if self.components is None:
+            return data[key]
+        if not isinstance(key, tuple):
+            key = (key,)
+        return data[(np.asarray(self.components)[key[0]],) + key[1:]]
+
+
+class DatasetStack(object):
+    """
+    DatasetStack -- stacks the HDF5 datasets of single variables along a
+    leading axis, e.g. the data/<variable> datasets of a VAR file into the
+    f-array. Indexing is translated into hyperslab selections.
+    """
+
+    def __init__(self, datasets, shape, dtype):
+        """
+        Store the datasets.
+
+        call signature:
+
+        DatasetStack(datasets, shape, dtype)
+
+        Keyword arguments:
+
+        *datasets*:
+          List of h5py datasets of equal shape. None entries read as zeros.
+
+        *shape*:
+          Shape of the datasets.
+
+        *dtype*:
+          Data type of the stacked array.
+        """
+
+        self.datasets = datasets
+        self.shape = (len(datasets),) + tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+
+    def __getitem__(self, key):
+        """
+        Read the selection from the datasets.
+        """
+
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),)*(len(self.shape) - len(key))
+
+        # Hyperslabs can only be selected in increasing order.
+        h5_key = []
+        flip = []
+        n_out = 0
+        for n, k in zip(self.shape[1:], key[1:]):
+            if isinstance(k, slice) and k.step is not None and k.step < 0:
+                r = range(n)[k]
+                if len(r) > 0:
+                    k = slice(r[-1], r[0] + 1, -r.step)
+                    flip.append(n_out)
+                else:
+                    k = slice(0, 0)
+            if isinstance(k, slice):
+                n_out += 1
+            h5_key.append(k)
+        h5_key = tuple(h5_key)
+
+        if isinstance(key[0], (int, np.integer)):
+            data = self.__read(int(key[0]), h5_key)
+        else:
+            data = np.stack([self.__read(i, h5_key) for i in
+                             range(self.shape[0])[key[0]]])
+            flip = [axis + 1 for axis in flip]
+        for axis in flip:
+            data = np.flip(data, axis)
+        return data
+
+
+    def __read(self, i, key):
+        if self.datasets[i] is None:
+            zeros = np.broadcast_to(np.zeros((), dtype=self.dtype),
+                                    self.shape[1:])
+            return np.array(zeros[key])
+        return np.asarray(self.datasets[i][key], dtype=self.dtype)
+
+
+class ComputedArray(object):
+    """
+    ComputedArray -- array whose parts are computed on demand by a
+    function of the index key, e.g. a derived quantity of a data cube.
+    Computed parts are cached by key.
+    """
+
+    def __init__(self, compute, shape, dtype):
+        """
+        Store the function.
+
+        call signature:
+
+        ComputedArray(compute, shape, dtype)
+
+        Keyword arguments:
+
+        *compute*:
+          Function returning the part of the array selected by a basic
+          index key (a tuple of integers and slices).
+
+        *shape*:
+          Shape of the whole array.
+
+        *dtype*:
+          Data type of the array.
+        """
+
+        self.compute = compute
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.cache = {}
+
+
+    def __getitem__(self, key):
+        """
+        Compute the requested part, or take it from the cache.
+        """
+
+        if not isinstance(key, tuple):
+            key = (key,)
+        cache_key = tuple((k.start, k.stop, k.step) if isinstance(k, slice)
+                          else int(k) for k in key)
+        if cache_key not in self.cache:
+            self.cache[cache_key] = np.asarray(self.compute(key),
+                                               dtype=self.dtype)
+        return self.cache[cache_key]
+
+
+class TiledArray(NDArrayOperatorsMixin):
+    """
+    TiledArray -- virtual global array assembled from processor tiles.
+
+    Each tile is a triple (source, dst, src) where source supports numpy
+    basic indexing (e.g. a MappedRecord), dst are the slices of the
+    spatial axes in the global array and src the corresponding slices in
+    the tile. The leading axes not covered by dst (the variable axis of
+    the f-array) are passed through to the source unchanged.
+    """
+
+    def __init__(self, shape, dtype, tiles, ranges=None):
+        """
+        Set up the virtual array.
+
+        call signature:
+
+        TiledArray(shape, dtype, tiles, ranges=None)
+
+        Keyword arguments:
+
+        *shape*:
+          Shape of the global array.
+
+        *dtype*:
+          Data type of the global array.
+
+        *tiles*:
+          List of (source, dst, src) triples.
+
+        *ranges*:
+          Selection of this view in terms of the global array, one range
+          or integer per axis. Used internally by view().
+        """
+
+        self.dtype = np.dtype(dtype)
+        self.tiles = tiles
+        self.base_shape = tuple(shape)
+        if ranges is None:
+            ranges = tuple(range(n) for n in self.base_shape)
+        self.ranges = tuple(ranges)
+
+
+    @property
+    def shape(self):
+        return tuple(len(r) for r in self.ranges if isinstance(r, range))
+
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+
+    @property
+    def nbytes(self):
+        return self.size*self.dtype.itemsize
+
+
+    def __len__(self):
+        return self.shape[0]
+
+
+    def __repr__(self):
+        return 'TiledArray(shape={0}, dtype={1}, tiles={2})'.format(
+            self.shape, self.dtype, len(self.tiles))
+
+
+    def __select(self, key):
+        """
+        Compose the index key with the current selection.
+        Returns None if the key requires advanced indexing.
+        """
+
+        if not isinstance(key, tuple):
+            key = (key,)
+        n_ellipsis = sum(k is Ellipsis for k in key)
+        if n_ellipsis > 1:
+            raise IndexError("an index can only have a single ellipsis ('...')")
+        if n_ellipsis == 1:
+            i = [k is Ellipsis for k in key].index(True)
+            fill = (slice(None),)*(self.ndim - len(key) + 1)
+            key = key[:i] + fill + key[i+1:]
+        if len(key) > self.ndim:
+            raise IndexError('too many indices for array')
+        for k in key:
+            if not (isinstance(k, slice) or
+                    isinstance(k, (int, np.integer))):
+                return None
+
+        ranges = []
+        key = iter(key)
+        for r in self.ranges:
+            if isinstance(r, range):
+                k = next(key, slice(None))
+                if isinstance(k, slice):
+                    r = r[k]
+                else:
+                    r = r[int(k)]
+            ranges.append(r)
+        return tuple(ranges)
+
+
+    def view(self, key):
+        """
+        Return a lazy view of a sub-region without reading any data.
+        Only basic indexing (integers, slices, Ellipsis) is supported.
+        """
+
+        ranges = self.__select(key)
+        if ranges is None:
+            raise IndexError('TiledArray.view only supports basic indexing.')
+        return TiledArray(self.base_shape, self.dtype, self.tiles, ranges)
+
+
+    def __getitem__(self, key):
+        """
+        Read the selected region from the tiles it intersects.
+        """
+
+        ranges = self.__select(key)
+        if ranges is None:
+            # Advanced indexing: read the current view, then index.
+            return self.__assemble(self.ranges)[key]
+        return self.__assemble(ranges)
+
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.__assemble(self.ranges)
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
+        return data
+
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(np.asarray(a) if isinstance(a, TiledArray) else a
+                       for a in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+
+    def __assemble(self, ranges):
+        """
+        Fill an array for the given selection tile by tile.
+        """
+
+        n_lead = len(self.base_shape) - len(self.tiles[0][1])
+        out_shape = tuple(len(r) for r in ranges if isinstance(r, range))
+        out = np.empty(out_shape, dtype=self.dtype)
+
+        lead_key = tuple(_range_to_slice(r) if isinstance(r, range) else r
+                         for r in ranges[:n_lead])
+        for source, dst, src in self.tiles:
+            src_key = list(lead_key)
+            out_key = [slice(None)]*sum(isinstance(r, range)
+                                        for r in ranges[:n_lead])
+            for r, d, s in zip(ranges[n_lead:], dst, src):
+                if isinstance(r, range):
+                    pos = np.asarray(r)
+                    hit = np.nonzero((pos >= d.start) & (pos < d.stop))[0]
+                    if hit.size == 0:
+                        break
+                    start = int(pos[hit[0]]) - d.start + s.start
+                    local = range(start, start + hit.size*r.step, r.step)
+                    src_key.append(_range_to_slice(local))
+                    out_key.append(slice(hit[0], hit[-1] + 1))
+                else:
+                    if not d.start <= r < d.stop:
+                        break
+                    src_key.append(r - d.start + s.start)
+            else:
+                out[tuple(out_key)] = source[tuple(src_key)]
+        return out
+
+
+def _range_to_slice(r):
+    """
+    Convert a range into the equivalent slice, also for descending ranges
+    running down to index 0.
+    """
+
+    stop = r.stop
+    if stop < 0:
+        stop = None
+    return slice(r.start, stop, r.step)
@@ -0,0 +1,138 @@
+# metadata_cache.py
+#
+# Process-wide cache for the small metadata files of a run
+# (dim.dat, param.nml, index.pro, grid.dat, ...).
+# Entries are keyed on the reader arguments and validated against the
+# modification time and size of the files they were read from.
+"""
+Contains the metadata cache used by the dim, param, index and grid readers.
+"""
+
+import threading
+
+# Set to False to always read from disk.
+enabled = True
+
+__cache = {}
+__lock = threading.Lock()
+
+
+def file_signature(file_names):
+    """
+    Return (file name, mtime, size) for each file, with None for the mtime
+    and size of files which do not exist.
+
+    call signature:
+
+    file_signature(file_names)
+
+    Keyword arguments:
+
+    *file_names*:
+      List of file names.
+    """
+
+    import os
+
+    signature = []
+    for file_name in file_names:
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            signature.append((file_name, None, None))
+        else:
+            signature.append((file_name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def cached_read(cls, args, kwargs, files):
+    """
+    Return an object of the reader class cls filled by cls.read(*args,
+    **kwargs). The result is taken from the cache if it has been read
+    before with the same arguments and the files it depends on are
+    unchanged. Objects are deep copied in and out of the cache, so they
+    can be modified freely.
+
+    call signature:
+
+    cached_read(cls, args, kwargs, files)
+
+    Keyword arguments:
+
+    *cls*:
+      Reader class, e.g. Dim. Its read method must take a datadir argument.
+
+    *args*, *kwargs*:
+      Arguments of cls.read.
+
+    *files*:
+      Function returning the list of files the result depends on for the
+      dictionary of (normalized) arguments.
+    """
+
+    import copy
+    import inspect
+    import numbers
+    import os
+
+    arguments = inspect.signature(cls.read).bind(None, *args, **kwargs)
+    arguments.apply_defaults()
+    arguments = dict(arguments.arguments)
+    arguments.pop('self')
+
+    def read():
+        obj = cls()
+        status = obj.read(**arguments)
+        return obj, not (isinstance(status, int) and status < 0)
+
+    # Objects passed as arguments (e.g. a param object) are not cached.
+    hashable = (str, numbers.Number, type(None))
+    if not enabled or \
+       not all(isinstance(value, hashable) for value in arguments.values()):
+        return read()[0]
+
+    arguments['datadir'] = os.path.abspath(os.path.expanduser(
+        arguments['datadir']))
+    key = (cls.__name__, tuple(sorted(
+        (name, value) for name, value in arguments.items()
+        if name not in ('quiet', 'conflicts_quiet'))))
+    signature = file_signature(files(arguments))
+
+    with __lock:
+        entry = __cache.get(key)
+    if entry is not None and entry[0] == signature:
+        return copy.deepcopy(entry[1])
+
+    obj, success = read()
+    if success:
+        with __lock:
+            __cache[key] = (signature, copy.deepcopy(obj))
+    return obj
+
+
+def clear_cache(datadir=None):
+    """
+    Invalidate the cached metadata, e.g. after files were rewritten within
+    the time resolution of the file system.
+
+    call signature:
+
+    clear_cache(datadir=None)
+
+    Keyword arguments:
+
+    *datadir*:
+      Only invalidate the entries of this data directory.
+      By default the whole cache is cleared.
+    """
+
+    import os
+
+    with __lock:
+        if datadir is None:
+            __cache.clear()
+            return
+        datadir = os.path.abspath(os.path.expanduser(datadir))
+        for key in list(__cache.keys()):
+            if dict(key[1]).get('datadir') == datadir:
+                del __cache[key]
@@ -24,7 +24,8 @@ def param(*args, **kwargs):
     call signature:
 
     read(datadir='data', param1=False, param2=False, quiet=True,
-         conflicts_quiet=False, asdict=True, nest_dict=True, append_units=True)
+         conflicts_quiet=False, asdict=True, nest_dict=True, append_units=True,
+         cache=False)
 
 
     Keyword arguments:
@@ -52,11 +53,27 @@ def param(*args, **kwargs):
 
     *append_units*
       Derives dimensional units from standard code units.
+
+    *cache*
+      Store the parsed parameters in <datadir>/param.nml.json and reuse
+      them as long as the namelist files are unchanged. Off by default,
+      repeated reads within a process are cached in memory anyway.
+    """
+
+    from .metadata_cache import cached_read
+
+    return cached_read(Param, args, kwargs, param_files)
+
+
+def param_files(arguments):
+    """
+    Return the files read by Param.read for the dictionary of its arguments.
     """
 
-    param_tmp = Param()
-    param_tmp.read(*args, **kwargs)
-    return param_tmp
+    import os
+
+    return [os.path.join(arguments['datadir'], 'param.nml'),
+            os.path.join(arguments['datadir'], 'param2.nml')]
 
 
 class Param(object):
@@ -74,7 +91,7 @@ class Param(object):
 
     def read(self, datadir='data', param1=False, param2=False, quiet=True,
              conflicts_quiet=False,
-             asdict=True, nest_dict=True, append_units=True):
+             asdict=True, nest_dict=True, append_units=True, cache=False):
         """
         Read Pencil Code simulation parameters.
         Requires: nl2python perl script (based on Wolfgang Dobler's nl2idl script).
@@ -83,7 +100,7 @@ class Param(object):
 
         read(datadir='data', param1=False, param2=False, quiet=True,
              conflicts_quiet=False, asdict=True, nest_dict=True,
-             append_units=True)
+             append_units=True, cache=False)
 
         Keyword arguments:
 
@@ -110,6 +127,12 @@ class Param(object):
 
         *append_units*
           Derives dimensional units from standard code units.
+
+        *cache*
+          Store the parsed parameters in <datadir>/param.nml.json and reuse
+          them as long as the size and modification time of the namelist
+          files are unchanged. Off by default, so the data directory is not
+          written to.
         """
         import os
         from os.path import join, exists
@@ -136,7 +159,16 @@ class Param(object):
         # Read the parameters into a dictionary.
         param_list = dict()
         # Construct object from dictionary with Python
-        if asdict:
+        if asdict and cache:
+            cache_file = join(datadir, 'param.nml.json')
+            cache_key = ','.join(os.path.basename(filen) for filen in files) + \
+                        (';nest' if nest_dict else '')
+            cached = self.__load_cache(cache_file, cache_key, files)
+        else:
+            cached = None
+        if cached is not None:
+            param_list, super_name_list = cached
+        elif asdict:
             super_name_list = list()
             name_list = list()
             param_conflicts = dict()
@@ -153,11 +185,11 @@ class Param(object):
                                 self.__read_nml(param_list, filen,
                                                 param_conflicts, name_list, super_name_list)
             if not param_conflicts:
-                subkey_list = list()
+                subkey_list = set()
                 for super_name in super_name_list:
                     if super_name in param_conflicts.keys():
                         for subkey in param_conflicts[super_name].keys():
-                            subkey_list.append(subkey)
+                            subkey_list.add(subkey)
                 for super_name in super_name_list:
                     if not super_name in param_conflicts.keys():
                         if param_list.__contains__(super_name):
@@ -181,6 +213,10 @@ class Param(object):
                                   'in', key, 'conflicts with',
                                   param_conflicts[key][subkey][2], 'in',
                                   param_conflicts[key][subkey][1])
+            if cache:
+                self.__write_cache(cache_file, cache_key, files, param_list,
+                                   super_name_list)
+        if asdict:
             # Create object container for nested contents
             class Foo(object):
                 pass
@@ -235,6 +271,114 @@ class Param(object):
         return 0
 
 
+    def __load_cache(self, cache_file, cache_key, files):
+        """
+        Return the parameter dictionary and the list of nested modules
+        stored in the cache file for cache_key, or None if there is none or
+        the namelist files have changed since.
+
+        call signature:
+
+        __load_cache(self, cache_file, cache_key, files)
+
+        Keyword arguments:
+
+        *cache_file*:
+          Name of the JSON cache file.
+
+        *cache_key*:
+          Entry of the cache for the selected files and nesting.
+
+        *files*:
+          Namelist files the parameters were read from.
+        """
+
+        import json
+        from .metadata_cache import file_signature
+
+        def decode(obj):
+            # Tuples are stored as {'__tuple__': [...]}.
+            if '__tuple__' in obj:
+                return tuple(obj['__tuple__'])
+            return obj
+
+        try:
+            with open(cache_file) as json_file:
+                entry = json.load(json_file, object_hook=decode)[cache_key]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if [list(signature) for signature in file_signature(files)] != \
+           entry['files']:
+            return None
+        return entry['param_list'], entry['super_name_list']
+
+
+    def __write_cache(self, cache_file, cache_key, files, param_list,
+                      super_name_list):
+        """
+        Store the parameter dictionary and the list of nested modules in
+        the cache file under cache_key, together with the size and
+        modification time of the namelist files. Unwritable data
+        directories are ignored.
+
+        call signature:
+
+        __write_cache(self, cache_file, cache_key, files, param_list,
+                      super_name_list)
+
+        Keyword arguments:
+
+        *cache_file*:
+          Name of the JSON cache file.
+
+        *cache_key*:
+          Entry of the cache for the selected files and nesting.
+
+        *files*:
+          Namelist files the parameters were read from.
+
+        *param_list*:
+          Dictionary of the parameters.
+
+        *super_name_list*:
+          List of the modules whose parameters are nested.
+        """
+
+        import os
+        import json
+        from .metadata_cache import file_signature
+
+        def encode(obj):
+            # Keep tuples (complex values) apart from lists.
+            if isinstance(obj, tuple):
+                return {'__tuple__': [encode(value) for value in obj]}
+            if isinstance(obj, list):
+                return [encode(value) for value in obj]
+            if isinstance(obj, dict):
+                return {key: encode(value) for key, value in obj.items()}
+            return obj
+
+        try:
+            with open(cache_file) as json_file:
+                entries = json.load(json_file)
+            if not isinstance(entries, dict):
+                entries = dict()
+        except (OSError, ValueError):
+            entries = dict()
+        entries[cache_key] = {
+            'files': [list(signature) for signature in file_signature(files)],
+            'param_list': encode(param_list),
+            'super_name_list': list(super_name_list)}
+        tmp_file = '{0}.{1}.tmp'.format(cache_file, os.getpid())
+        try:
+            with open(tmp_file, 'w') as json_file:
+                json.dump(entries, json_file)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+
     def __param_formatter(self, string_part):
         """
         Formats the parameters from the files.
@@ -249,9 +393,7 @@ class Param(object):
           Part of the string to be formatted.
         """
 
-        import re
-
-        string_part = re.sub(" ", "", string_part)
+        string_part = string_part.replace(" ", "")
         if string_part == "T":
             return True
         if string_part == "F":
@@ -260,8 +402,8 @@ class Param(object):
             if "." in string_part:
                 return float(string_part)
             return int(string_part)
-        except:
-            return re.sub("'", "", string_part)
+        except ValueError:
+            return string_part.replace("'", "")
 
 
     def __tuple_catch(self, string):
@@ -280,9 +422,7 @@ class Param(object):
 
         if "(" in string:
             string = string.replace("(", "").replace(")", "").split(",")
-            for j in range(len(string)):
-                string[j] = self.__param_formatter(string[j])
-            return tuple(string)
+            return tuple(self.__param_formatter(part) for part in string)
         return self.__param_formatter(string)
 
 
@@ -306,64 +446,71 @@ class Param(object):
 
         import re
 
-        r = re.compile(r'(?:[^,(]|\([^)]*\))+')
+        # Split a value list at the commas outside of brackets.
+        split_values = re.compile(r'(?:[^,(]|\([^)]*\))+').findall
+        formatter = self.__param_formatter
+        tuple_catch = self.__tuple_catch
+
+        with open(file_name) as nml_file:
+            rawlines = nml_file.readlines()
 
         # Contain the nested parameters to be retained
         # Contain the nest names for each parameter set
-        for rawline in open(file_name):
-            if ',' in rawline[1]:
-                rawline = lastrawline+rawline
-            if ' ' in rawline[1]:
-                rawline = lastrawline+rawline
-            if "'" in rawline[1]:
+        for rawline in rawlines:
+            # Lines continuing a long value are appended to the previous.
+            if rawline[1] in ", '":
                 rawline = lastrawline+rawline
             lastrawline = rawline
             line = rawline.rstrip('\n')
             if line[1] == "&" or line[0] == "&":
                 super_name = line[2:].lower().rsplit('_pars')[0].rsplit('_init')[0].rsplit('_run')[0]
                 if nest:
-                    if not params.__contains__(super_name):
+                    if not super_name in params:
                         params[super_name] = dict()
                         super_name_list.append(super_name)
-            else:
-                line = re.sub("^ ", "", line)
-                if line != "/":
-                    split = re.split("=", line)
-                    name = re.sub(" ", "", split[0].lower())
-                    value = split[1]
-                    parts = r.findall(value)
-                    value = []
-                    for i in range(len(parts)):
-                        if "*" in parts[i]:
-                            s = parts[i].split("*")
-                            for j in range(int(s[0])):
-                                value += [self.__tuple_catch(s[1])]
-                        else:
-                            value += [self.__tuple_catch(parts[i])]
-                    if len(value) == 1:
-                        value = value[0]
-                    params[name] = value
-                    name_list.append(name)
-                    if nest:
-                        # Save all parameters nested and unnested
-                        if not super_name in ('run', 'init'):
-                            params[super_name][name] = value
+                continue
+            if line[0] == " ":
+                line = line[1:]
+            if line == "/":
+                continue
+            split = line.split("=")
+            name = split[0].lower().replace(" ", "")
+            value = []
+            for part in split_values(split[1]):
+                if "*" in part:
+                    count, part = part.split("*")[:2]
+                    value += [tuple_catch(part)]*int(count)
+                elif "(" in part:
+                    value.append(tuple_catch(part))
+                else:
+                    value.append(formatter(part))
+            if len(value) == 1:
+                value = value[0]
+            params[name] = value
+            name_list.append(name)
+            if nest:
+                # Save all parameters nested and unnested
+                if not super_name in ('run', 'init'):
+                    params[super_name][name] = value
         # If name conflict exists remove unnested copies
         if len(super_name_list) > 0:
             if 'run' in super_name_list: super_name_list.remove('run')
             if 'init' in super_name_list: super_name_list.remove('init')
+            # Modules holding each parameter, in the order of the modules.
+            holders = dict()
+            for super_name in super_name_list:
+                for name in params[super_name].keys():
+                    holders.setdefault(name, []).append(super_name)
             for super_name in super_name_list:
-                for alt_name in super_name_list:
-                    for name in params[super_name].keys():
-                        if name in params[alt_name].keys():
-                            if not params[alt_name][name] ==\
-                                   params[super_name][name]:
-                                if not super_name in param_conflicts.keys():
-                                    param_conflicts[super_name] = dict()
-                                param_conflicts[super_name][name] = (
-                                    params[super_name][name],
-                                    alt_name,
-                                    params[alt_name][name])
+                for name in params[super_name].keys():
+                    for alt_name in holders[name]:
+                        if not params[alt_name][name] ==\
+                               params[super_name][name]:
+                            if not super_name in param_conflicts.keys():
+                                param_conflicts[super_name] = dict()
+                            param_conflicts[super_name][name] = (
+                                params[super_name][name],
+                                alt_name,
+                                params[alt_name][name])
 
         return params, param_conflicts, name_list, super_name_list
-
@@ -34,7 +34,7 @@ class PDim(object):
     Class holding the data from pdim.dat and its methods.
     """
 
-    def __init__(self, npar, mpvar, npar_stalk, mpaux):
+    def __init__(self):
         """
         Fill members with default values.
         """
@@ -85,7 +85,7 @@ class PDim(object):
             if np.size(lines) == 4:
                 npar, mpvar, npar_stalk, mpaux = tuple(map(int, lines))
 
-        self.npar = npar
-        self.mpvar = mpvar
-        self.npar_stalk = npar_stalk
-        self.mpaux = mpaux
+            self.npar = npar
+            self.mpvar = mpvar
+            self.npar_stalk = npar_stalk
+            self.mpaux = mpaux
@@ -16,7 +16,7 @@ def power(*args, **kwargs):
 
     call signature:
 
-    power(datadir='data', quiet=False)
+    power(datadir='data', quiet=False, tmin=None, tmax=None)
 
     Keyword arguments:
 
@@ -25,6 +25,9 @@ def power(*args, **kwargs):
 
     *quiet*
       Flag for switching off output.
+
+    *tmin*, *tmax*:
+      Only read the spectra of times tmin <= t <= tmax.
     """
 
     power_tmp = Power()
@@ -45,13 +48,13 @@ class Power(object):
         self.t = []
 
 
-    def read(self, datadir='data', quiet=False):
+    def read(self, datadir='data', quiet=False, tmin=None, tmax=None):
         """
         Read the power spectra.
 
         call signature:
 
-        power(datadir='data',quiet=False)
+        power(datadir='data', quiet=False, tmin=None, tmax=None)
 
         Keyword arguments:
 
@@ -60,6 +63,18 @@ class Power(object):
 
         *quiet*
           Flag for switching off output.
+
+        *tmin*, *tmax*:
+          Only read the spectra of times tmin <= t <= tmax. Only the times
+          of the other spectra are parsed.
+
+        Each spectrum is stored as an [nt, nk] array named after its file,
+        e.g. 'kin' for 'power_kin.dat' and 'u' for 'poweru.dat'.
+        Complex spectra ('(re, im)' pairs) are returned as complex arrays.
+        Shell-integrated spectra 'power*_xy.dat' are stored as [nt, nk] or,
+        if not integrated over z, [nt, nz, nk] arrays named e.g. 'u_xy',
+        with the shell wave numbers in 'k_u_xy' and the z-positions, if
+        written, in 'z_u_xy'.
         """
 
         import os
@@ -71,7 +86,9 @@ class Power(object):
         file_list = []
         for file_name in os.listdir(datadir):
             if file_name[:5] == 'power' and file_name[-4:] == '.dat':
-                if file_name[:6] == 'power_':
+                if file_name[-7:] == '_xy.dat':
+                    power_list.append(file_name[5:-4].lstrip('_').replace('.', '_'))
+                elif file_name[:6] == 'power_':
                     power_list.append(file_name.split('.')[0][6:])
                 else:
                     power_list.append(file_name.split('.')[0][5:])
@@ -79,45 +96,228 @@ class Power(object):
 
         # Determine the file and data structure.
         dim = read.dim(datadir=datadir)
-        block_size = np.ceil(int(dim.nxgrid/2)/8.) + 1
+        nk = int(dim.nxgrid/2)
+        block_size = int(np.ceil(nk/8.)) + 1
 
         # Read the power spectra.
         for power_idx, file_name in enumerate(file_list):
-            # For the moment, exclude some incompatible files.
-            if file_name == 'powero.dat' or file_name == 'poweru.dat' or \
-                file_name == 'powerb.dat' or file_name == 'powera.dat':
-                continue
             if not quiet:
                 print(file_name)
+            with open(os.path.join(datadir, file_name), 'rb') as infile:
+                raw = infile.read()
 
-            # Read the raw file.
-            infile = open(os.path.join(datadir, file_name), 'r')
-            line_list = infile.readlines()
-            infile.close()
-
-            # Extract the numbers from the file strings.
-            n_blocks = int(len(line_list)/block_size)
-            if not file_name == 'power_krms.dat':
-                time = []
-                power_array = []
-                for line_idx, line in enumerate(line_list):
-                    if np.mod(line_idx, block_size) == 0:
-                        time.append(float(line.strip()))
-                    else:
-                        for value_string in line.strip().split():
-                            power_array.append(float(value_string))
-
-                # Reformat into arrays.
-                time = np.array(time)
-                power_array = np.array(power_array).reshape([n_blocks, int(dim.nxgrid/2)]).astype(np.float32)
-
-                self.t = time.astype(np.float32)
+            if file_name[:10] == 'power_krms':
+                # Wave numbers, written once.
+                lines = raw.decode('ascii', 'replace').splitlines()
+                power_array = self.__parse_values(
+                    '\n'.join(lines[:block_size-1]))
+                power_array = power_array.reshape([nk]).astype(np.float32)
                 setattr(self, power_list[power_idx], power_array)
+                continue
+
+            if file_name[-7:] == '_xy.dat':
+                result = self.__read_xy(raw, dim, tmin, tmax)
+                if result is None:
+                    if not quiet:
+                        print("Skipping {0}: only shell-integrated spectra "
+                              "are supported.".format(file_name))
+                    continue
+                time, power_array, k_shell, z_pos = result
+                setattr(self, 'k_' + power_list[power_idx], k_shell)
+                if z_pos is not None:
+                    setattr(self, 'z_' + power_list[power_idx], z_pos)
             else:
-                power_array = []
-                for line_idx, line in enumerate(line_list):
-                    if line_idx < block_size-1:
-                        for value_string in line.strip().split():
-                            power_array.append(float(value_string))
-                power_array = np.array(power_array).reshape([int(dim.nxgrid/2)]).astype(np.float32)
-                setattr(self, power_list[power_idx], power_array)
+                lcomplex = b'(' in raw[:4096]
+                n_k = self.__detect_nk(raw, nk, lcomplex)
+                if n_k is None:
+                    if not quiet:
+                        print("Skipping {0}: unknown structure.".format(file_name))
+                    continue
+                time, power_array = self.__parse_blocks(
+                    raw, 1 + int(np.ceil(n_k/8.)), n_k, lcomplex, tmin, tmax)
+
+            self.t = time.astype(np.float32)
+            if np.iscomplexobj(power_array):
+                power_array = power_array.astype(np.complex64)
+            else:
+                power_array = power_array.astype(np.float32)
+            setattr(self, power_list[power_idx], power_array)
+
+
+    def __detect_nk(self, raw, nk, lcomplex):
+        """
+        Determine the number of wave numbers per spectrum from the first
+        blocks of a spectrum file. Each block is a line holding the time
+        followed by the spectrum written with 8 values per line.
+        The number nk derived from dim is preferred if it fits.
+        """
+
+        import numpy as np
+
+        head = raw[:2**16].decode('ascii', 'replace')
+        if lcomplex:
+            head = self.__strip_complex(head)
+        lines = head.split('\n')[:-1]
+        counts = [len(line.split()) for line in lines]
+        per_value = 2 if lcomplex else 1
+
+        def fits(n_k, n_min_blocks):
+            n_lines = int(np.ceil(n_k/8.))
+            n_blocks = 0
+            for start in range(0, len(counts), n_lines + 1):
+                block = counts[start:start+n_lines+1]
+                if block[0] != 1:
+                    return False
+                if len(block) == n_lines + 1:
+                    if sum(block[1:]) != n_k*per_value:
+                        return False
+                    n_blocks += 1
+            return n_blocks >= n_min_blocks
+
+        if len(counts) == 0:
+            return None
+        if fits(nk, 1):
+            return nk
+        for n_lines in range(1, len(counts)):
+            n_k = sum(counts[1:n_lines+1])//per_value
+            if n_k > 0 and fits(n_k, 2):
+                return n_k
+        return None
+
+
+    def __read_xy(self, raw, dim, tmin, tmax):
+        """
+        Read a shell-integrated spectrum file power*_xy.dat.
+        Each run writes a header with the title, the shell wave numbers
+        and possibly the z-positions, followed by a line with the time and
+        the spectrum for every output.
+        Return the times, the spectra, the wave numbers and the z-positions,
+        or None for spectra which are not shell-integrated.
+        """
+
+        import re
+        import numpy as np
+
+        text = raw.decode('ascii', 'replace')
+        lines = text[:2**20].splitlines(True)
+        if len(lines) < 2 or 'shell-integrated' not in lines[0].lower():
+            return None
+
+        def header_values(line_idx):
+            # Number in brackets of the header line, then the values.
+            n = int(re.search(r'\((\d+)\)', lines[line_idx]).group(1))
+            n_lines = int(np.ceil(n/8.))
+            values = self.__parse_values(
+                ''.join(lines[line_idx+1:line_idx+1+n_lines]))
+            return values, line_idx + 1 + n_lines
+
+        k_shell, line_idx = header_values(1)
+        n_k = k_shell.size
+        z_pos = None
+        if 'z-integrated' in lines[0].lower():
+            n_z = 1
+        elif 'positions' in lines[line_idx].lower():
+            z_pos, line_idx = header_values(line_idx)
+            n_z = z_pos.size
+        else:
+            n_z = dim.nzgrid
+
+        # Remove the headers written at every restart.
+        header = ''.join(lines[:line_idx])
+        body = text.replace(header, '').encode('ascii', 'replace')
+        lines_per_block = 1 + n_z*int(np.ceil(n_k/8.))
+        time, power_array = self.__parse_blocks(body, lines_per_block,
+                                                n_z*n_k, False, tmin, tmax)
+        if n_z > 1:
+            power_array = power_array.reshape([-1, n_z, n_k])
+        return time, power_array, k_shell.astype(np.float32), z_pos
+
+
+    def __parse_blocks(self, raw, lines_per_block, n_values, lcomplex,
+                       tmin, tmax):
+        """
+        Parse the complete blocks of lines_per_block lines, each holding the
+        time followed by n_values (complex) values. With tmin or tmax only
+        the time lines of the other blocks are parsed.
+        Return the times and the [nt, n_values] array.
+        """
+
+        import numpy as np
+
+        newlines = np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == 10)
+        n_blocks = newlines.size//lines_per_block
+        ends = newlines[lines_per_block-1::lines_per_block][:n_blocks] + 1
+        starts = np.concatenate([[0], ends[:-1]]).astype(int)
+
+        if tmin is not None or tmax is not None:
+            time_ends = newlines[0::lines_per_block][:n_blocks]
+            time = np.array([float(raw[start:end])
+                             for start, end in zip(starts, time_ends)])
+            selected = np.ones(n_blocks, dtype=bool)
+            if tmin is not None:
+                selected &= time >= tmin
+            if tmax is not None:
+                selected &= time <= tmax
+            selected = np.flatnonzero(selected)
+        else:
+            selected = np.arange(n_blocks)
+
+        # Parse runs of consecutive blocks at once.
+        n_columns = 1 + n_values*(2 if lcomplex else 1)
+        breaks = np.flatnonzero(np.diff(selected) != 1) + 1
+        chunks = []
+        for run in np.split(selected, breaks):
+            if run.size == 0:
+                continue
+            text = raw[starts[run[0]]:ends[run[-1]]].decode('ascii', 'replace')
+            if lcomplex:
+                text = self.__strip_complex(text)
+            values = self.__parse_values(text, run.size*n_columns)
+            if values.size != run.size*n_columns:
+                raise ValueError("Unexpected number of values in the "
+                                 "spectra, the file may be corrupt.")
+            chunks.append(values.reshape([run.size, n_columns]))
+        if chunks:
+            values = np.concatenate(chunks)
+        else:
+            values = np.zeros([0, n_columns])
+
+        time = values[:, 0]
+        power_array = values[:, 1:]
+        if lcomplex:
+            power_array = power_array[:, 0::2] + 1j*power_array[:, 1::2]
+        return time, power_array
+
+
+    def __strip_complex(self, text):
+        """
+        Turn the '(re,im)' pairs of complex spectra into plain values.
+        """
+
+        return text.replace('(', ' ').replace(')', ' ').replace(',', ' ')
+
+
+    def __parse_values(self, text, n_values=None):
+        """
+        Parse all numbers of text in one pass, n_values if known. Numbers
+        which overflowed the Fortran format (asterisks) become NaN and
+        exponents written without 'E' (e.g. '1.00-100') are accepted.
+        """
+
+        import re
+        import warnings
+        import numpy as np
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                values = np.fromstring(text, sep=' ')
+        except ValueError:
+            values = np.array([])
+        if n_values is None:
+            n_values = len(text.split())
+        if values.size == n_values:
+            return values
+        text = re.sub(r'\*+', ' nan ', text)
+        text = re.sub(r'(\d)([+-]\d{3})', r'\1E\2', text)
+        return np.array(text.split(), dtype=float)
@@ -1,13 +1,27 @@
+
 def pstalk(*args, **kwargs):
     """
-    Read PSTALK files from Pencil Code using IDL.
-    Uses IDL<->Python Bridge, this must be activated manually!
+    Read the stalker particle files particles_stalker.dat from Pencil Code.
 
     Args:
         - datadir      specify datadir, default False
         - sim           specify simulation from which you want to read
+        - tmin, tmax    only read the outputs with tmin <= t <= tmax,
+                        tmax < 0 reads until the last output
+        - noutmax       maximal number of outputs to be read in
+        - ipar_min, ipar_max
+                        only read the particles with ipar_min <= ipar <= ipar_max
         - swap_endian   change if needed to True, default False
         - quiet         verbosity, default False
+        - n_workers     number of threads reading the processor files, default 1
+        - cache         write all stalker data into <datadir>/pstalk.h5 and
+                        reuse it as long as the processor files are unchanged
+        - use_existing_pstalk_sav
+                        use existing <sim.datadir>/data/pc/tmp/pstalk.sav for speed up
+
+    The stalked quantities (e.g. xp, vpx, ux, rho) are stored as
+    [n_par, n_t] arrays, together with the particle indices ipar and the
+    times t.
     """
 
     var_tmp = ParticleStalkData(*args, **kwargs)
@@ -21,24 +35,34 @@ class ParticleStalkData(object):
 
     def __init__(self, datadir=False, sim=False,
                  tmin=0, tmax=-1, noutmax='-1',
-                 swap_endian=False, quiet=False, use_existing_pstalk_sav=False):
+                 swap_endian=False, quiet=False, use_existing_pstalk_sav=False,
+                 ipar_min=None, ipar_max=None, n_workers=1, cache=False):
         """
-        Read PSTALK files from Pencil Code using IDL.
-        Uses IDL<->Python Bridge, this must be activated manually!
+        Read the stalker particle files particles_stalker.dat from Pencil Code.
 
         Args:
             - datadir      specify datadir, default False
             - sim           specify simulation from which you want to read
+            - tmin, tmax    only read the outputs with tmin <= t <= tmax,
+                            tmax < 0 reads until the last output
+            - noutmax       maximal number of outputs to be read in
+            - ipar_min, ipar_max
+                            only read the particles with ipar_min <= ipar <= ipar_max
             - swap_endian   change if needed to True, default False
             - quiet         verbosity, default False
+            - n_workers     number of threads reading the processor files, default 1
+            - cache         write all stalker data into <datadir>/pstalk.h5 and
+                            reuse it as long as the processor files are unchanged
             - use_existing_pstalk_sav
                             use existing <sim.datadir>/data/pc/tmp/pstalk.sav for speed up
 
-
+        Every processor appends to its particles_stalker.dat the records
+        (t, nv), ipar(1:nv) and the stalked quantities (nvar, nv) at each
+        stalker output, with the quantities listed in
+        particles_stalker_header.dat. Particles missing at an output,
+        e.g. after being removed, are NaN.
         """
 
-        import numpy as np
-        import os
         from os.path import join
         from .. import get_sim
 
@@ -47,16 +71,6 @@ class ParticleStalkData(object):
                 sim = get_sim()
             datadir = sim.datadir
 
-        if quiet == False:
-            quiet = '0'
-        else:
-            quiet = '1'
-
-        if swap_endian == False:
-            swap_endian = '0'
-        else:
-            swap_endian = '1'
-
         if use_existing_pstalk_sav == True:
             from scipy.io.idl import readsav
 
@@ -67,54 +81,282 @@ class ParticleStalkData(object):
             for key in set(ps.dtype.fields.keys()):
                 if hasattr(self, key.lower()): continue
                 setattr(self, key.lower(), ps[key][0].T)
+            return
+
+        if tmax is not None and tmax < 0:
+            tmax = None
+        noutmax = int(noutmax)
+
+        cache_file = join(datadir, 'pstalk.h5')
+        signature = self.__signature(datadir)
+        if cache and self.__cache_valid(cache_file, signature):
+            if not quiet:
+                print('~ reading pstalk from '+cache_file+'..')
+            self.__read_cache(cache_file, tmin, tmax, noutmax,
+                              ipar_min, ipar_max)
+            return
+
+        if not quiet:
+            print('~ reading pstalk from '+str(len(signature))+' processors..')
+        if cache:
+            # The cache holds all outputs and particles.
+            data = self.__read_procs(datadir, signature, None, None, -1,
+                                     None, None, swap_endian, n_workers)
+            self.__write_cache(cache_file, signature, data)
+            if not quiet:
+                print('~ written '+cache_file)
+            t_indices = self.__select_times(data['t'], tmin, tmax, noutmax)
+            p_indices = self.__select_ipar(data['ipar'], ipar_min, ipar_max)
+            self.t = data['t'][t_indices]
+            self.ipar = data['ipar'][p_indices]
+            for name in data['names']:
+                setattr(self, name,
+                        data[name][p_indices][:, t_indices])
+        else:
+            data = self.__read_procs(datadir, signature, tmin, tmax, noutmax,
+                                     ipar_min, ipar_max, swap_endian,
+                                     n_workers)
+            self.t = data['t']
+            self.ipar = data['ipar']
+            for name in data['names']:
+                setattr(self, name, data[name])
+
+
+    def __signature(self, datadir):
+        """
+        Return the (file name, mtime, size) of the stalker files of all
+        processors.
+        """
+
+        import os
+        from .. import read
+        from .metadata_cache import file_signature
+
+        dim = read.dim(datadir=datadir)
+        n_procs = dim.nprocx*dim.nprocy*dim.nprocz
+        return file_signature([os.path.join(datadir, 'proc{0}'.format(proc),
+                                            'particles_stalker.dat')
+                               for proc in range(n_procs)])
+
+
+    def __select_times(self, t, tmin, tmax, noutmax):
+        """
+        Return the indices of the times t within [tmin, tmax], at most
+        noutmax of them.
+        """
+
+        import numpy as np
+
+        selected = np.ones(len(t), dtype=bool)
+        if tmin is not None:
+            selected &= t >= tmin
+        if tmax is not None:
+            selected &= t <= tmax
+        t_indices = np.flatnonzero(selected)
+        if noutmax > 0:
+            t_indices = t_indices[:noutmax]
+        return t_indices
+
+
+    def __select_ipar(self, ipar, ipar_min, ipar_max):
+        """
+        Return the indices of the sorted particle indices ipar within
+        [ipar_min, ipar_max].
+        """
+
+        import numpy as np
+
+        start, stop = 0, len(ipar)
+        if ipar_min is not None:
+            start = np.searchsorted(ipar, ipar_min, side='left')
+        if ipar_max is not None:
+            stop = np.searchsorted(ipar, ipar_max, side='right')
+        return np.arange(start, max(start, stop))
+
+
+    def __read_procs(self, datadir, signature, tmin, tmax, noutmax,
+                     ipar_min, ipar_max, swap_endian, n_workers):
+        """
+        Read the stalker files of all processors and sort the selected
+        outputs and particles into [n_par, n_t] arrays.
+        Return a dictionary with the times 't', the particle indices 'ipar',
+        the names of the quantities 'names' and their arrays.
+        """
+
+        import os
+        import numpy as np
+        from concurrent.futures import ThreadPoolExecutor
+
+        with open(os.path.join(datadir, 'particles_stalker_header.dat')) as header_file:
+            names = [name.strip() for name in header_file.readline().split(',')
+                     if name.strip()]
+        n_vars = len(names)
+        byteorder = '>' if swap_endian and np.little_endian else \
+                    '<' if swap_endian else '='
+        int32 = np.dtype(byteorder + 'i4')
+
+        def run(function, items):
+            if n_workers > 1 and len(items) > 1:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    return list(executor.map(function, items))
+            return [function(item) for item in items]
+
+        def scan(file_name):
+            # Locate the outputs of one processor file. The file is memory
+            # mapped, so only the records read are loaded.
+            if os.path.getsize(file_name) > 0:
+                raw = np.memmap(file_name, dtype=np.uint8, mode='r')
+            else:
+                raw = np.zeros(0, dtype=np.uint8)
+            dumps = []
+            position = 0
+            real = None
+            while position + 4 <= len(raw):
+                marker = int(np.frombuffer(raw, dtype=int32, count=1,
+                                           offset=position)[0])
+                if real is None:
+                    if marker not in (8, 12):
+                        raise ValueError("{0} is not a stalker file, check "
+                                         "swap_endian.".format(file_name))
+                    real = np.dtype(byteorder + ('f4' if marker == 8 else 'f8'))
+                if marker != real.itemsize + 4 or position + 8 + marker > len(raw):
+                    break
+                t = float(np.frombuffer(raw, dtype=real, count=1,
+                                        offset=position+4)[0])
+                nv = int(np.frombuffer(raw, dtype=int32, count=1,
+                                       offset=position+4+real.itemsize)[0])
+                position += 8 + marker
+                ipar_offset = data_offset = None
+                if nv > 0:
+                    ipar_offset = position + 4
+                    position += 8 + 4*nv
+                    if n_vars > 0:
+                        data_offset = position + 4
+                        position += 8 + nv*n_vars*real.itemsize
+                    if position > len(raw):
+                        # Output still being written.
+                        break
+                dumps.append((t, nv, ipar_offset, data_offset))
+            return raw, real, dumps
+
+        proc_files = [file_name for file_name, mtime, size in signature
+                      if mtime is not None]
+        for file_name, mtime, size in signature:
+            if mtime is None:
+                print("Missing file {0}.".format(file_name))
+        scans = run(scan, proc_files)
+        scans = [scan_result for scan_result in scans if scan_result[1] is not None]
 
+        # All processors write at every output, so the outputs of the
+        # processors correspond to each other.
+        n_dumps = min([len(dumps) for raw, real, dumps in scans] or [0])
+        if scans:
+            real = scans[0][1]
+            t = np.array([dump[0] for dump in scans[0][2][:n_dumps]])
         else:
-            try:
-                cwd = os.getcwd()
-                from idlpy import IDL
-                os.chdir(cwd)
-
-                print('~ reading pstalk in IDL..')
-
-                idl_call = ', '.join(['pc_read_pstalk', 'obj=pstalk', 'datadir="'+datadir+'"', 'it0='+str(tmin), 'it1='+str(tmax), 'quiet='+quiet, 'swap_endian='+swap_endian, 'noutmax='+str(noutmax)])
-
-                IDL.run(idl_call)
-
-                print('~ parsing pstalk from IDL to python..')
-                ps = IDL.pstalk
-
-                for key in set(ps.keys()):
-                    if hasattr(self, key.lower()): continue
-                    setattr(self, key.lower(), ps[key].T)
-
-            except:
-                print('! ERROR: no idl<->python bridge found. Try whats written in pstalk-comment to fix that issue.')
-                print('! ')
-                print('! Use something like: (ensure you have IDL 8.5.1 or larger)')
-                print('! export PYTHONPATH=$PYTHONPATH:$IDL_HOME/lib/bridges:$IDL_HOME/bin/bin.linux.x86_64')
-                print('! export LD_LIBRARY_PATH=$LD_LIBRARY_PATH:/usr/lib64:$IDL_HOME/bin/bin.linux.x86_64')
-                print('! in your .bashrc')
-                print('! ')
-                print('! If you have it already installed, try: from idlpy import IDL and check for errors')
-                print('! ')
-                print('~ BACKUP SOLUTION: reading pstalk via pidly, starting IDL..')
-
-                from ..backpack import pidly
-                IDL = pidly.IDL(long_delay=0.05)	# start IDL engine
-                from scipy.io.idl import readsav
-                from ..io import mkdir
-
-                ## read tstalk file
-                print('## reading particle stalker file..')
-                IDL('pc_read_pstalk, object=pstalk, datadir="'+sim.datadir+'"'+', quiet='+quiet+', it0='+str(tmin)+', it1='+str(tmax)+', swap_endian='+swap_endian)
-
-                print('## transfering pstalk file from IDL to python..')
-                mkdir(join(sim.pc_datadir,'tmp'))
-                IDL('save, pstalk, filename="'+join(sim.pc_datadir,'tmp','pstalk_'+str(tmin)+'_'+str(tmax)+'.sav')+'"')
-                ps = readsav(join(sim.pc_datadir,'tmp','pstalk.sav'))('pstalk')
-
-                #from pc.io import debug_breakpoint; debug_breakpoint()
-
-                for key in set(ps.dtype.fields.keys()):
-                    if hasattr(self, key.lower()): continue
-                    setattr(self, key.lower(), ps[key][0].T)
+            real = np.dtype('f8')
+            t = np.zeros(0)
+        t_indices = self.__select_times(t, tmin, tmax, noutmax)
+
+        def read_ipar(scan_result):
+            raw, real, dumps = scan_result
+            ipar = [np.frombuffer(raw, dtype=int32, count=dumps[it][1],
+                                  offset=dumps[it][2])
+                    for it in t_indices if dumps[it][1] > 0]
+            return np.unique(np.concatenate(ipar)) if ipar else np.zeros(0, dtype=int)
+
+        ipar = np.unique(np.concatenate([np.zeros(0, dtype=int)] +
+                                        run(read_ipar, scans))).astype(np.int32)
+        ipar = ipar[self.__select_ipar(ipar, ipar_min, ipar_max)]
+
+        data = {'t': t[t_indices], 'ipar': ipar, 'names': names}
+        values = np.full((n_vars, ipar.size, t_indices.size), np.nan,
+                         dtype=real.newbyteorder('='))
+        for idx, name in enumerate(names):
+            data[name] = values[idx]
+
+        def read_values(scan_result):
+            # Each particle is at one processor per output, so the
+            # processors fill disjoint parts of the arrays.
+            raw, real, dumps = scan_result
+            for idx, it in enumerate(t_indices):
+                nv, ipar_offset, data_offset = dumps[it][1:]
+                if nv == 0 or data_offset is None:
+                    continue
+                ids = np.frombuffer(raw, dtype=int32, count=nv, offset=ipar_offset)
+                positions = np.searchsorted(ipar, ids)
+                found = positions < ipar.size
+                found[found] = ipar[positions[found]] == ids[found]
+                record = np.frombuffer(raw, dtype=real, count=nv*n_vars,
+                                       offset=data_offset).reshape(nv, n_vars)
+                values[:, positions[found], idx] = record[found].T
+
+        run(read_values, scans)
+        return data
+
+
+    def __cache_valid(self, cache_file, signature):
+        """
+        Check if the cache file was written from the current stalker files.
+        """
+
+        import os
+        import numpy as np
+        import h5py
+
+        if not os.path.exists(cache_file):
+            return False
+        with h5py.File(cache_file, 'r') as cache:
+            return np.array_equal(cache.attrs.get('sizes'),
+                                  [size or -1 for name, mtime, size in signature]) and \
+                   np.array_equal(cache.attrs.get('mtimes'),
+                                  [mtime or -1 for name, mtime, size in signature])
+
+
+    def __write_cache(self, cache_file, signature, data):
+        """
+        Write the stalker data into one HDF5 file with the datasets 't',
+        'ipar' and one [n_par, n_t] dataset per quantity.
+        """
+
+        import os
+        import numpy as np
+        import h5py
+
+        with h5py.File(cache_file + '.tmp', 'w') as cache:
+            cache.attrs['sizes'] = [size or -1 for name, mtime, size in signature]
+            cache.attrs['mtimes'] = [mtime or -1 for name, mtime, size in signature]
+            cache.attrs['names'] = np.array(data['names'], dtype='S')
+            cache.create_dataset('t', data=data['t'])
+            cache.create_dataset('ipar', data=data['ipar'])
+            for name in data['names']:
+                cache.create_dataset(name, data=data[name])
+        os.replace(cache_file + '.tmp', cache_file)
+
+
+    def __read_cache(self, cache_file, tmin, tmax, noutmax, ipar_min, ipar_max):
+        """
+        Read the selected outputs and particles from the cache file.
+        """
+
+        import h5py
+
+        with h5py.File(cache_file, 'r') as cache:
+            t = cache['t'][()]
+            ipar = cache['ipar'][()]
+            t_indices = self.__select_times(t, tmin, tmax, noutmax)
+            p_indices = self.__select_ipar(ipar, ipar_min, ipar_max)
+            # Read contiguous selections as one hyperslab.
+            if t_indices.size == 0:
+                t_slice = slice(0, 0)
+            elif t_indices[-1] - t_indices[0] + 1 == t_indices.size:
+                t_slice = slice(t_indices[0], t_indices[-1] + 1)
+            else:
+                t_slice = list(t_indices)
+            p_slice = slice(p_indices[0], p_indices[-1] + 1) \
+                      if p_indices.size else slice(0, 0)
+            self.t = t[t_slice]
+            self.ipar = ipar[p_slice]
+            for name in cache.attrs['names']:
+                name = name.decode()
+                setattr(self, name, cache[name][p_slice, t_slice])
@@ -1,19 +1,24 @@
 def pvar(*args, **kwargs):
     """
-    Read PVAR files from Pencil Code using IDL. Does also work with block decomposition.
-    Uses IDL<->Python Bridge, this must be activated manually!
-
-    !! WARNING: SHAPE IS AS IN IDL: (X, Y, Z) !!
+    Read PVAR files from Pencil Code. Does also work with block decomposition.
 
     Args:
         - varfile       put 'PVARXYZ' or just number here, 'VAR' will be replaced by 'PVAR' autom.
         - npar_max      maximal number of particles to be read in
+        - variables     list of particle variables to be read, e.g. ['xp', 'vpx'],
+                        default: all
 
         - datadir      specify datadir, default False
         - sim           specify simulation from which you want to read
         - proc          read from single proc, set number here
         - swap_endian   change if needed to True, default False
         - quiet         verbosity, default False
+        - n_workers     number of threads reading the processor files, default 1
+
+    The particle variables are stored as attributes named after the particle
+    index, e.g. xp, yp, zp, vpx, vpy, vpz, ap, together with their index ipar
+    and the time t. For binary snapshots they are views of the structured
+    array 'particles'.
 
     If needed add manually to this script:
         - rmv, irmv, trmv, oldrmv are used for ???
@@ -29,20 +34,19 @@ def pvar(*args, **kwargs):
 
 class ParticleData(object):
     """
-    Read PVAR files from Pencil Code using IDL.
-    Uses IDL<->Python Bridge, this must be activated manually!
-
-    !! WARNING: SHAPE IS AS IN IDL: (X, Y, Z) !!
+    Read PVAR files from Pencil Code.
 
     Args:
         - datadir      specify datadir, default False
         - sim           specify simulation from which you want to read
         - varfile       put 'PVARXYZ' or just number here, 'VAR' will be replaced by 'PVAR' autom.
         - npar_max      maximal number of particles to be read in
+        - variables     list of particle variables to be read, default: all
 
         - proc          read from single proc, set number here
         - swap_endian   change if needed to True, default False
         - quiet         verbosity, default False
+        - n_workers     number of threads reading the processor files, default 1
 
     If needed add manually to this script:
         - rmv, irmv, trmv, oldrmv are used for ???
@@ -53,67 +57,50 @@ class ParticleData(object):
     """
 
     def __init__(self, varfile='pvar.dat', npar_max=-1,
-                 datadir=False, sim=False, proc=-1, swap_endian=False, quiet=False, DEBUG=False):
+                 datadir=False, sim=False, proc=-1, swap_endian=False, quiet=False, DEBUG=False,
+                 variables=None, n_workers=1):
         """
-        Read PVAR files from Pencil Code using IDL.
-        Uses IDL<->Python Bridge, this must be activated manually!
+        Read PVAR files from Pencil Code.
 
         Args:
             - datadir      specify datadir, default False
             - sim           specify simulation from which you want to read
             - varfile       put 'PVARXYZ' or just number here, 'VAR' will be replaced by 'PVAR' autom.
             - npar_max      maximal number of particles to be read in
+            - variables     list of particle variables to be read, default: all
 
             - proc          read from single proc, set number here
             - swap_endian   change if needed to True, default False
             - quiet         verbosity, default False
+            - n_workers     number of threads reading the processor files, default 1
+
+        Binary snapshots are read from the processor directories, using
+        pdim.dat for the number of particle variables and
+        particle_index.pro (or pvarname.dat for older runs) for their names.
+        The particles are stored in the order of the processors.
 
         """
 
-        import numpy as np
         import os
         from .. import get_sim
         from ..math import is_number
-        from sys import byteorder
 
         ####### interpret parameters
         if datadir == False:
             if sim == False:
                 sim = get_sim()
-        datadir = sim.datadir
+            datadir = sim.datadir
 
         l_h5 = False
         if os.path.exists(os.path.join(datadir,'grid.h5')):
             l_h5 = True
-            import h5py 
-        if not l_h5:
-            try:
-                cwd = os.getcwd()
-                from idlpy import IDL
-                os.chdir(cwd)
-
-            except:
-                print('! ERROR: no idl<->python bridge found. Try whats written in pstalk-comment to fix that issue.')
-                print('! ')
-                print('! Use something like: (ensure you have IDL 8.5.1 or larger)')
-                print('! export PYTHONPATH=$PYTHONPATH:$IDL_HOME/lib/bridges:$IDL_HOME/bin/bin.linux.x86_64')
-                print('! export LD_LIBRARY_PATH=$LD_LIBRARY_PATH:/usr/lib64:$IDL_HOME/bin/bin.linux.x86_64')
-                print('! in your .bashrc')
-                print('! ')
-                return None
-
-        if not l_h5:
-            if quiet == False:
-                quiet = '0'
-            else:
-                quiet = '1'
+            import h5py
 
-            if swap_endian == False:
-                if byteorder == 'little': swap_endian = '0'
-                elif byteorder == 'big': swap_endian = '1'
-            else: print('? WARNING: Couldnt determine endianness!')
+        if variables is not None:
+            if isinstance(variables, str):
+                variables = [variables]
+            variables = [variable.lower() for variable in variables]
 
-        ####### preparing IDL call
         # cleanup of varfile string
         if is_number(varfile): varfile = 'PVAR'+str(varfile)
         varfile = str(varfile)
@@ -123,37 +110,183 @@ class ParticleData(object):
             varfile = str.strip(varfile,'.dat')+'.h5'
             with h5py.File(os.path.join(datadir,'allprocs',varfile),'r') as hf:
                 for key in hf['part'].keys():
-                    setattr(self, key.lower(), hf['part'][key][()])
+                    if variables is not None and key.lower() not in variables:
+                        continue
+                    if npar_max > 0:
+                        setattr(self, key.lower(), hf['part'][key][:npar_max])
+                    else:
+                        setattr(self, key.lower(), hf['part'][key][()])
         #
         else:
-            idl_call = ', '.join(['pc_read_pvar',
-                                  'obj=pvar',
-                                  'varfile="'+varfile+'"',
-                                  'datadir="'+datadir+'"',
-                                  'quiet='+quiet,
-                                  'swap_endian='+swap_endian,
-                                  'proc='+str(proc)
-                                  ])
-
-            # reduce number of particles to be read in
-            if npar_max > 0: idl_call= idl_call+', npar_max='+str(npar_max)
-
-            ####### show idl_call string if DEBUG
-            if DEBUG == True: print('~ DEBUG: idl_call: '+idl_call)
-
-            ###### read in var file in IDL
-            print('~ reading '+varfile+' in IDL..')
-            IDL.run(idl_call)
-
-            ####### parse to python
-            print('~ parsing PVAR from IDL to python..')
-            pvar = IDL.pvar
-
-            for key in pvar.keys():
-                setattr(self, key.lower(), pvar[key])
-            setattr(self, 'xp', pvar['XX'][0])
-            setattr(self, 'yp', pvar['XX'][1])
-            setattr(self, 'zp', pvar['XX'][2])
-            setattr(self, 'vpx', pvar['VV'][0])
-            setattr(self, 'vpy', pvar['VV'][1])
-            setattr(self, 'vpz', pvar['VV'][2])
+            if DEBUG == True: print('~ DEBUG: reading '+varfile+' from '+datadir)
+            self.__read_binary(datadir, varfile, npar_max, proc, swap_endian,
+                               variables, n_workers, quiet)
+
+
+    def __read_binary(self, datadir, varfile, npar_max, proc, swap_endian,
+                      variables, n_workers, quiet):
+        """
+        Read the particle snapshot varfile of all processors, or of proc,
+        into one structured array.
+        Each processor file holds the records nv, ipar(1:nv), fp(1:nv,:) and
+        t, x, y, z, dx, dy, dz, where the first three are only written for
+        nv > 0.
+        """
+
+        import os
+        import numpy as np
+        from concurrent.futures import ThreadPoolExecutor
+        from .. import read
+
+        dim = read.dim(datadir=datadir)
+        pdim = read.pdim(datadir=datadir)
+        if dim.precision == 'D':
+            precision = 'd'
+        else:
+            precision = 'f'
+        if swap_endian:
+            byteorder = '>' if np.little_endian else '<'
+        else:
+            byteorder = '='
+        real = np.dtype(byteorder + precision)
+        int32 = np.dtype(byteorder + 'i4')
+        n_columns = pdim.mpvar + pdim.mpaux
+
+        # Particle variables and their column in the fp array.
+        columns = self.__particle_columns(datadir)
+        if variables is None:
+            variables = [name for name in columns if columns[name] < n_columns]
+        else:
+            for name in variables:
+                if name not in columns:
+                    print("Particle variable {0} not found.".format(name))
+            variables = [name for name in variables
+                         if name in columns and columns[name] < n_columns]
+
+        if proc >= 0:
+            procs = [proc]
+        else:
+            procs = range(dim.nprocx*dim.nprocy*dim.nprocz)
+
+        def run(function, items):
+            if n_workers > 1 and len(items) > 1:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    return list(executor.map(function, items))
+            return [function(item) for item in items]
+
+        def scan(proc_idx):
+            # Locate the records of one processor file.
+            file_name = os.path.join(datadir, 'proc{0}'.format(proc_idx), varfile)
+            if not os.path.exists(file_name):
+                print("Missing file {0}.".format(file_name))
+                return None
+            with open(file_name, 'rb') as infile:
+                head = np.fromfile(infile, dtype=int32, count=3)
+                if head.size < 3 or head[0] != 4 or head[2] != 4:
+                    raise ValueError("{0} is not a particle snapshot, check "
+                                     "swap_endian.".format(file_name))
+                nv = int(head[1])
+                ipar_offset = 12 + 4
+                data_offset = ipar_offset + 4*nv + 8
+                if nv > 0:
+                    infile.seek(ipar_offset - 4)
+                    marker = np.fromfile(infile, dtype=int32, count=1)
+                    infile.seek(data_offset - 4)
+                    n_bytes = np.fromfile(infile, dtype=int32, count=1)
+                    if marker.size < 1 or marker[0] != 4*nv or \
+                       n_bytes.size < 1 or \
+                       n_bytes[0] != nv*n_columns*real.itemsize:
+                        raise ValueError("Records of {0} do not match pdim.dat."
+                                         .format(file_name))
+                    infile.seek(data_offset + int(n_bytes[0]) + 4)
+                # Skip the marker of the time and grid record.
+                infile.seek(4, 1)
+                t = np.fromfile(infile, dtype=real, count=1)
+            return {'file_name': file_name, 'nv': nv, 'ipar_offset': ipar_offset,
+                    'data_offset': data_offset, 't': t[0] if t.size else np.nan}
+
+        proc_files = [proc_file for proc_file in run(scan, list(procs))
+                      if proc_file is not None]
+
+        # Preallocate the particles, at most npar_max.
+        n_total = sum(proc_file['nv'] for proc_file in proc_files)
+        if npar_max > 0:
+            n_total = min(n_total, npar_max)
+        start = 0
+        for proc_file in proc_files:
+            proc_file['start'] = start
+            proc_file['n_read'] = min(proc_file['nv'], n_total - start)
+            start += proc_file['n_read']
+        particles = np.empty(n_total, dtype=[('ipar', np.int32)] +
+                             [(name, precision) for name in variables])
+
+        def read_proc(proc_file):
+            # Read the selected columns of one processor into its place.
+            nv, n_read = proc_file['nv'], proc_file['n_read']
+            if n_read == 0:
+                return
+            dst = slice(proc_file['start'], proc_file['start'] + n_read)
+            with open(proc_file['file_name'], 'rb') as infile:
+                buffer = np.empty(n_read, dtype=int32)
+                infile.seek(proc_file['ipar_offset'])
+                n_bytes = infile.readinto(buffer)
+                particles['ipar'][dst] = buffer
+                buffer = np.empty(n_read, dtype=real)
+                for name in variables:
+                    infile.seek(proc_file['data_offset'] +
+                                columns[name]*nv*real.itemsize)
+                    n_bytes += infile.readinto(buffer)
+                    particles[name][dst] = buffer
+            if n_bytes != n_read*(4 + len(variables)*real.itemsize):
+                raise ValueError("{0} is truncated.".format(proc_file['file_name']))
+
+        if not quiet:
+            print('~ reading {0} particles from {1} processors..'.format(
+                n_total, len(proc_files)))
+        run(read_proc, proc_files)
+
+        self.particles = particles
+        self.npar = n_total
+        if proc_files:
+            self.t = proc_files[0]['t']
+        for name in particles.dtype.names:
+            setattr(self, name, particles[name])
+
+
+    def __particle_columns(self, datadir):
+        """
+        Return the dictionary of the particle variable names and their
+        (zero based) column in the fp array, read from particle_index.pro
+        or, for older runs, pvarname.dat.
+        Names are lower case without the leading 'i', as in HDF5 snapshots.
+        """
+
+        import os
+
+        columns = {}
+        file_name = os.path.join(datadir, 'particle_index.pro')
+        if os.path.exists(file_name):
+            with open(file_name) as index_file:
+                for line in index_file:
+                    if '=' not in line:
+                        continue
+                    name, value = line.split('=', 1)
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        continue
+                    if value > 0:
+                        columns[name.strip()[1:].lower()] = value - 1
+            return columns
+
+        file_name = os.path.join(datadir, 'pvarname.dat')
+        if os.path.exists(file_name):
+            with open(file_name) as name_file:
+                for line in name_file:
+                    fields = line.split()
+                    if len(fields) == 2:
+                        columns[fields[1][1:].lower()] = int(fields[0]) - 1
+        else:
+            print("Neither particle_index.pro nor pvarname.dat found "
+                  "in {0}.".format(datadir))
+        return columns
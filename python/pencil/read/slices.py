@@ -7,6 +7,10 @@
 Contains the classes and methods to read slice files.
 """
 
+# Times of the frames of HDF5 slice files, by file name.
+_time_index = {}
+
+
 def slices(*args, **kwargs):
     """
     Read Pencil Code slice data.
@@ -14,7 +18,8 @@ def slices(*args, **kwargs):
     call signature:
 
     read(field='', extension='', datadir='data', proc=-1,
-         old_file=False, precision='f', iter_list=None, quiet=True)
+         old_file=False, precision='f', iter_list=None, quiet=True,
+         tmin=None, tmax=None, cache_times=True)
 
     Keyword arguments:
 
@@ -37,13 +42,20 @@ def slices(*args, **kwargs):
       Precision of the data. Either float 'f' or double 'd'.
 
    *iter_list*
-     list of iteration indices for which to sample the slices
+     list of frame indices for which to sample the slices
 
    *vlarge*
-     size of arrays over which memory limits reshaping
+     unused, binary slice files are memory mapped
 
     *quiet*:
       Print progress if False
+
+    *tmin*, *tmax*:
+      Only read the frames with tmin <= t <= tmax.
+
+    *cache_times*:
+      Keep the times of HDF5 slice files in memory, so that later reads
+      only read the times of new frames.
     """
 
     slices_tmp = SliceSeries()
@@ -51,6 +63,53 @@ def slices(*args, **kwargs):
     return slices_tmp
 
 
+def slices_iter(*args, **kwargs):
+    """
+    Iterate over the frames of a Pencil Code slice, reading one frame at a
+    time. Yields (t, plane) for each frame, where plane is a 2D array.
+
+    call signature:
+
+    slices_iter(field, extension, datadir='data', proc=-1,
+                old_file=False, iter_list=None, tmin=None, tmax=None,
+                cache_times=True, frame_index=False)
+
+    Keyword arguments:
+
+    *field*:
+      Name of the field to be read.
+
+    *extension*
+      Specifies the slice, e.g. 'xy'.
+
+    *datadir*:
+      Directory where the data is stored.
+
+    *proc*:
+      Processor to be read. If -1 read the global slice file, or assemble
+      the planes from the processor slice files if there is none.
+
+    *old_file*
+      Flag for reading old file format.
+
+    *iter_list*
+      list of frame indices for which to sample the slices
+
+    *tmin*, *tmax*:
+      Only read the frames with tmin <= t <= tmax.
+
+    *cache_times*:
+      Keep the times of HDF5 slice files in memory, so that later reads
+      only read the times of new frames.
+
+    *frame_index*:
+      Yield (index, t, plane), with the index of the frame in the file.
+    """
+
+    slices_tmp = SliceSeries()
+    return slices_tmp.iter_frames(*args, **kwargs)
+
+
 class SliceSeries(object):
     """
     SliceSeries -- holds Pencil Code slices data and methods.
@@ -66,10 +125,119 @@ class SliceSeries(object):
         self.t = np.array([])
 
 
+    def __plane_shape(self, extension, dim):
+        """
+        Return the (vertical, horizontal) shape of a slice plane, or None
+        for unknown extensions.
+        """
+
+        if extension[:2] in ('xy', 'Xy'):
+            return (dim.ny, dim.nx)
+        if extension[:2] == 'xz':
+            return (dim.nz, dim.nx)
+        if extension[:2] == 'yz':
+            return (dim.nz, dim.ny)
+        return None
+
+
+    def __map_frames(self, file_name, plane_shape, precision, old_file):
+        """
+        Memory map a binary slice file as an array of frame records.
+        Each Fortran record holds the plane, the time and (unless old_file)
+        the position of the slice. Frames still being written are ignored.
+        """
+
+        import numpy as np
+        import os
+
+        fields = [('head', np.uint32), ('data', precision, plane_shape),
+                  ('t', precision)]
+        if not old_file:
+            fields.append(('position', precision))
+        fields.append(('tail', np.uint32))
+        dtype = np.dtype(fields)
+
+        n_frames = os.path.getsize(file_name)//dtype.itemsize
+        if n_frames == 0:
+            return np.zeros(0, dtype=dtype)
+        frames = np.memmap(file_name, dtype=dtype, mode='r',
+                           shape=(n_frames,))
+        if frames[0]['head'] != dtype.itemsize - 8:
+            raise ValueError("Record size in {0} does not match the slice "
+                             "dimensions {1}.".format(file_name, plane_shape))
+        return frames
+
+
+    def __open_h5(self, file_name):
+        """
+        Open an HDF5 slice file read-only, such that it can be read while
+        the simulation or other processes are writing to it.
+        """
+
+        import h5py
+
+        try:
+            return h5py.File(file_name, 'r', swmr=True, locking=False)
+        except (TypeError, ValueError, OSError):
+            # Older h5py or HDF5 versions.
+            return h5py.File(file_name, 'r')
+
+
+    def __h5_times(self, ds, file_name, nt, cache_times):
+        """
+        Read the times of the frames 1 to nt of an open HDF5 slice file,
+        NaN for missing frames. With cache_times, only the times of frames
+        added since the last read are read.
+        """
+
+        import numpy as np
+        import os
+
+        def read_time(it):
+            group = ds.get(str(it+1))
+            if group is None:
+                return np.nan
+            return group['time'][()]
+
+        key = os.path.abspath(file_name)
+        t = _time_index.get(key, np.array([])) if cache_times else \
+            np.array([])
+        # A rewritten file has different times.
+        if t.size > 0 and (t.size > nt or not
+                           np.array_equal(t[[0, -1]], [read_time(0),
+                                                       read_time(t.size-1)],
+                                          equal_nan=True)):
+            t = np.array([])
+        t = np.concatenate([t, [read_time(it) for it in range(t.size, nt)]])
+        if cache_times:
+            _time_index[key] = t
+        return t
+
+
+    def __select_frames(self, t, iter_list, tmin, tmax):
+        """
+        Return the indices of the frames selected by iter_list and the
+        time range.
+        """
+
+        import numpy as np
+
+        if iter_list is None:
+            frame_list = np.arange(t.size)
+        else:
+            frame_list = np.asarray(iter_list, dtype=int).ravel()
+            frame_list = frame_list[frame_list < t.size]
+        if tmin is not None:
+            frame_list = frame_list[t[frame_list] >= tmin]
+        if tmax is not None:
+            frame_list = frame_list[t[frame_list] <= tmax]
+        return frame_list
+
+
     def read(self, field='', extension='', datadir='data', proc=-1,
              old_file=False, precision='f',
              iter_list=None, vlarge=1000000000,
-             quiet=True
+             quiet=True, tmin=None, tmax=None, cache_times=True
             ):
         """
         Read Pencil Code slice data.
@@ -77,7 +245,8 @@ class SliceSeries(object):
         call signature:
 
         read(field='', extension='', datadir='data', proc=-1,
-             old_file=False, precision='f', quiet=True)
+             old_file=False, precision='f', iter_list=None, quiet=True,
+             tmin=None, tmax=None, cache_times=True)
 
         Keyword arguments:
 
@@ -100,24 +269,29 @@ class SliceSeries(object):
           Precision of the data. Either float 'f' or double 'd'.
 
         *iter_list*
-          list of iteration indices for which to sample the slices
+          list of frame indices for which to sample the slices
 
         *vlarge*
-          size of arrays over which memory limits reshaping
+          unused, binary slice files are memory mapped
 
         *quiet*:
           Print progress
+
+        *tmin*, *tmax*:
+          Only read the frames with tmin <= t <= tmax.
+
+        *cache_times*:
+          Keep the times of HDF5 slice files in memory, so that later reads
+          only read the times of new frames.
         """
 
         import os
         import sys
         import numpy as np
-        from scipy.io import FortranFile
         from .. import read
 
         if os.path.exists(os.path.join(datadir, 'grid.h5')):
             l_h5 = True
-            import h5py
         else:
             l_h5 = False
 
@@ -169,23 +343,23 @@ class SliceSeries(object):
                     #Compose the file name according to field & extension.
                     file_name = os.path.join(slice_dir,
                                              field+'_'+extension+'.h5')
-                    with h5py.File(file_name, 'a') as ds:
-                        if not isinstance(nt, int):
-                            nt = ds['last'][0]
-                        vsize = ds['1/data'].shape[0]
-                        hsize = ds['1/data'].shape[1]
-                        slice_series = np.zeros([nt,vsize,hsize])
-                        for it in range(0,nt):
-                            if ds.__contains__(str(it+1)):
-                                slice_series[it] = ds[str(it+1)+'/data'][()]
+                    with self.__open_h5(file_name) as ds:
+                        nt = int(ds['last'][0])
+                        t = self.__h5_times(ds, file_name, nt, cache_times)
+                        frame_list = self.__select_frames(t, iter_list,
+                                                          tmin, tmax)
+                        vsize, hsize = ds['1/data'].shape
+                        slice_series = np.zeros([len(frame_list), vsize,
+                                                 hsize])
+                        for k, it in enumerate(frame_list):
+                            group = ds.get(str(it+1))
+                            if group is not None:
+                                group['data'].read_direct(slice_series[k])
                             else:
                                 print('no data at {} in '.format(it+1)+
                                       file_name)
                         if self.t.size == 0:
-                            self.t = []
-                            for it in range(0,nt):
-                                self.t.append(ds[str(it+1)+'/time'][()])
-                            self.t = np.array(self.t)
+                            self.t = t[frame_list]
                     setattr(ext_object, field, slice_series)
 
                 setattr(self, extension, ext_object)
@@ -265,83 +439,156 @@ class SliceSeries(object):
                         precision = 'f'
 
                     # Set up slice plane.
-                    if extension == 'xy' or extension == 'Xy' or  extension == 'xy2':
-                        hsize = dim.nx
-                        vsize = dim.ny
-                    if extension == 'xz':
-                        hsize = dim.nx
-                        vsize = dim.nz
-                    if extension == 'yz':
-                        hsize = dim.ny
-                        vsize = dim.nz
+                    plane_shape = self.__plane_shape(extension, dim)
+                    if plane_shape is None:
+                        continue
 
                     try:
-                        infile = FortranFile(file_name)
-                    except:
+                        frames = self.__map_frames(file_name, plane_shape,
+                                                   precision, old_file)
+                    except (IOError, OSError):
                         continue
 
-                    islice = 0
-                    self.t = []
-                    slice_series = []
-
                     if not quiet:
                         print('  -> Reading... ')
                         sys.stdout.flush()
-                    while True:
-                        try:
-                            raw_data = infile.read_record(dtype=precision)
-                        except ValueError:
-                            break
-                        except TypeError:
-                            break
-
-                        if old_file:
-                            self.t.append(list(raw_data[-1]))
-                            slice_series.append(raw_data[:-1])
-                        else:
-                            self.t.append(list(raw_data[-2:-1]))
-                            slice_series.append(raw_data[:-2])
-                        islice += 1
+                    # Only the times are read to select the frames.
+                    t = np.array(frames['t'])
+                    frame_list = self.__select_frames(t, iter_list,
+                                                      tmin, tmax)
+                    self.t = t[frame_list]
+                    slice_series = np.array(frames['data'][frame_list])
+                    del frames
                     if not quiet:
                         print('  -> Done')
                         sys.stdout.flush()
-
-                    # Remove first entry and reshape.
-                    if not quiet:
-                        print('Reshaping array')
-                        sys.stdout.flush()
-                    self.t = np.array(self.t, dtype=precision)[:, 0]
-                    slice_series = np.array(slice_series, dtype=precision)
-                    # Separate the data in chunks if too big
-                    if slice_series.size > vlarge:
-                        vscaled = (int(vlarge/vsize/hsize)+1)*vsize*hsize
-                        nchunks = int(slice_series.size/vscaled)
-                        endslice = vscaled*nchunks
-                        subslice_series = np.array_split(slice_series[:endslice+1], nchunks, axis=0)
-                        ichunk_size = int(subslice_series[0].size/vsize/hsize)
-                        slice_tmp = subslice_series[0].reshape(ichunk_size, vsize, hsize)
-                        if not quiet:
-                            print("slice_series.shape",slice_series.shape)
-                            print(field,"chunk_size",nchunks)
-                            print("subslice_series[0].size", subslice_series[0].size)
-                            sys.stdout.flush()
-                        for subslice in subslice_series: 
-                            ichunk_size = int(subslice.size/vsize/hsize)
-                            subslice = subslice.reshape(ichunk_size, vsize, hsize)
-                            slice_tmp = np.concatenate([slice_tmp, subslice], axis=0)
-                            if not quiet:
-                                print("slice_tmp.shape",slice_tmp.shape)
-                                sys.stdout.flush()
-                        if not nchunks*vscaled==slice_series.size:
-                            ichunk_size = int(slice_series[endslice+1:].size/vsize/hsize)
-                            subslice = slice_series[endslice+1:].reshape(ichunk_size, vsize, hsize)
-                            slice_tmp = np.concatenate([slice_tmp, subslice], axis=0)
-                            if not quiet:
-                                print("slice_tmp.shape",slice_tmp.shape)
-                                sys.stdout.flush()
-                        slice_series = slice_tmp
-                    else:
-                        slice_series = slice_series.reshape(islice, vsize, hsize)
                     setattr(ext_object, field, slice_series)
 
                 setattr(self, extension, ext_object)
+
+
+    def iter_frames(self, field, extension, datadir='data', proc=-1,
+                    old_file=False, iter_list=None, tmin=None, tmax=None,
+                    cache_times=True, frame_index=False):
+        """
+        Iterate over the frames of a Pencil Code slice, reading one frame
+        at a time. Yields (t, plane) for each frame, where plane is a 2D
+        array.
+
+        call signature:
+
+        iter_frames(field, extension, datadir='data', proc=-1,
+                    old_file=False, iter_list=None, tmin=None, tmax=None,
+                    cache_times=True, frame_index=False)
+
+        Keyword arguments:
+
+        *field*:
+          Name of the field to be read.
+
+        *extension*
+          Specifies the slice, e.g. 'xy'.
+
+        *datadir*:
+          Directory where the data is stored.
+
+        *proc*:
+          Processor to be read. If -1 read the global slice file, or
+          assemble the planes from the processor slice files if there is
+          none.
+
+        *old_file*
+          Flag for reading old file format.
+
+        *iter_list*
+          list of frame indices for which to sample the slices
+
+        *tmin*, *tmax*:
+          Only read the frames with tmin <= t <= tmax.
+
+        *cache_times*:
+          Keep the times of HDF5 slice files in memory, so that later reads
+          only read the times of new frames.
+
+        *frame_index*:
+          Yield (index, t, plane), with the index of the frame in the file.
+        """
+
+        import os
+        import numpy as np
+        from .. import read
+
+        datadir = os.path.expanduser(datadir)
+
+        if os.path.exists(os.path.join(datadir, 'grid.h5')):
+            file_name = os.path.join(datadir, 'slices',
+                                     field+'_'+extension+'.h5')
+            with self.__open_h5(file_name) as ds:
+                nt = int(ds['last'][0])
+                t = self.__h5_times(ds, file_name, nt, cache_times)
+                for it in self.__select_frames(t, iter_list, tmin, tmax):
+                    group = ds.get(str(it+1))
+                    if group is None:
+                        print('no data at {} in '.format(it+1)+file_name)
+                        continue
+                    frame = (t[it], group['data'][()])
+                    yield (it,) + frame if frame_index else frame
+            return
+
+        # Find the slice files and where their planes go.
+        slice_name = 'slice_'+field+'.'+extension
+        if proc < 0 and not os.path.exists(os.path.join(datadir, slice_name)):
+            dim = read.dim(datadir)
+            proc_list = [p for p in range(dim.nprocx*dim.nprocy*dim.nprocz)
+                         if os.path.exists(os.path.join(
+                             datadir, 'proc{0}'.format(p), slice_name))]
+            if len(proc_list) == 0:
+                raise IOError("No slice files {0} in {1}.".format(
+                    slice_name, datadir))
+        else:
+            dim = read.dim(datadir, proc)
+            proc_list = [proc]
+        plane_shape = self.__plane_shape(extension, dim)
+        if plane_shape is None:
+            raise ValueError("Unknown slice extension {0}.".format(extension))
+        if dim.precision == 'D':
+            precision = 'd'
+        else:
+            precision = 'f'
+
+        tiles = []
+        for p in proc_list:
+            if p < 0:
+                file_name = os.path.join(datadir, slice_name)
+                tile_dim = dim
+            else:
+                file_name = os.path.join(datadir, 'proc{0}'.format(p),
+                                         slice_name)
+                tile_dim = read.dim(datadir, p)
+            tile_shape = self.__plane_shape(extension, tile_dim)
+            if len(proc_list) == 1:
+                offset = (0, 0)
+            elif extension[:2] in ('xy', 'Xy'):
+                offset = (tile_dim.ipy*tile_shape[0], tile_dim.ipx*tile_shape[1])
+            elif extension[:2] == 'xz':
+                offset = (tile_dim.ipz*tile_shape[0], tile_dim.ipx*tile_shape[1])
+            else:
+                offset = (tile_dim.ipz*tile_shape[0], tile_dim.ipy*tile_shape[1])
+            dst = (slice(offset[0], offset[0] + tile_shape[0]),
+                   slice(offset[1], offset[1] + tile_shape[1]))
+            tiles.append((self.__map_frames(file_name, tile_shape, precision,
+                                            old_file), dst))
+
+        # Processors may have written different numbers of frames.
+        nt = min(frames.shape[0] for frames, dst in tiles)
+        t = np.array(tiles[0][0]['t'][:nt])
+        for it in self.__select_frames(t, iter_list, tmin, tmax):
+            if len(tiles) == 1:
+                frame = (t[it], np.array(tiles[0][0]['data'][it]))
+                yield (it,) + frame if frame_index else frame
+                continue
+            plane = np.zeros(plane_shape, dtype=precision)
+            for frames, dst in tiles:
+                plane[dst] = frames['data'][it]
+            frame = (t[it], plane)
+            yield (it,) + frame if frame_index else frame
@@ -17,7 +17,8 @@ def ts(*args, **kwargs):
     call signature:
 
     ts(file_name='time_series.dat', datadir='data',
-       quiet=False, comment_char='#', sim=None, unique_clean=False)
+       quiet=False, comment_char='#', sim=None, unique_clean=False,
+       follow=False)
 
     Keyword arguments:
 
@@ -39,6 +40,10 @@ def ts(*args, **kwargs):
     *unique_clean*
       Set True, np.unique is used to clean up the ts, e.g. remove errors
       at the end of crashed runs.
+
+    *follow*
+      Set True to poll a running simulation with refresh(). The arrays
+      are then allocated with room for appended lines.
     """
 
     ts_tmp = TimeSeries()
@@ -61,14 +66,19 @@ class TimeSeries(object):
 
 
     def read(self, file_name='time_series.dat', datadir='data',
-             quiet=False, comment_char='#', sim=None, unique_clean=False):
+             quiet=False, comment_char='#', sim=None, unique_clean=False,
+             follow=False):
         """
         Read Pencil Code time series data.
+        If the header changes within the file, the columns are matched by
+        name and values missing before or after the change are NaN, as are
+        Fortran overflow fields (********).
 
         call signature:
 
         read(file_name='time_series.dat', datadir='data',
-             quiet=False, comment_char='#', sim=None, unique_clean=False)
+             quiet=False, comment_char='#', sim=None, unique_clean=False,
+             follow=False)
 
         Keyword arguments:
 
@@ -90,11 +100,13 @@ class TimeSeries(object):
         *unique_clean*
           Set True, np.unique is used to clean up the ts, e.g. remove errors
           at the end of crashed runs.
+
+        *follow*
+          Set True to poll a running simulation with refresh(). The arrays
+          are then allocated with room for appended lines.
         """
 
-        import numpy as np
         import os.path
-        import re
 
         if sim:
             from ..sim import __Simulation__
@@ -103,45 +115,241 @@ class TimeSeries(object):
                 datadir = sim.datadir
 
         datadir = os.path.expanduser(datadir)
-        infile = open(os.path.join(datadir, file_name), "r")
-        lines = infile.readlines()
-        infile.close()
-
-        nlines_init = len(lines)
-        data = np.zeros((nlines_init, len(self.keys)))
-        nlines = 0
-        for line in lines:
-            if re.search("^%s--" % comment_char, line):
-                # Read header and create keys for dictionary.
-                line = line.strip("{0}-\n".format(comment_char))
-                keys_new = re.split("-+", line)
-                if keys_new != self.keys:
-                    n_newrows = abs(len(keys_new) - len(self.keys))
-                    data = np.append(data, np.zeros((nlines_init, n_newrows)),
-                                     axis=1)
-                    self.keys = keys_new
-            else:
-                try:
-                    row = np.array(list(map(float, re.split(" +", line.strip(" \n")))))
-                    data[nlines, :] = row
-                    nlines += 1
-                except ValueError:
-                    print("Invalid data on line {0}. Skipping.".format(nlines))
+        self.__file_name = os.path.join(datadir, file_name)
+        self.__comment_char = comment_char
+        self.__unique_clean = unique_clean
+        self.__reset()
+        self.__update(follow, quiet)
 
-        # Clean up data.
-        data = np.resize(data, (nlines, len(self.keys)))
+
+    def refresh(self, quiet=True):
+        """
+        Read the lines appended to the time series file since the last
+        read() or refresh(), e.g. while the simulation is running.
+        A line which is still being written is read again on the next
+        refresh. If the file has been rewritten it is read from the start.
+        Returns the number of new lines, all lines after a rewrite.
+
+        call signature:
+
+        refresh(quiet=True)
+
+        Keyword arguments:
+
+        *quiet*
+          Flag for switching off output.
+        """
+
+        n_rows = self.__n_rows
+        if self.__update(True, quiet):
+            return self.__n_rows
+        return self.__n_rows - n_rows
+
+
+    def __reset(self):
+        """
+        Forget the data read so far.
+        """
+
+        import numpy as np
+
+        for key in self.keys:
+            delattr(self, key)
+        self.t = []
+        self.keys = []
+        self.__columns = {}
+        self.__data = np.zeros((0, 0))
+        self.__n_rows = 0
+        self.__offset = 0
+        self.__header = None
+        self.__prefix = b""
+
+
+    def __update(self, reserve, quiet):
+        """
+        Parse the file from the last complete line read and append the data.
+        Returns True if the file had been rewritten and was read again.
+        """
+
+        import numpy as np
+        import os
+
+        with open(self.__file_name, "rb") as infile:
+            # A restart which rewrote the file changes its beginning.
+            size = os.fstat(infile.fileno()).st_size
+            rewritten = size < self.__offset or \
+                infile.read(len(self.__prefix)) != self.__prefix
+            if rewritten:
+                self.__reset()
+            infile.seek(self.__offset)
+            raw = infile.read()
+            if self.__offset == 0:
+                self.__prefix = raw[:raw.find(b"\n") + 1]
+
+        # Lines after the last newline may be incomplete. They are added,
+        # but parsed again by the next update.
+        end = raw.rfind(b"\n") + 1
+        blocks, n_invalid, header = self.__parse_blocks(
+            raw[:end].decode("ascii", "replace"), self.__header,
+            self.__comment_char)
+        tail, n, tail_header = self.__parse_blocks(
+            raw[end:].decode("ascii", "replace"), header,
+            self.__comment_char)
+        n_invalid += n
+        self.__offset += end
+        self.__header = header
+
+        # Grow the array, by at least a factor of two if more lines are to
+        # be expected.
+        n_new = sum(block.shape[0] for block_keys, block in blocks)
+        n_tail = sum(block.shape[0] for block_keys, block in tail)
+        n_rows = self.__n_rows + n_new + n_tail
+        new_keys = []
+        for block_keys, block in blocks + tail:
+            new_keys += [key for key in block_keys if key not in
+                         self.__columns and key not in new_keys]
+        capacity = self.__data.shape[0]
+        if n_rows > capacity or new_keys:
+            if n_rows > capacity and reserve:
+                capacity = max(n_rows, 2*capacity, 1024)
+            else:
+                capacity = max(n_rows, capacity)
+            data = np.full((capacity, self.__data.shape[1] + len(new_keys)),
+                           np.nan)
+            data[:self.__n_rows, :self.__data.shape[1]] = \
+                self.__data[:self.__n_rows]
+            self.__data = data
+            for key in new_keys:
+                self.__columns[key] = len(self.__columns)
+
+        # Map the block columns onto the array. The keys are ordered as in
+        # the last header, followed by keys which were dropped.
+        row = self.__n_rows
+        for block_keys, block in blocks + tail:
+            columns = [self.__columns[key] for key in block_keys]
+            self.__data[row:row+block.shape[0]] = np.nan
+            self.__data[row:row+block.shape[0], columns] = block
+            row += block.shape[0]
+            self.keys = block_keys + [key for key in self.keys
+                                      if key not in block_keys]
+        self.__n_rows += n_new
 
         if not quiet:
-            print("Read {0} lines.".format(nlines))
+            if n_invalid > 0:
+                print("Skipped {0} lines with invalid data.".format(n_invalid))
+            print("Read {0} lines.".format(n_new + n_tail))
 
         # Assemble into a TimeSeries class.
-        for i in range(0, len(self.keys)):
-            setattr(self, self.keys[i], data[:, i])
+        for key in self.keys:
+            setattr(self, key, self.__data[:n_rows, self.__columns[key]])
 
         # Do unique clean up.
-        if unique_clean:
+        if self.__unique_clean:
             clean_t, unique_indices = np.unique(self.t, return_index=True)
 
             if np.size(clean_t) != np.size(self.t):
                 for key in self.keys:
                     setattr(self, key, getattr(self, key)[unique_indices])
+
+        return rewritten
+
+
+    def __parse_blocks(self, text, keys, comment_char='#'):
+        """
+        Split the text of a time series file at the header lines and parse
+        each block of data lines in bulk.
+        Returns the list of (keys, data) pairs of the blocks, the number
+        of skipped lines and the keys of the last header. Data preceding the
+        first header in text belongs to the header keys, if given.
+        """
+
+        import re
+
+        # Offsets of the header lines.
+        headers = []
+        marker = "\n{0}--".format(comment_char)
+        if text.startswith(marker[1:]):
+            headers.append(0)
+        position = text.find(marker)
+        while position >= 0:
+            headers.append(position + 1)
+            position = text.find(marker, position + 1)
+
+        blocks = []
+        n_invalid = 0
+        start = 0
+        for header in headers + [len(text)]:
+            if keys is not None:
+                block, n = self.__parse_data(text[start:header], len(keys))
+                n_invalid += n
+                if block.shape[0] > 0:
+                    blocks.append((keys, block))
+            else:
+                n_invalid += sum(1 for line in text[start:header].splitlines()
+                                 if line.strip())
+            if header == len(text):
+                break
+            start = text.find("\n", header)
+            if start < 0:
+                start = len(text)
+            line = text[header:start].strip("{0}-\n\r".format(comment_char))
+            keys = re.split("-+", line)
+
+        return blocks, n_invalid, keys
+
+
+    def __parse_data(self, text, n_columns, chunk_size=2**25):
+        """
+        Parse the data lines of one block, chunk by chunk. Fortran overflow
+        fields (********) are read as NaN. Lines which cannot be parsed
+        are skipped.
+        Returns the (rows, n_columns) array and the number of skipped lines.
+        """
+
+        import numpy as np
+        import re
+        import warnings
+
+        chunks = []
+        n_invalid = 0
+        start = 0
+        while start < len(text):
+            stop = text.find("\n", start + chunk_size)
+            if stop < 0:
+                stop = len(text)
+            chunk = text[start:stop]
+            start = stop + 1
+            if "*" in chunk:
+                chunk = re.sub(r"\*+", " nan ", chunk)
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+            # Fast path: all lines are complete rows.
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", DeprecationWarning)
+                    values = np.fromstring(chunk, sep=" ")
+            except ValueError:
+                values = None
+            n_lines = chunk.count("\n") + 1
+            if values is not None and values.size == n_lines*n_columns:
+                chunks.append(values.reshape(n_lines, n_columns))
+                continue
+            # Slow path: parse line by line to skip invalid lines.
+            rows = []
+            for line in chunk.splitlines():
+                try:
+                    row = np.array(line.split(), dtype=float)
+                except ValueError:
+                    n_invalid += 1
+                    continue
+                if row.size == n_columns:
+                    rows.append(row)
+                elif row.size > 0:
+                    n_invalid += 1
+            if len(rows) > 0:
+                chunks.append(np.array(rows))
+
+        if len(chunks) == 0:
+            return np.zeros((0, n_columns)), n_invalid
+        return np.concatenate(chunks), n_invalid
@@ -39,10 +39,19 @@ def var(*args, **kwargs):
         ivar:       Index of the VAR file, if var_file is not specified.
         quiet:      Flag for switching off output.
         trimall:    Trim the data cube to exclude ghost zones.
-        magic:      Values to be computed from the data, e.g. B = curl(A).
+        magic:      Values to be computed from the data, e.g. B = curl(A),
+                    on first access.
         sim:        Simulation sim object.
         precision:  Float (f) or double (d).
         lpersist:   Read the persistent variables if they exist
+        lazy:       Only read the parts of the data cube which are indexed.
+        variables:  List of variables to be read, e.g. ['lnrho', 'uu'].
+                    By default all variables are read.
+        region:     Bounds ((x0, x1), (y0, y1), (z0, z1)) of the subvolume
+                    to be read, None for the whole extent of an axis.
+        region_coords: Region bounds are coordinates, not indices.
+        n_workers:  Number of threads reading the processor files.
+        out:        Array to read the f-array into, e.g. from a previous read.
     """
 
     from ..sim import __Simulation__
@@ -76,6 +85,131 @@ def var(*args, **kwargs):
     return var_tmp
 
 
+def var_series(datadir='data', ivars=None, prefetch=1, reuse_buffers=True,
+               **kwargs):
+    """
+    Iterate over a series of VAR files, yielding one DataCube after the
+    other. The next snapshots are read in a background thread while the
+    caller works on the current one.
+
+    call signature:
+
+    var_series(datadir='data', ivars=None, prefetch=1, reuse_buffers=True,
+               **kwargs)
+
+    Keyword arguments:
+        datadir:    Directory where the data is stored.
+        ivars:      Indices of the VAR files, e.g. range(10, 20).
+                    By default all VAR files found are read.
+        prefetch:   Number of snapshots read ahead. 0 reads in the
+                    calling thread.
+        reuse_buffers: Read the f-array into the buffers of snapshots which
+                    have already been processed. The data of a DataCube are
+                    then only valid until the next one is requested, copy
+                    what needs to be kept.
+        **kwargs:   Further arguments of read.var, e.g. variables, trimall,
+                    magic, proc or quiet.
+
+    Example:
+        for var in pc.read.var_series(ivars=range(10), variables=['uu']):
+            print(var.t, (var.uu**2).mean())
+    """
+
+    import os
+    import queue
+    import re
+    import threading
+    import numpy as np
+
+    datadir = os.path.expanduser(datadir)
+    if ivars is None:
+        proc = kwargs.get('proc', -1)
+        if os.path.exists(os.path.join(datadir, 'grid.h5')):
+            directory, pattern = 'allprocs', r'VAR(\d+)\.h5$'
+        elif proc >= 0:
+            directory, pattern = 'proc{0}'.format(proc), r'VAR(\d+)$'
+        elif os.path.exists(os.path.join(datadir, 'proc0')):
+            directory, pattern = 'proc0', r'VAR(\d+)$'
+        else:
+            directory, pattern = 'allprocs', r'VAR(\d+)$'
+        ivars = sorted(int(match.group(1)) for match in
+                       [re.match(pattern, file_name) for file_name in
+                        os.listdir(os.path.join(datadir, directory))]
+                       if match)
+    ivars = list(ivars)
+
+    def read_var(ivar, out):
+        var_tmp = DataCube()
+        var_tmp.read(datadir=datadir, ivar=ivar, out=out, **kwargs)
+        return var_tmp
+
+    def buffer(var_tmp):
+        """
+        Find the untrimmed f-array a DataCube was read into.
+        """
+
+        f = var_tmp.f
+        while isinstance(f, np.ndarray) and f.base is not None and \
+              isinstance(f.base, np.ndarray):
+            f = f.base
+        if isinstance(f, np.ndarray):
+            return f
+        return None
+
+    if prefetch < 1:
+        out = None
+        for ivar in ivars:
+            var_tmp = read_var(ivar, out)
+            yield var_tmp
+            if reuse_buffers:
+                out = buffer(var_tmp)
+        return
+
+    ready = queue.Queue()
+    free = queue.Queue()
+    stop = threading.Event()
+    # The current snapshot and at most prefetch snapshots read ahead.
+    slots = threading.Semaphore(prefetch + 1)
+
+    def producer():
+        try:
+            for i, ivar in enumerate(ivars):
+                slots.acquire()
+                if stop.is_set():
+                    return
+                out = None
+                # The buffer of the snapshot which released the slot.
+                if reuse_buffers and i > prefetch:
+                    out = free.get()
+                if stop.is_set():
+                    return
+                ready.put((read_var(ivar, out), None))
+        except Exception as error:
+            ready.put((None, error))
+            return
+        ready.put((None, None))
+
+    thread = threading.Thread(target=producer)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            var_tmp, error = ready.get()
+            if error is not None:
+                raise error
+            if var_tmp is None:
+                break
+            yield var_tmp
+            if reuse_buffers:
+                free.put(buffer(var_tmp))
+            del var_tmp
+            slots.release()
+    finally:
+        stop.set()
+        slots.release()
+        free.put(None)
+
+
 class DataCube(object):
     """
     DataCube -- holds Pencil Code VAR file data.
@@ -101,9 +235,14 @@ class DataCube(object):
         self.n1 = None
         self.n2 = None
         self.magic = None
+        self.read_bytes = None
+        self.read_rate = None
+        self.h5_file = None
 
     def read(self, var_file='', datadir='data', proc=-1, ivar=-1, quiet=True,
-             trimall=False, magic=None, sim=None, precision='d', lpersist=False):
+             trimall=False, magic=None, sim=None, precision='d', lpersist=False,
+             lazy=False, variables=None, region=None, region_coords=False,
+             n_workers=1, out=None):
         """
         Read VAR files from Pencil Code. If proc < 0, then load all data
         and assemble, otherwise load VAR file from specified processor.
@@ -129,16 +268,53 @@ class DataCube(object):
             quiet:      Flag for switching off output.
             trimall:    Trim the data cube to exclude ghost zones.
             magic:      Values to be computed from the data, e.g. B = curl(A).
+                        They are computed on first access of the attribute
+                        (e.g. bb) and kept until clear_magic() is called.
+                        With lazy, only the indexed part is computed.
             sim:        Simulation sim object.
             precision:  Float (f) or double (d).
+            lpersist:   Read the persistent variables if they exist
+            lazy:       Only read the parts of the data cube which are
+                        indexed. Binary VAR files are memory mapped, HDF5
+                        files are kept open and read by hyperslab selection
+                        until close() is called (or use the DataCube in a
+                        with statement). f and the variable attributes are
+                        then TiledArray objects, use numpy indexing or
+                        np.asarray to read.
+            variables:  List of variables to be read, e.g. ['lnrho', 'uu'].
+                        Names are those of index.pro without the leading
+                        'i', vectors can be given as 'uu', 'aa', 'uu_sph'
+                        or 'bb_sph'. Variables required by magic are added.
+                        The f-array then only holds the selected variables,
+                        in the order of index.pro. By default all variables
+                        are read.
+            region:     Bounds ((x0, x1), (y0, y1), (z0, z1)) of the
+                        subvolume to be read, None for the whole extent of
+                        an axis. Indices are Python slice bounds of the
+                        returned array, i.e. without ghost zones if trimall.
+                        Only the processor files intersecting the region are
+                        opened and only the selected planes and rows are
+                        read. Not available for 2D runs.
+            region_coords: Region bounds are coordinates, points with
+                        x0 <= x <= x1 etc. are read.
+            n_workers:  Number of threads reading the processor files
+                        concurrently (binary format only). Helps on parallel
+                        file systems where the per-file latency dominates.
+                        The amount of data read and the achieved rate in
+                        MB/s are stored in read_bytes and read_rate.
+            out:        Array to read the untrimmed f-array into, e.g. the
+                        buffer of a previous snapshot, to avoid allocating
+                        a new one. Ignored if its shape or type does not
+                        match, or for lazy and region reads.
         """
 
         import numpy as np
         import os
-        from scipy.io import FortranFile
-        from ..math.derivatives import curl, curl2
+        import time
+        from concurrent.futures import ThreadPoolExecutor
         from .. import read
         from ..sim import __Simulation__
+        from .lazy_arrays import TiledArray, DatasetStack
 
         def persist(self, infile=None, precision='d', quiet=quiet):
             """An open Fortran file potentially containing persistent variables appended
@@ -206,6 +382,30 @@ class DataCube(object):
         else:
             total_vars = dim.mvar
 
+        # Restrict the index to the selected variables.
+        if variables is not None:
+            if isinstance(variables, str):
+                variables = [variables]
+            variables = list(variables)
+            if magic is not None:
+                if 'bb' in magic or 'jj' in magic:
+                    variables.append('aa')
+                if 'vort' in magic:
+                    variables.append('uu')
+            components, index = self.__select_variables(variables, index,
+                                                        total_vars)
+            total_vars = len(components)
+        else:
+            components = None
+
+        # Global index ranges of the region, padded for the derivatives of
+        # the magic quantities, and the region within them.
+        if region is not None:
+            if param.lwrite_2d:
+                raise ValueError("read.var: region is not available for 2D runs.")
+            box, crop = self.__region_slices(region, region_coords, dim,
+                                             datadir, proc, trimall, magic)
+
         if os.path.exists(os.path.join(datadir, 'grid.h5')):
             import h5py
             run2D = param.lwrite_2d
@@ -216,16 +416,23 @@ class DataCube(object):
                 precision = 'f'
 
             # Set up the global array.
-            if not run2D:
-                f = np.zeros((total_vars, dim.mz, dim.my, dim.mx),
-                             dtype=precision)
+            if region is not None and not lazy:
+                f_shape = (total_vars,) + tuple(s.stop - s.start for s in box)
+            elif not run2D:
+                f_shape = (total_vars, dim.mz, dim.my, dim.mx)
             else:
                 if dim.ny == 1:
-                    f = np.zeros((total_vars, dim.mz, dim.mx),
-                                 dtype=precision)
+                    f_shape = (total_vars, dim.mz, dim.mx)
                 else:
-                    f = np.zeros((total_vars, dim.my, dim.mx),
-                                 dtype=precision)
+                    f_shape = (total_vars, dim.my, dim.mx)
+            if lazy:
+                # Datasets of the variables, in the order of the f-array.
+                datasets = [None]*total_vars
+            elif self.__fits(out, f_shape, precision):
+                f = out
+                f[...] = 0
+            else:
+                f = np.zeros(f_shape, dtype=precision)
 
             if not var_file:
                 if ivar < 0:
@@ -234,13 +441,27 @@ class DataCube(object):
                     var_file = 'VAR' + str(ivar) + '.h5'
 
             file_name = os.path.join(datadir, 'allprocs', var_file)
-            with h5py.File(file_name, 'r') as tmp:
+            # In lazy mode the file stays open until close() is called.
+            tmp = h5py.File(file_name, 'r')
+            try:
                 for key in tmp['data'].keys():
-                    f[index.__getattribute__(key)-1, :] = tmp['data/'+key][:]
+                    if components is not None and not hasattr(index, key):
+                        continue
+                    if lazy:
+                        datasets[index.__getattribute__(key)-1] = \
+                            tmp['data/'+key]
+                    elif region is not None:
+                        # Hyperslab selection of the region.
+                        f[index.__getattribute__(key)-1, :] = \
+                            tmp['data/'+key][box]
+                    else:
+                        f[index.__getattribute__(key)-1, :] = tmp['data/'+key][:]
                 t = tmp['time'][()]
                 x = tmp['grid/x'][()]
                 y = tmp['grid/y'][()]
                 z = tmp['grid/z'][()]
+                if region is not None:
+                    x, y, z = x[box[2]], y[box[1]], z[box[0]]
                 dx = tmp['grid/dx'][()]
                 dy = tmp['grid/dy'][()]
                 dz = tmp['grid/dz'][()]
@@ -249,6 +470,19 @@ class DataCube(object):
                 if lpersist:
                     for key in tmp['persist'].keys():
                         self.__setattr__(key, tmp['persist'][key][0])
+            except:
+                tmp.close()
+                raise
+            if lazy:
+                self.h5_file = tmp
+                full = tuple(slice(0, n) for n in f_shape[1:])
+                f = TiledArray(f_shape, precision,
+                               [(DatasetStack(datasets, f_shape[1:], precision),
+                                 full, full)])
+                if region is not None:
+                    f = f.view((slice(None),) + box)
+            else:
+                tmp.close()
         else:
             run2D = param.lwrite_2d
 
@@ -277,21 +511,36 @@ class DataCube(object):
 
             # Set up the global array.
             if not run2D:
-                f = np.zeros((total_vars, dim.mz, dim.my, dim.mx),
-                             dtype=precision)
+                f_shape = (total_vars, dim.mz, dim.my, dim.mx)
             else:
                 if dim.ny == 1:
-                    f = np.zeros((total_vars, dim.mz, dim.mx),
-                                 dtype=precision)
+                    f_shape = (total_vars, dim.mz, dim.mx)
                 else:
-                    f = np.zeros((total_vars, dim.my, dim.mx),
-                                 dtype=precision)
+                    f_shape = (total_vars, dim.my, dim.mx)
+            # Regions are cut from the memory mapped tiles.
+            tiled = lazy or region is not None
+            # Processors read concurrently must write disjoint tiles.
+            disjoint = tiled or (n_workers > 1 and len(proc_dirs) > 1)
+            if tiled:
+                # Tiles of the memory mapped global array.
+                tiles = []
+            elif self.__fits(out, f_shape, precision):
+                # Every element is overwritten by the processor tiles.
+                f = out
+            else:
+                f = np.zeros(f_shape, dtype=precision)
 
             x = np.zeros(dim.mx, dtype=precision)
             y = np.zeros(dim.my, dtype=precision)
             z = np.zeros(dim.mz, dtype=precision)
 
-            for directory in proc_dirs:
+            def read_proc(directory):
+                """
+                Read the VAR file of one processor directory into the
+                global array. Returns the scalars of the grid record and
+                the number of bytes read.
+                """
+
                 if not param.lcollective_io:
                     proc = int(directory[4:])
                     if var_file[0:2].lower() == 'og':
@@ -320,37 +569,13 @@ class DataCube(object):
                 myloc = procdim.my
                 mzloc = procdim.mz
 
-                # Read the data.
-                file_name = os.path.join(datadir, directory, var_file)
-                infile = FortranFile(file_name)
                 if not run2D:
-                    f_loc = infile.read_record(dtype=precision)
-                    f_loc = f_loc.reshape((-1, mzloc, myloc, mxloc))
+                    loc_shape = (mzloc, myloc, mxloc)
                 else:
                     if dim.ny == 1:
-                        f_loc = infile.read_record(dtype=precision)
-                        f_loc = f_loc.reshape((-1, mzloc, mxloc))
+                        loc_shape = (mzloc, mxloc)
                     else:
-                        f_loc = infile.read_record(dtype=precision)
-                        f_loc = f_loc.reshape((-1, myloc, mxloc))
-                raw_etc = infile.read_record(dtype=precision)
-                if lpersist:
-                    persist(self, infile=infile, precision=precision, quiet=quiet)
-                infile.close()
-
-                t = raw_etc[0]
-                x_loc = raw_etc[1:mxloc+1]
-                y_loc = raw_etc[mxloc+1:mxloc+myloc+1]
-                z_loc = raw_etc[mxloc+myloc+1:mxloc+myloc+mzloc+1]
-                if param.lshear:
-                    shear_offset = 1
-                    deltay = raw_etc[-1]
-                else:
-                    shear_offset = 0
-
-                dx = raw_etc[-3-shear_offset]
-                dy = raw_etc[-2-shear_offset]
-                dz = raw_etc[-1-shear_offset]
+                        loc_shape = (myloc, mxloc)
 
                 if len(proc_dirs) > 1:
                     # Calculate where the local processor will go in
@@ -397,73 +622,154 @@ class DataCube(object):
                         i0zloc = procdim.nghostz
                         i1zloc = procdim.mz
 
-                    x[i0x:i1x] = x_loc[i0xloc:i1xloc]
-                    y[i0y:i1y] = y_loc[i0yloc:i1yloc]
-                    z[i0z:i1z] = z_loc[i0zloc:i1zloc]
-
-                    if not run2D:
-                        f[:, i0z:i1z, i0y:i1y, i0x:i1x] = f_loc[:, i0zloc:i1zloc,
-                                                                i0yloc:i1yloc, i0xloc:i1xloc]
-                    else:
+                    if disjoint:
+                        # Leave the right ghost zones, which overlap with
+                        # the interior of the next processor, to that
+                        # processor.
+                        if procdim.ipx < dim.nprocx - 1:
+                            i1x -= procdim.nghostx
+                            i1xloc -= procdim.nghostx
+                        if procdim.ipy < dim.nprocy - 1:
+                            i1y -= procdim.nghosty
+                            i1yloc -= procdim.nghosty
+                        if procdim.ipz < dim.nprocz - 1:
+                            i1z -= procdim.nghostz
+                            i1zloc -= procdim.nghostz
+
+                    if region is not None:
+                        # Skip processors outside of the region.
+                        if not (i0z < box[0].stop and box[0].start < i1z and
+                                i0y < box[1].stop and box[1].start < i1y and
+                                i0x < box[2].stop and box[2].start < i1x):
+                            return None
+
+                    dst = (slice(i0z, i1z), slice(i0y, i1y), slice(i0x, i1x))
+                    src = (slice(i0zloc, i1zloc), slice(i0yloc, i1yloc),
+                           slice(i0xloc, i1xloc))
+                    if run2D:
                         if dim.ny == 1:
-                            f[:, i0z:i1z, i0x:i1x] = f_loc[:, i0zloc:i1zloc, i0xloc:i1xloc]
+                            dst, src = dst[::2], src[::2]
                         else:
-                            f[i0z:i1z, i0y:i1y, i0x:i1x] = f_loc[i0zloc:i1zloc,
-                                                                 i0yloc:i1yloc, i0xloc:i1xloc]
+                            dst, src = dst[1:], src[1:]
                 else:
-                    f = f_loc
-                    x = x_loc
-                    y = y_loc
-                    z = z_loc
-
-        if magic is not None:
-            if 'bb' in magic:
-                # Compute the magnetic field before doing trimall.
-                aa = f[index.ax-1:index.az, ...]
-                self.bb = curl(aa, dx, dy, dz, x=x, y=y, run2D=run2D,
-                               coordinate_system=param.coord_system)
-                if trimall:
-                    self.bb = self.bb[:, dim.n1:dim.n2+1,
-                                      dim.m1:dim.m2+1, dim.l1:dim.l2+1]
-            if 'jj' in magic:
-                # Compute the electric current field before doing trimall.
-                aa = f[index.ax-1:index.az, ...]
-                self.jj = curl2(aa, dx, dy, dz, x=x, y=y,
-                                coordinate_system=param.coord_system)
-                if trimall:
-                    self.jj = self.jj[:, dim.n1:dim.n2+1,
-                                      dim.m1:dim.m2+1, dim.l1:dim.l2+1]
-            if 'vort' in magic:
-                # Compute the vorticity field before doing trimall.
-                uu = f[index.ux-1:index.uz, ...]
-                self.vort = curl(uu, dx, dy, dz, x=x, y=y, run2D=run2D,
-                                 coordinate_system=param.coord_system)
-                if trimall:
-                    if run2D:
-                        if dim.nz == 1:
-                            self.vort = self.vort[:, dim.m1:dim.m2+1,
-                                                  dim.l1:dim.l2+1]
-                        else:
-                            self.vort = self.vort[:, dim.n1:dim.n2+1,
-                                                  dim.l1:dim.l2+1]
-                    else:
-                        self.vort = self.vort[:, dim.n1:dim.n2+1,
-                                              dim.m1:dim.m2+1,
-                                              dim.l1:dim.l2+1]
+                    dst = src = tuple(slice(0, n) for n in loc_shape)
+
+                # Read the data, directly into the global array if not tiled.
+                file_name = os.path.join(datadir, directory, var_file)
+                if tiled:
+                    infile, f_loc, raw_etc = self.__map_var_record(
+                        file_name, precision, loc_shape, components)
+                    tiles.append((f_loc, dst, src))
+                    n_bytes = 0
+                else:
+                    infile, raw_etc, n_bytes = self.__read_var_tile(
+                        file_name, precision, loc_shape,
+                        f[(slice(None),) + dst], src, components)
+                if lpersist:
+                    persist(self, infile=infile, precision=precision, quiet=quiet)
+                infile.close()
+
+                result = {'t': raw_etc[0], 'n_bytes': n_bytes + raw_etc.nbytes}
+                x_loc = raw_etc[1:mxloc+1]
+                y_loc = raw_etc[mxloc+1:mxloc+myloc+1]
+                z_loc = raw_etc[mxloc+myloc+1:mxloc+myloc+mzloc+1]
+                if param.lshear:
+                    shear_offset = 1
+                    result['deltay'] = raw_etc[-1]
+                else:
+                    shear_offset = 0
 
+                result['dx'] = raw_etc[-3-shear_offset]
+                result['dy'] = raw_etc[-2-shear_offset]
+                result['dz'] = raw_etc[-1-shear_offset]
+
+                if len(proc_dirs) > 1:
+                    x[i0x:i1x] = x_loc[i0xloc:i1xloc]
+                    y[i0y:i1y] = y_loc[i0yloc:i1yloc]
+                    z[i0z:i1z] = z_loc[i0zloc:i1zloc]
+                else:
+                    if tiled:
+                        result['f'] = f_loc
+                    result['x'] = x_loc
+                    result['y'] = y_loc
+                    result['z'] = z_loc
+
+                return result
+
+            # The disjoint processor tiles can be filled concurrently.
+            time_start = time.time()
+            if n_workers > 1 and len(proc_dirs) > 1:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    results = list(executor.map(read_proc, proc_dirs))
+            else:
+                results = [read_proc(directory) for directory in proc_dirs]
+            read_time = time.time() - time_start
+            results = [result for result in results if result is not None]
+
+            result = results[-1]
+            t = result['t']
+            dx = result['dx']
+            dy = result['dy']
+            dz = result['dz']
+            if param.lshear:
+                deltay = result['deltay']
+            if len(proc_dirs) == 1:
+                if tiled:
+                    f_shape = result['f'].shape
+                x = result['x']
+                y = result['y']
+                z = result['z']
+
+            self.read_bytes = sum(result['n_bytes'] for result in results)
+            self.read_rate = self.read_bytes/max(read_time, 1e-9)/1024.**2
+            if not quiet:
+                print("Read {0:.1f} MB at {1:.1f} MB/s.".format(
+                    self.read_bytes/1024.**2, self.read_rate))
+
+            if tiled:
+                f = TiledArray(f_shape, precision, tiles)
+                if region is not None:
+                    f = f.view((slice(None),) + box)
+                    x, y, z = x[box[2]], y[box[1]], z[box[0]]
+                if not lazy:
+                    f = f[...]
+
+        # Slicing the lazy array would read the data, so take views.
+        if lazy:
+            take = lambda array, key: array.view(key)
+        else:
+            take = lambda array, key: array[key]
+
+        # Cut the region from the padded data, keep track of the ghost zones.
+        if region is not None:
+            self.x = x[crop[2]]
+            self.y = y[crop[1]]
+            self.z = z[crop[0]]
+            self.f = take(f, (slice(None),) + crop)
+            if not trimall:
+                start = [b.start + c.start for b, c in zip(box, crop)]
+                stop = [b.start + c.stop for b, c in zip(box, crop)]
+                self.l1 = max(dim.l1 - start[2], 0)
+                self.l2 = min(dim.l2 + 1, stop[2]) - start[2]
+                self.m1 = max(dim.m1 - start[1], 0)
+                self.m2 = min(dim.m2 + 1, stop[1]) - start[1]
+                self.n1 = max(dim.n1 - start[0], 0)
+                self.n2 = min(dim.n2 + 1, stop[0]) - start[0]
         # Trim the ghost zones of the global f-array if asked.
-        if trimall:
+        elif trimall:
             self.x = x[dim.l1:dim.l2+1]
             self.y = y[dim.m1:dim.m2+1]
             self.z = z[dim.n1:dim.n2+1]
             if not run2D:
-                self.f = f[:, dim.n1:dim.n2+1,
-                           dim.m1:dim.m2+1, dim.l1:dim.l2+1]
+                self.f = take(f, np.s_[:, dim.n1:dim.n2+1,
+                                       dim.m1:dim.m2+1, dim.l1:dim.l2+1])
             else:
                 if dim.ny == 1:
-                    self.f = f[:, dim.n1:dim.n2+1, dim.l1:dim.l2+1]
+                    self.f = take(f, np.s_[:, dim.n1:dim.n2+1,
+                                           dim.l1:dim.l2+1])
                 else:
-                    self.f = f[:, dim.m1:dim.m2+1, dim.l1:dim.l2+1]
+                    self.f = take(f, np.s_[:, dim.m1:dim.m2+1,
+                                           dim.l1:dim.l2+1])
         else:
             self.x = x
             self.y = y
@@ -488,16 +794,16 @@ class DataCube(object):
             if key != 'global_gg' and key != 'keys' and 'aatest' not in key\
                                   and  'uutest' not in key:
                 value = index.__dict__[key]
-                setattr(self, key, self.f[value-1, ...])
+                setattr(self, key, take(self.f, np.s_[value-1, ...]))
         # Special treatment for vector quantities.
         if hasattr(index, 'uu'):
-            self.uu = self.f[index.ux-1:index.uz, ...]
+            self.uu = take(self.f, np.s_[index.ux-1:index.uz, ...])
         if hasattr(index, 'aa'):
-            self.aa = self.f[index.ax-1:index.az, ...]
+            self.aa = take(self.f, np.s_[index.ax-1:index.az, ...])
         if hasattr(index, 'uu_sph'):
-            self.uu_sph = self.f[index.uu_sphx-1:index.uu_sphz, ...]
+            self.uu_sph = take(self.f, np.s_[index.uu_sphx-1:index.uu_sphz, ...])
         if hasattr(index, 'bb_sph'):
-            self.bb_sph = self.f[index.bb_sphx-1:index.bb_sphz, ...]
+            self.bb_sph = take(self.f, np.s_[index.bb_sphx-1:index.bb_sphz, ...])
         # Special treatment for test method vector quantities.
         #Note index 1,2,3,...,0 last vector may be the zero field/flow
         if hasattr(index, 'aatest1'):
@@ -505,13 +811,13 @@ class DataCube(object):
             for j in range(0,naatest):
                 key = 'aatest'+str(np.mod(j+1,naatest))
                 value = index.__dict__['aatest1'] + 3*j
-                setattr(self, key, self.f[value-1:value+2, ...])
+                setattr(self, key, take(self.f, np.s_[value-1:value+2, ...]))
         if hasattr(index, 'uutest1'):
             nuutest = int(len(uutest)/3)
             for j in range(0,nuutest):
                 key = 'uutest'+str(np.mod(j+1,nuutest))
                 value = index.__dict__['uutest'] + 3*j
-                setattr(self, key, self.f[value-1:value+2, ...])
+                setattr(self, key, take(self.f, np.s_[value-1:value+2, ...]))
 
         self.t = t
         self.dx = dx
@@ -520,10 +826,252 @@ class DataCube(object):
         if param.lshear:
             self.deltay = deltay
 
-        # Do the rest of magic after the trimall (i.e. no additional curl.)
+        # Magic quantities are computed from the untrimmed f-array on first
+        # access, see __getattr__. Keep what is needed to compute them.
         self.magic = magic
-        if self.magic is not None:
-            self.magic_attributes(param)
+        if region is not None:
+            offset = tuple(c.start for c in crop)
+        elif trimall:
+            if not run2D:
+                offset = (dim.n1, dim.m1, dim.l1)
+            elif dim.ny == 1:
+                offset = (dim.n1, dim.l1)
+            else:
+                offset = (dim.m1, dim.l1)
+        else:
+            offset = (0,)*(len(f.shape) - 1)
+        self.__magic = {'f': f, 'x': x, 'y': y, 'index': index,
+                        'param': param, 'offset': offset, 'run2D': run2D,
+                        'lazy': lazy, 'computed': set(), 'busy': set()}
+
+
+    def __open_var_record(self, file_name, precision, loc_shape):
+        """
+        Open a VAR file and check the marker of the f-array record.
+        Returns the open file positioned at the start of the f-array data,
+        the size of the record in bytes and the number of variables.
+        """
+
+        import numpy as np
+
+        n_loc = int(np.prod(loc_shape))*np.dtype(precision).itemsize
+        infile = open(file_name, 'rb')
+        n_bytes = int(np.fromfile(infile, dtype=np.uint32, count=1)[0])
+        if n_bytes == 0 or n_bytes % n_loc != 0:
+            infile.close()
+            raise ValueError("Size of the f-array record in {0} does not "
+                             "match the dimensions.".format(file_name))
+
+        return infile, n_bytes, n_bytes//n_loc
+
+
+    def __map_var_record(self, file_name, precision, loc_shape,
+                         components=None):
+        """
+        Memory map the f-array record of a VAR file and read the grid record.
+        Returns the open file positioned after the grid record, the mapped
+        f-array and the raw grid record.
+        """
+
+        from scipy.io import FortranFile
+        from .lazy_arrays import MappedRecord
+
+        infile, n_bytes, n_vars = self.__open_var_record(file_name, precision,
+                                                         loc_shape)
+        f_loc = MappedRecord(file_name, 4, (n_vars,) + tuple(loc_shape),
+                             precision, components=components)
+        infile.seek(4 + n_bytes + 4)
+        infile = FortranFile(infile)
+        raw_etc = infile.read_record(dtype=precision)
+
+        return infile, f_loc, raw_etc
+
+
+    def __read_var_tile(self, file_name, precision, loc_shape, f_dst, src,
+                        components=None):
+        """
+        Read the f-array record of a VAR file straight into its place in the
+        global array, and read the grid record.
+        Planes of the record which are contiguous in the global array are
+        read into it directly, otherwise they pass through a small buffer,
+        so no temporary array of the size of the tile is needed.
+        Returns the open file positioned after the grid record, the raw grid
+        record and the number of bytes of f-array data read.
+        """
+
+        import numpy as np
+        from scipy.io import FortranFile
+
+        infile, n_bytes, n_vars = self.__open_var_record(file_name, precision,
+                                                         loc_shape)
+        if components is None:
+            components = range(f_dst.shape[0])
+        if len(components) > n_vars or max(components) >= n_vars:
+            infile.close()
+            raise ValueError("{0} holds only {1} variables.".format(
+                file_name, n_vars))
+
+        n_comp = n_bytes//n_vars
+        plane_shape = tuple(loc_shape[1:])
+        plane_bytes = n_comp//loc_shape[0]
+        n_planes = src[0].stop - src[0].start
+        full_planes = all(s.start == 0 and s.stop == n
+                          for s, n in zip(src[1:], plane_shape))
+        # Buffer of at most 16 MB for planes which are cut.
+        chunk = max(1, min(n_planes, 2**24//plane_bytes))
+        buffer = None
+
+        n_read = 0
+        for k, comp in enumerate(components):
+            f_comp = f_dst[k]
+            infile.seek(4 + comp*n_comp + src[0].start*plane_bytes)
+            if full_planes and f_comp.flags.c_contiguous:
+                n_read += infile.readinto(f_comp)
+                continue
+            if buffer is None:
+                buffer = np.empty((chunk,) + plane_shape, dtype=precision)
+            for p0 in range(0, n_planes, chunk):
+                p1 = min(p0 + chunk, n_planes)
+                n_read += infile.readinto(buffer[:p1-p0])
+                f_comp[p0:p1] = buffer[(slice(0, p1-p0),) + tuple(src[1:])]
+        if n_read != len(components)*n_planes*plane_bytes:
+            infile.close()
+            raise ValueError("{0} is truncated.".format(file_name))
+
+        infile.seek(4 + n_bytes + 4)
+        infile = FortranFile(infile)
+        raw_etc = infile.read_record(dtype=precision)
+
+        return infile, raw_etc, n_read
+
+
+    def __select_variables(self, variables, index, total_vars):
+        """
+        Find the f-array components of the requested variables.
+        Returns the sorted list of 0-based components and a copy of the
+        index in which the selected variables are renumbered accordingly.
+        """
+
+        import copy
+
+        vectors = {'uu': ('ux', 'uy', 'uz'), 'aa': ('ax', 'ay', 'az'),
+                   'uu_sph': ('uu_sphx', 'uu_sphy', 'uu_sphz'),
+                   'bb_sph': ('bb_sphx', 'bb_sphy', 'bb_sphz')}
+
+        components = set()
+        for name in variables:
+            if name in vectors.keys():
+                names = vectors[name]
+            else:
+                names = (name,)
+            for key in names:
+                if key == 'keys' or not hasattr(index, key):
+                    raise ValueError("read.var: variable '{0}' is not in "
+                                     "index.pro.".format(name))
+                value = getattr(index, key)
+                if value > total_vars:
+                    raise ValueError("read.var: variable '{0}' is not in "
+                                     "the VAR file.".format(name))
+                components.add(value - 1)
+        components = sorted(components)
+
+        index_sub = copy.copy(index)
+        index_sub.__dict__ = {'keys': index.keys}
+        for key, value in index.__dict__.items():
+            if key == 'keys' or key in vectors.keys():
+                continue
+            if value - 1 in components:
+                setattr(index_sub, key, components.index(value - 1) + 1)
+        for key, names in vectors.items():
+            if hasattr(index, key) and all(hasattr(index_sub, name)
+                                           for name in names):
+                setattr(index_sub, key, getattr(index_sub, names[0]))
+
+        return components, index_sub
+
+
+    def __region_slices(self, region, region_coords, dim, datadir, proc,
+                        trimall, magic):
+        """
+        Convert the region bounds into slices of the global array.
+        Returns the slices (z, y, x) to be read, padded by the ghost zones
+        if magic quantities are to be computed, and the slices of the
+        region within them.
+        """
+
+        import numpy as np
+        from .. import read
+
+        region = list(region) + [None]*(3 - len(region))
+        sizes = (dim.mx, dim.my, dim.mz)
+        ghosts = (dim.nghostx, dim.nghosty, dim.nghostz)
+        if region_coords:
+            grid = read.grid(datadir=datadir, proc=proc, quiet=True,
+                             trim=False)
+            coords = (grid.x, grid.y, grid.z)
+
+        box = []
+        crop = []
+        for i in range(3):
+            if trimall:
+                valid = range(ghosts[i], sizes[i] - ghosts[i])
+            else:
+                valid = range(sizes[i])
+            if region[i] is None:
+                i0, i1 = valid.start, valid.stop
+            elif region_coords:
+                c = coords[i][valid.start:valid.stop]
+                hit = np.nonzero((c >= region[i][0]) & (c <= region[i][1]))[0]
+                if hit.size == 0:
+                    raise ValueError("read.var: region {0} is empty.".format(
+                        region[i]))
+                i0, i1 = valid.start + hit[0], valid.start + hit[-1] + 1
+            else:
+                selected = valid[slice(region[i][0], region[i][1])]
+                if len(selected) == 0:
+                    raise ValueError("read.var: region {0} is empty.".format(
+                        region[i]))
+                i0, i1 = selected.start, selected.stop
+            if magic is not None:
+                pad = ghosts[i]
+            else:
+                pad = 0
+            p0 = max(i0 - pad, 0)
+            p1 = min(i1 + pad, sizes[i])
+            box.insert(0, slice(int(p0), int(p1)))
+            crop.insert(0, slice(int(i0 - p0), int(i1 - p0)))
+
+        return tuple(box), tuple(crop)
+
+
+    def close(self):
+        """
+        Close the HDF5 file kept open by a lazy read.
+        """
+
+        if self.h5_file is not None:
+            self.h5_file.close()
+            self.h5_file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def __fits(self, out, shape, precision):
+        """
+        Check if the array out can hold an f-array of this shape and type.
+        """
+
+        import numpy as np
+
+        return isinstance(out, np.ndarray) and out.shape == tuple(shape) and \
+               out.dtype == np.dtype(precision) and out.flags.c_contiguous and \
+               out.flags.writeable
 
 
     def __natural_sort(self, procs_list):
@@ -540,73 +1088,243 @@ class DataCube(object):
 
     def magic_attributes(self, param):
         """
-        Compute some additional 'magic' quantities.
+        Compute the 'magic' quantities now instead of on first access.
+        """
+
+        self.__magic['param'] = param
+        for field in self.magic:
+            getattr(self, field, None)
+
+
+    def clear_magic(self, fields=None):
+        """
+        Free the computed 'magic' quantities. They are computed again on
+        the next access.
+
+        call signature:
+
+        clear_magic(fields=None)
+
+        Keyword arguments:
+
+        *fields*:
+          List of the quantities to free, e.g. ['bb']. By default all are
+          freed.
+        """
+
+        computed = self.__dict__.get('_DataCube__magic', {}).get('computed',
+                                                                 set())
+        if fields is None:
+            fields = list(computed)
+        for field in fields:
+            if field in computed:
+                computed.discard(field)
+                del self.__dict__[field]
+
+
+    def __getattr__(self, name):
+        """
+        Compute a 'magic' quantity on its first access. Only called if name
+        is not an attribute yet.
+        """
+
+        magic = self.__dict__.get('magic')
+        state = self.__dict__.get('_DataCube__magic')
+        if name.startswith('__') or not magic or state is None or \
+           name not in magic or name in state['busy']:
+            raise AttributeError("'DataCube' object has no attribute "
+                                 "'{0}'".format(name))
+
+        # Quantities may depend on each other, e.g. tt on ss and ss on tt.
+        state['busy'].add(name)
+        try:
+            value = self.__magic_value(name)
+        finally:
+            state['busy'].discard(name)
+        if value is None:
+            raise AttributeError("'DataCube' object has no attribute "
+                                 "'{0}'".format(name))
+        self.__dict__[name] = value
+        state['computed'].add(name)
+        return value
+
+
+    def __magic_value(self, name):
+        """
+        Compute the whole 'magic' quantity, or set up a lazy array which
+        computes the indexed part only.
         """
 
         import numpy as np
-        import sys
+        from .lazy_arrays import ComputedArray, TiledArray
+
+        state = self.__magic
+        if name in ('bb', 'jj', 'vort'):
+            compute = lambda key: self.__magic_curl(name, key)
+            shape = (3,) + self.f.shape[1:]
+        elif name in ('rho', 'tt', 'ss', 'pp'):
+            compute = lambda key: self.__magic_point(name, key)
+            shape = self.f.shape[1:]
+        else:
+            return None
 
-        for field in self.magic:
-            if field == 'rho' and not hasattr(self, 'rho'):
-                if hasattr(self, 'lnrho'):
-                    setattr(self, 'rho', np.exp(self.lnrho))
-                else:
-                    sys.exit("Problem in magic: lnrho is missing")
+        if not state['lazy']:
+            return compute(Ellipsis)
+        # The type of the eager result, e.g. float64 for 'jj' and 'tt' of
+        # single precision data, from a single point.
+        dtype = compute(tuple(slice(0, 1) for n in shape)).dtype
+        spatial = tuple(slice(0, n) for n in self.f.shape[1:])
+        return TiledArray(shape, dtype,
+                          [(ComputedArray(compute, shape, dtype),
+                            spatial, spatial)])
 
-            if field == 'tt' and not hasattr(self, 'tt'):
-                if hasattr(self, 'lnTT'):
-                    tt = np.exp(self.lnTT)
-                    setattr(self, 'tt', tt)
-                else:
-                    if hasattr(self, 'ss'):
-                        if hasattr(self, 'lnrho'):
-                            lnrho = self.lnrho
-                        elif hasattr(self, 'rho'):
-                            lnrho = np.log(self.rho)
-                        else:
-                            sys.exit("Problem in magic: missing rho or"+
-                                     " lnrho variable")
-                        cp = param.cp
-                        gamma = param.gamma
-                        cs20 = param.cs0**2
-                        lnrho0 = np.log(param.rho0)
-                        lnTT0 = np.log(cs20/(cp*(gamma-1.)))
-                        lnTT = lnTT0+gamma/cp*self.ss+(gamma-1.)* \
-                               (lnrho-lnrho0)
-                        setattr(self, 'tt', np.exp(lnTT))
-                    else:
-                        sys.exit("Problem in magic: ss is missing ")
-
-            if field == 'ss' and not hasattr(self, 'ss'):
-                cp = param.cp
-                gamma = param.gamma
-                cs20 = param.cs0**2
-                lnrho0 = np.log(param.rho0)
-                lnTT0 = np.log(cs20/(cp*(gamma-1.)))
-                if hasattr(self, 'lnTT'):
-                    setattr(self, 'ss', cp/gamma*(self.lnTT-lnTT0- \
-                            (gamma-1.)*(self.lnrho-lnrho0)))
-                elif hasattr(self, 'tt'):
-                    setattr(self, 'ss', cp/gamma*(np.log(self.tt)- \
-                            lnTT0-(gamma-1.)*(self.lnrho-lnrho0)))
-                else:
-                    sys.exit("Problem in magic: missing lnTT or tt")
-
-            if field == 'pp' and not hasattr(self, 'pp'):
-                cp = param.cp
-                gamma = param.gamma
-                cv = cp/gamma
-                if hasattr(self, 'lnrho'):
-                    lnrho = self.lnrho
-                elif hasattr(self, 'rho'):
-                    lnrho = np.log(self.rho)
+
+    def __magic_curl(self, name, key):
+        """
+        Compute the curl ('bb', 'vort') or double curl ('jj') of a vector
+        for the index key of the (trimmed) data cube. Only the part of the
+        f-array within the reach of the derivatives is used, unless the
+        key extends into the ghost zones, where the derivatives depend on
+        the whole extent of the axis.
+        """
+
+        import numpy as np
+        from ..math.derivatives import curl, curl2
+        from .lazy_arrays import _range_to_slice
+
+        state = self.__magic
+        f = state['f']
+        index = state['index']
+        param = state['param']
+        if name == 'vort':
+            components = slice(index.ux-1, index.uz)
+            levels = 1
+        else:
+            components = slice(index.ax-1, index.az)
+            levels = 1 + (name == 'jj')
+
+        if not isinstance(key, tuple):
+            key = (key,)
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),)*(len(f.shape) - len(key) + 1) + \
+                  key[i+1:]
+        key = key + (slice(None),)*(len(f.shape) - len(key))
+
+        # Half width of the 6th order derivative stencils.
+        reach = 3*levels
+        box = []
+        local = []
+        for k, n, offset, size in zip(key[1:], self.f.shape[1:],
+                                      state['offset'], f.shape[1:]):
+            if isinstance(k, slice):
+                r = range(n)[k]
+                r = range(r.start + offset, r.stop + offset, r.step)
+                if len(r) == 0:
+                    lo, hi = offset, offset
                 else:
-                    sys.exit("pb in magic: missing rho or lnrho variable")
+                    lo, hi = min(r[0], r[-1]), max(r[0], r[-1]) + 1
+            else:
+                r = range(n)[k] + offset
+                lo, hi = r, r + 1
+            if state['run2D'] or lo - reach < 0 or hi + reach > size:
+                p0, p1 = 0, size
+            else:
+                p0, p1 = lo - reach, hi + reach
+            box.append(slice(p0, p1))
+            if isinstance(r, range):
+                local.append(_range_to_slice(range(r.start - p0, r.stop - p0,
+                                                   r.step)))
+            else:
+                local.append(r - p0)
+
+        aa = f[(components,) + tuple(box)]
+        x = state['x'][box[-1]]
+        if state['run2D']:
+            y = state['y']
+        else:
+            y = state['y'][box[-2]]
+        if name == 'jj':
+            value = curl2(aa, self.dx, self.dy, self.dz, x=x, y=y,
+                          coordinate_system=param.coord_system)
+        else:
+            value = curl(aa, self.dx, self.dy, self.dz, x=x, y=y,
+                         run2D=state['run2D'],
+                         coordinate_system=param.coord_system)
+        return value[(key[0],) + tuple(local)]
+
+
+    def __magic_point(self, name, key):
+        """
+        Compute a thermodynamic 'magic' quantity for the index key of the
+        (trimmed) data cube.
+        """
+
+        import numpy as np
+        import sys
+
+        param = self.__magic['param']
+        get = lambda field: getattr(self, field)[key]
+
+        if name == 'rho':
+            if hasattr(self, 'lnrho'):
+                return np.exp(get('lnrho'))
+            else:
+                sys.exit("Problem in magic: lnrho is missing")
+
+        if name == 'tt':
+            if hasattr(self, 'lnTT'):
+                return np.exp(get('lnTT'))
+            else:
                 if hasattr(self, 'ss'):
-                    setattr(self, 'pp', np.exp(gamma*(self.ss+lnrho)))
-                elif hasattr(self, 'lntt'):
-                    setattr(self, 'pp', (cp-cv)*np.exp(self.lntt+lnrho))
-                elif hasattr(self, 'tt'):
-                    setattr(self, 'pp', (cp-cv)*self.tt*np.exp(lnrho))
+                    if hasattr(self, 'lnrho'):
+                        lnrho = get('lnrho')
+                    elif hasattr(self, 'rho'):
+                        lnrho = np.log(get('rho'))
+                    else:
+                        sys.exit("Problem in magic: missing rho or"+
+                                 " lnrho variable")
+                    cp = param.cp
+                    gamma = param.gamma
+                    cs20 = param.cs0**2
+                    lnrho0 = np.log(param.rho0)
+                    lnTT0 = np.log(cs20/(cp*(gamma-1.)))
+                    lnTT = lnTT0+gamma/cp*get('ss')+(gamma-1.)* \
+                           (lnrho-lnrho0)
+                    return np.exp(lnTT)
                 else:
-                    sys.exit("Problem in magic: missing ss or lntt or tt")
+                    sys.exit("Problem in magic: ss is missing ")
+
+        if name == 'ss':
+            cp = param.cp
+            gamma = param.gamma
+            cs20 = param.cs0**2
+            lnrho0 = np.log(param.rho0)
+            lnTT0 = np.log(cs20/(cp*(gamma-1.)))
+            if hasattr(self, 'lnTT'):
+                return cp/gamma*(get('lnTT')-lnTT0- \
+                       (gamma-1.)*(get('lnrho')-lnrho0))
+            elif hasattr(self, 'tt'):
+                return cp/gamma*(np.log(get('tt'))- \
+                       lnTT0-(gamma-1.)*(get('lnrho')-lnrho0))
+            else:
+                sys.exit("Problem in magic: missing lnTT or tt")
+
+        if name == 'pp':
+            cp = param.cp
+            gamma = param.gamma
+            cv = cp/gamma
+            if hasattr(self, 'lnrho'):
+                lnrho = get('lnrho')
+            elif hasattr(self, 'rho'):
+                lnrho = np.log(get('rho'))
+            else:
+                sys.exit("pb in magic: missing rho or lnrho variable")
+            if hasattr(self, 'ss'):
+                return np.exp(gamma*(get('ss')+lnrho))
+            elif hasattr(self, 'lntt'):
+                return (cp-cv)*np.exp(get('lntt')+lnrho)
+            elif hasattr(self, 'tt'):
+                return (cp-cv)*get('tt')*np.exp(lnrho)
+            else:
+                sys.exit("Problem in magic: missing ss or lntt or tt")
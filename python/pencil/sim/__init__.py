@@ -6,3 +6,5 @@ from .get import *
 from .group import *
 from .sort import *
 from .remesh import *
+from .catalog import *
+from .manifest import *
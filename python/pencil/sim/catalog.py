@@ -0,0 +1,314 @@
+#
+# catalog.py
+#
+# Persistent catalog of the simulations in a directory tree.
+#
+"""
+Contains the catalog class, an SQLite file at the root of a tree of
+simulations holding their key quantities, so simulations can be sorted,
+grouped and filtered without building every simulation object.
+"""
+
+def catalog(*args, **kwargs):
+    """
+    Open the catalog of the simulations below path_root, creating it if
+    needed, and bring it up to date.
+
+    Args for Constructor:
+        path_root:  root directory of the simulations, default = '.'
+        depth:      depth of searching for simulations, as for get_sims,
+                    default = 0
+        file_name:  name of the catalog file in path_root,
+                    default = 'pc_catalog.sqlite'
+        update:     scan for new, changed and removed simulations,
+                    default is True
+        n_workers:  number of threads reading the changed simulations,
+                    default = 1
+        quiet:      suppress irrelevant output, default is True
+
+    For every simulation the catalog holds its path relative to path_root,
+    name, whether it has started, nx, ny, nz, the number of VAR and PVAR
+    files, the last time of the time series and the scalar parameters of
+    param.nml (with Lx, Ly, Lz from lxyz) and dim.dat. Only simulations
+    whose run.in, start.in, param.nml, param2.nml, dim.dat, time_series.dat
+    or data/proc0 changed since the last update are read again.
+
+    Methods:
+        self.update:    rescan the directory tree
+        self.paths:     paths of the simulations in the catalog
+        self.values:    values of a quantity for all simulations
+        self.filter:    simulations matching conditions on quantities
+        self.sort:      simulations sorted by a quantity
+        self.group:     simulations grouped by a quantity
+        self.get_sims:  simulation objects for a list of paths
+    """
+
+    return __Catalog__(*args, **kwargs)
+
+class __Catalog__(object):
+    """
+    Catalog of simulations.
+    """
+
+    # version of the tables, older catalogs are rebuilt
+    version = 1
+    # quantities stored as columns of the sims table
+    columns = ['name', 'started', 'nx', 'ny', 'nz', 'n_var', 'n_pvar',
+               't_last']
+
+    def __init__(self, path_root='.', depth=0, file_name='pc_catalog.sqlite',
+                 update=True, n_workers=1, quiet=True):
+        import sqlite3
+        from os.path import abspath, join
+
+        self.path_root = abspath(path_root)
+        self.depth = depth
+        self.file_name = join(self.path_root, file_name)
+        self.connection = sqlite3.connect(self.file_name)
+
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] \
+           != self.version:
+            with self.connection:
+                self.connection.execute('DROP TABLE IF EXISTS sims')
+                self.connection.execute('DROP TABLE IF EXISTS params')
+                self.connection.execute(
+                    'CREATE TABLE sims (path TEXT PRIMARY KEY, signature TEXT, '
+                    'name TEXT, started INTEGER, nx INTEGER, ny INTEGER, '
+                    'nz INTEGER, n_var INTEGER, n_pvar INTEGER, t_last REAL)')
+                self.connection.execute(
+                    'CREATE TABLE params (path TEXT, key TEXT, value TEXT, '
+                    'PRIMARY KEY (key, path))')
+                self.connection.execute(
+                    'PRAGMA user_version = {0}'.format(self.version))
+
+        if update: self.update(n_workers=n_workers, quiet=quiet)
+        # Done
+
+    def close(self):
+        """Close the catalog file."""
+        self.connection.close()
+
+    def update(self, n_workers=1, quiet=True):
+        """Scan path_root for simulations, read those which are new or
+        changed since the last update and remove those which are gone.
+
+        Args:
+            n_workers:  number of threads reading the changed simulations
+            quiet:      suppress irrelevant output
+        """
+        import json
+        from os.path import join, relpath
+        from concurrent.futures import ThreadPoolExecutor
+        from ..io import walklevel
+        from ..read.metadata_cache import file_signature
+        from .is_sim_dir import is_sim_dir
+
+        # simulations in the tree and the state of their files
+        paths = []
+        for path, dirs in walklevel(self.path_root, self.depth):
+            for sdir in dirs:
+                if sdir.startswith('.'): continue
+                if is_sim_dir(join(path, sdir)): paths.append(join(path, sdir))
+        if is_sim_dir(self.path_root): paths.append(self.path_root)
+
+        signatures = {}
+        for path in paths:
+            files = [join(path, 'run.in'), join(path, 'start.in')] + \
+                    [join(path, 'data', name) for name in
+                     ['param.nml', 'param2.nml', 'dim.dat', 'time_series.dat',
+                      'proc0']]
+            signatures[relpath(path, self.path_root)] = json.dumps(
+                [[mtime, size] for name, mtime, size in file_signature(files)])
+
+        known = dict(self.connection.execute('SELECT path, signature FROM sims'))
+        changed = [path for path in signatures
+                   if known.get(path) != signatures[path]]
+        removed = [path for path in known if not path in signatures]
+
+        if n_workers > 1 and len(changed) > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                entries = list(executor.map(self.__scan, changed))
+        else:
+            entries = [self.__scan(path) for path in changed]
+
+        with self.connection:
+            for path in changed + removed:
+                self.connection.execute('DELETE FROM sims WHERE path = ?', (path,))
+                self.connection.execute('DELETE FROM params WHERE path = ?', (path,))
+            for path, (entry, params) in zip(changed, entries):
+                self.connection.execute(
+                    'INSERT INTO sims VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [path, signatures[path]] + [entry[key] for key in self.columns])
+                self.connection.executemany(
+                    'INSERT INTO params VALUES (?, ?, ?)',
+                    [(path, key, json.dumps(value)) for key, value in params.items()])
+
+        if not quiet:
+            print('~ Catalog '+self.file_name+': '+str(len(signatures))+
+                  ' simulations, '+str(len(changed))+' updated, '+
+                  str(len(removed))+' removed.')
+        return self
+
+    def __scan(self, path):
+        """Read the catalog entry and the parameters of the simulation at
+        path, relative to path_root."""
+        import numpy as np
+        from os.path import join, exists
+        from .. import read
+        from .simulation import simulation
+
+        sim = simulation(join(self.path_root, path), quiet=True, lazy=True)
+        entry = {'name': sim.name, 'started': sim.started(),
+                 'n_var': len(sim.get_varlist()),
+                 'n_pvar': len(sim.get_pvarlist()),
+                 'nx': None, 'ny': None, 'nz': None, 't_last': None}
+        try:
+            entry['t_last'] = float(sim.get_T_last())
+        except Exception:
+            pass
+
+        params = {}
+        if exists(join(sim.datadir, 'param.nml')):
+            try:
+                param = read.param(datadir=sim.datadir, quiet=True,
+                                   conflicts_quiet=True)
+                for key, value in vars(param).items():
+                    if type(value) in [bool, list, float, int, str]:
+                        params[key] = value
+                if isinstance(params.get('lxyz'), list):
+                    for ii, key in enumerate(['Lx', 'Ly', 'Lz']):
+                        params[key] = params[key.lower()] = params['lxyz'][ii]
+            except Exception:
+                print('? WARNING: Couldnt read param.nml for '+sim.path)
+        if exists(join(sim.datadir, 'dim.dat')):
+            try:
+                dim = read.dim(datadir=sim.datadir)
+                for key, value in vars(dim).items():
+                    if isinstance(value, (int, np.integer)) and \
+                       not isinstance(value, bool) and not key in params:
+                        params[key] = int(value)
+                entry['nx'], entry['ny'], entry['nz'] = \
+                    int(dim.nx), int(dim.ny), int(dim.nz)
+            except Exception:
+                print('? WARNING: Couldnt read dim.dat for '+sim.path)
+
+        return entry, params
+
+    def paths(self, only_started=False):
+        """Return the naturally sorted paths of the simulations, relative to
+        path_root."""
+        from ..math import natural_sort
+
+        query = 'SELECT path FROM sims'
+        if only_started: query += ' WHERE started'
+        return natural_sort([row[0] for row in self.connection.execute(query)])
+
+    def values(self, quantity, only_started=False):
+        """Return a dictionary of the paths of the simulations having
+        quantity and its value. Quantities are the catalog columns (name,
+        started, nx, ny, nz, n_var, n_pvar, t_last) or parameters."""
+        import json
+
+        if quantity in self.columns:
+            query = 'SELECT path, {0} FROM sims WHERE {0} IS NOT NULL'.format(quantity)
+            if only_started: query += ' AND started'
+            rows = self.connection.execute(query)
+            if quantity == 'started':
+                return {path: bool(value) for path, value in rows}
+            return dict(rows)
+
+        query = 'SELECT params.path, params.value FROM params'
+        if only_started:
+            query += ' JOIN sims ON params.path = sims.path WHERE started AND key = ?'
+        else:
+            query += ' WHERE key = ?'
+        return {path: json.loads(value) for path, value in
+                self.connection.execute(query, (quantity,))}
+
+    def filter(self, only_started=False, materialize=False, lazy=True,
+               **conditions):
+        """Return the simulations matching all conditions, given as
+        quantity=value or quantity=function returning True for matching
+        values, e.g. filter(nx=64, t_last=lambda t: t > 10).
+
+        Args:
+            only_started:   only simulations which have started
+            materialize:    return simulation objects instead of paths
+            lazy:           create lazy simulation objects, see get_sims
+        """
+        matching = set(self.paths(only_started=only_started))
+        for quantity, condition in conditions.items():
+            values = self.values(quantity, only_started=only_started)
+            if callable(condition):
+                matching &= set(path for path, value in values.items()
+                                if condition(value))
+            else:
+                matching &= set(path for path, value in values.items()
+                                if value == condition)
+
+        paths = [path for path in self.paths(only_started=only_started)
+                 if path in matching]
+        if materialize: return self.get_sims(paths, lazy=lazy)
+        return paths
+
+    def group(self, groupby, sort=True, only_started=False, reverse=False,
+              materialize=True, lazy=True):
+        """Group the simulations by a quantity, like sim.group.
+        Simulations without groupby are left out.
+
+        Args:
+            groupby:        quantity after which the grouping shall happen
+            sort:           set True to sort returned dictionary naturally
+            only_started:   only group simulations that already has started
+            reverse:        reverse order of the groups
+            materialize:    return simulation objects instead of paths
+            lazy:           create lazy simulation objects, see get_sims
+
+        Return:
+            a dictionary with keywords are the group entries and values are
+            lists of simulations (or paths) in that group
+        """
+        from collections import OrderedDict
+        from ..math import natural_sort
+
+        values = self.values(groupby, only_started=only_started)
+        groups = OrderedDict()
+        for path in self.paths(only_started=only_started):
+            if path in values:
+                groups.setdefault(str(values[path]), []).append(path)
+
+        if sort:
+            groups = OrderedDict((key, groups[key]) for key in
+                                 natural_sort(groups.keys(), reverse=reverse))
+        if materialize:
+            for key in groups:
+                groups[key] = self.get_sims(groups[key], lazy=lazy)
+        return groups
+
+    def sort(self, sortby, only_started=False, reverse=False,
+             materialize=True, lazy=True):
+        """Sort the simulations by a quantity, like sim.sort.
+        Simulations without sortby are left out.
+
+        Args:
+            sortby:         quantity after which the sorting shall happen
+            only_started:   only sort simulations that already has started
+            reverse:        reverse order
+            materialize:    return simulation objects instead of paths
+            lazy:           create lazy simulation objects, see get_sims
+        """
+        groups = self.group(sortby, sort=True, only_started=only_started,
+                            reverse=reverse, materialize=False)
+        paths = [path for group in groups.values() for path in group]
+        if reverse: paths = paths[::-1]
+        if materialize: return self.get_sims(paths, lazy=lazy)
+        return paths
+
+    def get_sims(self, paths, lazy=True, quiet=True):
+        """Return the simulation objects of a list of paths relative to
+        path_root, as from sim.get."""
+        from os.path import join
+        from .get import get
+
+        return [get(join(self.path_root, path), quiet=quiet, lazy=lazy)
+                for path in paths]
@@ -1,4 +1,4 @@
-def get(path='.', quiet=False):
+def get(path='.', quiet=False, lazy=False):
     """
     Return simulation object from 'path, if already existing, or creates new
     simulation object from path, if its as simulation.
@@ -6,31 +6,43 @@ def get(path='.', quiet=False):
     Args:
         path:   base directory where to look for simulation from.
         quiet:  Switches out the output of the function. Default: False.
+        lazy:   Read param, grid and dim of a new simulation object only
+                when first accessed and do not update an existing one.
+                Default: False.
     """
 
     from os.path import isdir, join, exists, basename
-    from ..io import load
     from . simulation import simulation
+    from .manifest import load_manifest
 
-    if exists(join(path, 'pc/sim.dill')):
+    if exists(join(path, 'pc/sim.json')):
+        sim = load_manifest(path, quiet=quiet)
+        if sim:
+            if not lazy:
+                sim.update(quiet=quiet)
+            return sim
+        print('? Warning: sim.json in '+path+' is not valid, recreating simulation object..')
+    elif exists(join(path, 'pc/sim.dill')):
+        # simulation object exported by older versions, replaced by sim.json
         try:
+            from ..io import load
             sim = load('sim', folder=join(path, 'pc'))
             sim.update(quiet=quiet)
+            sim.export()
             return sim
         except:
-            import os
             print('? Warning: sim.dill in '+path+' is not up to date, recreating simulation object..')
-            os.system('rm '+join(path, 'pc/sim.dill'))
 
     from .. import __is_sim_dir__
     if __is_sim_dir__(path):
         if quiet == False: print('~ Found simulation in '+path+' and simulation object is created for the first time. May take some time.. ')
-        return simulation(path, quiet=quiet)
+        return simulation(path, quiet=quiet, lazy=lazy)
     else:
         print('? WARNING: No simulation found in '+path+' -> try get_sims maybe?')
         return False
 
-def get_sims(path_root='.', depth=0, unhide_all=True, quiet=False):
+def get_sims(path_root='.', depth=0, unhide_all=True, quiet=False,
+             lazy=False, n_workers=1):
     """
     Returns all found simulations as object list from all subdirs, not
     following symbolic links.
@@ -42,8 +54,14 @@ def get_sims(path_root='.', depth=0, unhide_all=True, quiet=False):
         unhide_all  unhides all simulation found if True, if False (default)
                     hidden sim will stay hidden.
         quiet:      Switches out the output of the function. Default: False.
+        lazy        read param, grid and dim of the simulations only when
+                    first accessed, and export only simulations which were
+                    renamed or unhidden. Default: False.
+        n_workers   number of threads getting the simulation objects.
+                    Default: 1.
     """
     from os.path import join, basename
+    from concurrent.futures import ThreadPoolExecutor
     import numpy as np
 
     from ..io import load
@@ -60,36 +78,52 @@ def get_sims(path_root='.', depth=0, unhide_all=True, quiet=False):
         print('~ A list of pencil code simulations is generated from this dir downwards, this may take some time..')
         print('~ (Symbolic links will not be followed, since this can lead to infinit recursion.)')
 
+    def run(function, items):
+        # map function over items, in a pool of n_workers threads
+        if n_workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                return list(executor.map(function, items))
+        return [function(item) for item in items]
+
     # get overview of simulations in all lower dirs
-    sim_paths = []
+    candidates = []
     for path, dirs in walklevel(path_root, depth):
 
         for sdir in dirs:
             if sdir.startswith('.'): continue
-            sd = join(path, sdir)
-            if is_sim_dir(sd) and not basename(sd).startswith('.'):
-                if not quiet: print('# Found Simulation in '+sd)
-                sim_paths.append(sd)
+            candidates.append(join(path, sdir))
+    sim_paths = []
+    for sd, found in zip(candidates, run(is_sim_dir, candidates)):
+        if found and not basename(sd).startswith('.'):
+            if not quiet: print('# Found Simulation in '+sd)
+            sim_paths.append(sd)
     if is_sim_dir('.'): sim_paths.append('.')
 
     # take care of each simulation found, i.e.
     # generate new simulation object for each and append the sim.-object on sim_list
+    sims = run(lambda path: get(path, quiet=quiet, lazy=lazy), sim_paths)
+
     sim_list = []
-    for path in sim_paths:
-        sim = get(path, quiet=quiet)
+    for sim in sims:
+        changed = False
 
         # check if sim.name is already existing as a name for a different simulation (name conflict?)
         for s in sim_list:			# check for double names
             if sim.name == s.name:
                 sim.name = sim.name+'#'		# add # to dublicate
+                changed = True
                 if not quiet:
                     print("? Warning: Found two simulations with the same name: "
                           +sim.path+' and '+s.path)
                     print("? Changed name of "+sim.path+' to '+sim.name
                           +' -> rename simulation and re-export manually')
 
-        if unhide_all: sim.unhide()
-        sim.export()
+        if lazy:
+            if unhide_all and sim.hidden: sim.unhide()
+            elif changed: sim.export()
+        else:
+            if unhide_all: sim.unhide()
+            sim.export()
         sim_list.append(sim)
 
     # is sim_list empty?
@@ -4,6 +4,7 @@ def group(simulations, groupby, sort=True, only_started=False, reverse=False):
 
   Args:
     simulations:    put here a Simulations object or a list of simulations [sim1, sim2, ...]
+                    or a catalog, which is then queried (see catalog.group)
     groupby:        put here the heyword after which the grouping shall happen
     sort:           set True to sort returned dictionary naturally
     only_started:   only group simulations that already has started
@@ -14,9 +15,14 @@ def group(simulations, groupby, sort=True, only_started=False, reverse=False):
 
   from collections import OrderedDict
   from ..math import natural_sort
+  from .catalog import __Catalog__
 
   sim_dict_grouped = {}
 
+  if isinstance(simulations, __Catalog__):
+      return simulations.group(groupby, sort=sort, only_started=only_started,
+                               reverse=reverse)
+
   if type(simulations) == type(['list']):
       sim_list = simulations
   #elif type(simulations) == Simulations:
@@ -0,0 +1,276 @@
+#
+# manifest.py
+#
+# Store simulation objects as a JSON manifest with the grid arrays in
+# .npy files.
+#
+"""
+Contains the functions writing and reading the manifest of a simulation
+object, pc/sim.json, which replaces the dill file pc/sim.dill.
+
+The manifest holds the attributes of the simulation object, its parameters
+and dim as JSON. The arrays of grid and ghost_grid are stored as .npy files
+in pc/sim_grid/<hash>/, named after the hash of their content, and are
+memory mapped when loaded. The manifest is replaced atomically, so
+processes reading it concurrently to an export never see partial files.
+"""
+
+# version of the manifest, manifests of other versions are ignored
+__version = 1
+# attributes of the simulation object stored separately or not at all
+__special = ['param', 'dim', 'grid', 'ghost_grid', 'tmp_dict', '_lazy']
+
+
+def manifest_files(path):
+    """
+    Return the files of the simulation at path the param, dim and grid of
+    its simulation object are read from.
+    """
+
+    from os.path import join
+    from ..read.grid import grid_files
+
+    return grid_files({'datadir': join(path, 'data'), 'proc': -1,
+                       'ogrid': False, 'down': False})
+
+
+def export_manifest(sim):
+    """
+    Write the manifest of the simulation object sim to sim.pc_dir.
+    The grid arrays are only written if they changed and the manifest only
+    if its content changed.
+
+    Args:
+        sim:    simulation object
+    """
+
+    import json
+    import os
+    from os.path import join, exists, relpath
+    from ..io import mkdir
+    from ..read.metadata_cache import file_signature
+
+    mkdir(sim.pc_dir)
+
+    manifest = {'version': __version, 'attributes': {}}
+    for key, value in sim.__dict__.items():
+        if key in __special: continue
+        try:
+            json.dumps(value, default=__encode)
+        except (TypeError, ValueError):
+            print('? Warning: Attribute '+key+' of simulation '+sim.name+
+                  ' cannot be exported and is skipped.')
+            continue
+        manifest['attributes'][key] = value
+
+    if sim.__dict__.get('_lazy', False):
+        # param, grid and dim were never read, nothing to store
+        manifest['files'] = None
+        manifest['param'] = manifest['dim'] = False
+        manifest['grid'] = manifest['ghost_grid'] = False
+    else:
+        manifest['files'] = [[relpath(name, sim.path), mtime, size]
+                             for name, mtime, size in
+                             file_signature(manifest_files(sim.path))]
+        manifest['param'] = sim.param
+        manifest['dim'] = vars(sim.dim) if sim.dim else False
+        arrays = {}
+        for key in ['grid', 'ghost_grid']:
+            grid = getattr(sim, key)
+            if not grid:
+                manifest[key] = False
+                continue
+            manifest[key] = {'values': {}, 'arrays': []}
+            for name, value in vars(grid).items():
+                if getattr(value, 'ndim', 0) > 0:
+                    arrays[key+'.'+name] = value
+                    manifest[key]['arrays'].append(name)
+                else:
+                    manifest[key]['values'][name] = value
+        manifest['arrays'] = __write_arrays(sim.pc_dir, arrays)
+
+    text = json.dumps(__tuples(manifest), default=__encode, indent=1,
+                      sort_keys=True)
+    file_name = join(sim.pc_dir, 'sim.json')
+    if exists(file_name):
+        with open(file_name) as f:
+            if f.read() == text: return True
+    tmp_name = file_name+'.{0}.tmp'.format(os.getpid())
+    with open(tmp_name, 'w') as f:
+        f.write(text)
+    os.replace(tmp_name, file_name)
+
+    __remove_unused_arrays(sim.pc_dir, manifest.get('arrays'))
+    return True
+
+
+def load_manifest(path='.', quiet=True):
+    """
+    Return the simulation object stored in the manifest of the simulation
+    at path, or False if there is no valid manifest.
+    If the files param, dim or grid were read from changed since the
+    export, the returned object is lazy and reads them again on first
+    access.
+
+    Args:
+        path:   path to simulation
+        quiet:  suppress irrelevant output
+    """
+
+    import json
+    from os.path import join, exists, abspath
+
+    file_name = join(path, 'pc', 'sim.json')
+    # retry once, if an export removed the arrays in the meantime
+    for attempt in range(2):
+        if not exists(file_name): return False
+        try:
+            with open(file_name) as f:
+                manifest = json.load(f, object_hook=__decode)
+            if manifest.get('version') != __version:
+                if not quiet:
+                    print('? Warning: '+file_name+' has version '+
+                          str(manifest.get('version'))+' instead of '+
+                          str(__version)+', ignoring it.')
+                return False
+            return __build(manifest, abspath(path))
+        except (OSError, ValueError, KeyError):
+            continue
+    print('? Warning: Couldnt load '+file_name)
+    return False
+
+
+def __build(manifest, path):
+    """
+    Return the simulation object of manifest for the simulation at path.
+    """
+
+    import numpy as np
+    from os.path import join, relpath
+    from ..read.dim import Dim
+    from ..read.grid import Grid
+    from ..read.metadata_cache import file_signature
+    from .simulation import __Simulation__
+
+    sim = __Simulation__.__new__(__Simulation__)
+    sim.__dict__.update(manifest['attributes'])
+    sim.tmp_dict = {}
+    if sim.path != path:
+        # the simulation has been moved
+        sim.path = path
+        sim.datadir = join(path, 'data')
+        sim.pc_dir = join(path, 'pc')
+        sim.pc_datadir = join(path, 'data', 'pc')
+
+    files = [[relpath(name, path), mtime, size] for name, mtime, size in
+             file_signature(manifest_files(path))]
+    if files != manifest['files']:
+        # read param, grid, ghost_grid and dim on first access
+        sim._lazy = True
+        return sim
+
+    sim.param = manifest['param']
+    sim.dim = False
+    if manifest['dim']:
+        sim.dim = Dim()
+        sim.dim.__dict__.update(manifest['dim'])
+    for key in ['grid', 'ghost_grid']:
+        if not manifest[key]:
+            setattr(sim, key, False)
+            continue
+        grid = Grid()
+        grid.__dict__.update(manifest[key]['values'])
+        for name in manifest[key]['arrays']:
+            # copy-on-write, changes are not written back to the file
+            setattr(grid, name, np.load(
+                join(sim.pc_dir, 'sim_grid', manifest['arrays'],
+                     key+'.'+name+'.npy'), mmap_mode='c'))
+        setattr(sim, key, grid)
+    return sim
+
+
+def __write_arrays(pc_dir, arrays):
+    """
+    Write the arrays into pc_dir/sim_grid/<hash>, unless that exists, and
+    return the hash.
+    """
+
+    import hashlib
+    import os
+    import shutil
+    import tempfile
+    import numpy as np
+    from os.path import join, exists
+
+    digest = hashlib.sha1()
+    for key in sorted(arrays):
+        array = np.ascontiguousarray(arrays[key])
+        digest.update((key+str(array.dtype)+str(array.shape)).encode())
+        digest.update(array.tobytes())
+    name = digest.hexdigest()[:16]
+
+    target = join(pc_dir, 'sim_grid', name)
+    if exists(target): return name
+    os.makedirs(join(pc_dir, 'sim_grid'), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=join(pc_dir, 'sim_grid'), prefix='.tmp')
+    for key, array in arrays.items():
+        np.save(join(tmp_dir, key+'.npy'), array)
+    try:
+        os.rename(tmp_dir, target)
+    except OSError:
+        # written by a concurrent export
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return name
+
+
+def __remove_unused_arrays(pc_dir, name):
+    """
+    Remove the arrays in pc_dir/sim_grid other than those of name.
+    """
+
+    import os
+    import shutil
+    from os.path import join, isdir
+
+    grid_dir = join(pc_dir, 'sim_grid')
+    if not isdir(grid_dir): return
+    for entry in os.listdir(grid_dir):
+        if entry != name and not entry.startswith('.tmp'):
+            shutil.rmtree(join(grid_dir, entry), ignore_errors=True)
+
+
+def __tuples(obj):
+    """
+    Return obj with the tuples stored as {'__tuple__': [...]}, to keep them
+    apart from lists (e.g. complex parameters).
+    """
+
+    if isinstance(obj, tuple):
+        return {'__tuple__': [__tuples(value) for value in obj]}
+    if isinstance(obj, list):
+        return [__tuples(value) for value in obj]
+    if isinstance(obj, dict):
+        return {key: __tuples(value) for key, value in obj.items()}
+    return obj
+
+
+def __decode(obj):
+    """
+    Return the tuples stored as {'__tuple__': [...]}.
+    """
+
+    if '__tuple__' in obj:
+        return tuple(obj['__tuple__'])
+    return obj
+
+
+def __encode(obj):
+    """
+    Return numpy scalars and small arrays in JSON-serializable form.
+    """
+
+    import numpy as np
+
+    if isinstance(obj, np.generic): return obj.item()
+    if isinstance(obj, np.ndarray): return obj.tolist()
+    raise TypeError(repr(obj)+' is not JSON serializable')
@@ -22,6 +22,8 @@ def simulation(*args, **kwargs):
         hidden: set True to set hidden flag, default is False
         quiet:  suppress irrelevant output, default is False
         hard:   force update, default is False
+        lazy:   read param, grid, ghost_grid and dim only when first
+                accessed, default is False
 
     Properties:
         self.name:             name of
@@ -50,7 +52,8 @@ class __Simulation__(object):
     Simulation object.
     """
 
-    def __init__(self, path='.', hidden=False, hard=False, quiet=False):
+    def __init__(self, path='.', hidden=False, hard=False, quiet=False,
+                 lazy=False):
         import os
         from os.path import join, exists,split
         #from pen.intern.hash_sim import hash_sim
@@ -87,14 +90,33 @@ class __Simulation__(object):
         self.start_optionals = [ '*.pro', '*.h5']
 
         self.hidden = hidden                      # hidden is default False
-        self.param = False
-        self.grid = False
-        self.dim = False
-        self.ghost_grid = False
         self.tmp_dict = {}
-        self = self.update(hard=hard,quiet=quiet) # auto-update (read param.nml)
+        if lazy:
+            # param, grid, ghost_grid and dim are read on first access
+            self._lazy = True
+        else:
+            self.param = False
+            self.grid = False
+            self.dim = False
+            self.ghost_grid = False
+            self = self.update(hard=hard,quiet=quiet) # auto-update (read param.nml)
         # Done
 
+    def __getattr__(self, name):
+        """Read param, grid, ghost_grid and dim of a lazy simulation object
+        when one of them is first accessed."""
+        if name in ('param', 'grid', 'ghost_grid', 'dim') and \
+           self.__dict__.get('_lazy', False):
+            self._lazy = False
+            self.param = False
+            self.grid = False
+            self.dim = False
+            self.ghost_grid = False
+            self.update(quiet=True)
+            return getattr(self, name)
+        raise AttributeError("'{0}' object has no attribute '{1}'".format(
+            type(self).__name__, name))
+
     def copy(self, path_root='.', name=False, start_optionals = False,
              optionals=True, quiet=True, rename_submit_script=False,
              OVERWRITE=False):
@@ -390,7 +412,7 @@ class __Simulation__(object):
         """Update simulation object:
             if not read in:
                 - read param.nml
-                - read grid and ghost grid
+                - read ghost grid and derive grid from it
 
             Set hard=True to force update.
         """
@@ -446,13 +468,13 @@ class __Simulation__(object):
                                                    or self.ghost_grid == False):
             # read grid only if param is not False
             try:
-                print('~ Reading grid.. ')
-                self.grid = grid(datadir=self.datadir, trim=True, quiet=True)
                 print('~ Reading ghost_grid.. ')
                 self.ghost_grid = grid(datadir=self.datadir, trim=False,
                                                                      quiet=True)
                 print('~ Reading dim.. ')
                 self.dim = dim(datadir=self.datadir)
+                # the trimmed grid is the ghost grid without ghost zones
+                self.grid = self.ghost_grid.trimmed(self.dim)
                 if not quiet: print('# Updating grid and ghost_grid succesfull')
                 REEXPORT = True
                 # adding lx, dx etc to params
@@ -494,18 +516,13 @@ class __Simulation__(object):
 
 
     def export(self):
-        """Export simulation object to its root/.pc-dir"""
-        from ..io import save
+        """Export simulation object to its manifest root/pc/sim.json, with
+        the grid arrays in root/pc/sim_grid. self.tmp_dict is not saved."""
+        from .manifest import export_manifest
         if self == False:
             print('! ERROR: Simulation object is bool object and False!')
 
-        # clean self.tmp_dict
-        tmp_dict = self.tmp_dict; self.tmp_dict = {}
-
-        save(self, name='sim', folder=self.pc_dir)
-
-        # restore self.tmp_dict
-        self.tmp_dict = tmp_dict
+        export_manifest(self)
 
 
     def started(self):
@@ -682,7 +699,8 @@ class __Simulation__(object):
         from os.path import join
         with open(join(self.datadir, 'time_series.dat'), 'rb') as fh:
             first = next(fh).decode()
-            fh.seek(-1024, 2)
+            fh.seek(0, 2)
+            fh.seek(max(0, fh.tell() - 1024))
             last = fh.readlines()[-1].decode()
 
         header = [i for i in first.split('-') if not i=='' and
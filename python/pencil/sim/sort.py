@@ -5,6 +5,7 @@ def sort(simulations, sortby, only_started=False, reverse=False):
 
   Args:
     simulations:    put here a Simulations object or a list of simulations [sim1, sim2, ...]
+                    or a catalog, which is then queried
     sortby:         put here the heyword after which the sorting shall happen
     only_started:   only sort simulations that already has started
     reverse:        reverse order
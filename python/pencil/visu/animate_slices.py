@@ -9,7 +9,7 @@ def animate_slices(field='uu1',datadir='data/',proc=-1,extension='xz',format='na
      datadir --- path to data directory
      proc --- an integer giving the processor to read a slice from
      extension --- which plane of xy,xz,yz,Xz. for 2D this should be overwritten.
-     format --- endian. one of little, big, or native (default)
+     format --- unused, slices are read in the native byte order
      tmin --- start time
      tmax --- end time
      amin --- minimum value for image scaling
@@ -18,71 +18,39 @@ def animate_slices(field='uu1',datadir='data/',proc=-1,extension='xz',format='na
      wait --- pause in seconds between animation slices
     """
     
-    datadir = os.path.expanduser(datadir)
-    if proc < 0:
-        filename = datadir+'/slice_'+field+'.'+extension
-    else:
-        filename = datadir+'/proc'+str(proc)+'/slice_'+field+'.'+extension
-
-    # global dim
-    param = read_param(datadir)
-
-    dim = read_dim(datadir,proc) 
-    if dim.precision == 'D':
-        precision = 'd'
-    else:
-        precision = 'f'
-
-    # set up slice plane
-    if (extension == 'xy' or extension == 'Xy'):
-        hsize = dim.nx
-        vsize = dim.ny
-    if (extension == 'xz'):
-        hsize = dim.nx
-        vsize = dim.nz
-    if (extension == 'yz'):
-        hsize = dim.ny
-        vsize = dim.nz
-    plane = N.zeros((vsize,hsize),dtype=precision)
+    import os
+    from time import sleep
+    import matplotlib.pyplot as P
+    from ..read import slices_iter
 
-    infile = npfile(filename,endian=format)
+    datadir = os.path.expanduser(datadir)
 
     ax = P.axes()
     ax.set_xlabel('x')
     ax.set_ylabel('y')
     ax.set_ylim
 
-    image = P.imshow(plane,vmin=amin,vmax=amax)
+    image = None
 
     # for real-time image display
     manager = P.get_current_fig_manager()
     manager.show()
 
+    # frames are read one at a time
     ifirst = True
     islice = 0
-    while 1:
-        try:
-            raw_data = infile.fort_read(precision)
-        except ValueError:
-            break
-        except TypeError:
-            break
-
-        if oldfile:
-            t = raw_data[-1]
-            plane = raw_data[:-1].reshape(vsize,hsize)
-        else:
-            slice_z2pos = raw_data[-1]
-            t = raw_data[-2]
-            plane = raw_data[:-2].reshape(vsize,hsize)
-        
+    for t, plane in slices_iter(field, extension, datadir=datadir, proc=proc,
+                                old_file=oldfile, tmin=tmin, tmax=tmax):
         if transform:
-            exec('plane = plane'+transform)
+            plane = eval('plane'+transform)
 
         if (t > tmin and t < tmax):
             title = 't = %11.3e' % t
             ax.set_title(title)
-            image.set_data(plane)
+            if image is None:
+                image = P.imshow(plane,vmin=amin,vmax=amax)
+            else:
+                image.set_data(plane)
             manager.canvas.draw()
             
             if ifirst:
@@ -93,5 +61,3 @@ def animate_slices(field='uu1',datadir='data/',proc=-1,extension='xz',format='na
             islice += 1
 
             sleep(wait)
-
-    infile.close() 
@@ -13,7 +13,8 @@ The output image will be saved to directory visu/images/.
 The details of the three functions are listed as follows:
 
 1) plot_box : the main function to plot cube objects by assembling slice_xy, slice_xy2, slice_xz and slice_yz together,
-it calls read_slices first then plot.
+it calls read_slices first then plot. If no slice object is given, the
+frames are read one at a time with read.slices_iter (see plot_box_frames).
 
 Arguments:
 
@@ -76,6 +77,8 @@ def plot(
          cbar_label='', cbar_loc=1., cbar_label_pos='right', 
          #add text for time stamp
          time=0, textxy=(0,0), unit='', isd=3, fontsize=25,
+         #number of the image file, itt by default
+         frame_number=None,
         ):
 
     """
@@ -102,6 +105,8 @@ def plot(
             It is set to 2 by default, meaning the xy2 slice is located below the box by half of the height of the box.
         imageformat --- a string variable, indicating the format of the output image. Set to 'png' by default.
             It supports png, jpeg, webp, svg and pdf format.
+        color_range --- a two-tuple (min, max) of the colorbar, replacing the range of the data.
+        frame_number --- an integer used in the name of the output image instead of itt.
     """
     """
     options = Options()
@@ -133,6 +138,8 @@ def plot(
                 globals()[key+'slice']=slice_obj.__getattribute__(key).__getattribute__(field)
                 cmax = max(cmax,globals()[key+'slice'][itt].max())
                 cmin = min(cmin,globals()[key+'slice'][itt].min())
+        if color_range is not None:
+            cmin, cmax = color_range
 
         height= globals()['xzslice'][itt].shape[0]
         width = globals()['xyslice'][itt].shape[1]
@@ -304,7 +311,9 @@ def plot(
         # plot the figure
         fig = go.Figure(data=data, layout=layout)
         # set filename of the figure
-        filename = field+ '_{0:04d}'.format(itt) + "." + imageformat
+        if frame_number is None:
+            frame_number = itt
+        filename = field+ '_{0:04d}'.format(frame_number) + "." + imageformat
         # display the figure html
         # po.plot(fig, image="png", auto_open=True,
         #          image_height=500, image_width=1000, filename=filename)
@@ -314,7 +323,7 @@ def plot(
         pio.write_image(fig, figdir + filename)
 
 
-def plot_box(slice_obj,#slice_obj=pcn.read.slices()
+def plot_box(slice_obj=None,#slice_obj=pcn.read.slices()
              #acquire the slice objects
              fields=['uu1',], datadir='./data/', proc=-1, xyzplane=[],
              quiet=True, oldfile=False, 
@@ -337,6 +346,21 @@ def plot_box(slice_obj,#slice_obj=pcn.read.slices()
              timestamp=False, textxy=(0,0), unit='', isd=2,  fontsize=25,
              ):
 
+    if slice_obj is None:
+        # read the slices frame by frame instead
+        return plot_box_frames(
+             fields=fields, datadir=datadir, proc=proc, xyzplane=xyzplane,
+             quiet=quiet, oldfile=oldfile, tstart=tstart, tend=tend,
+             islice=islice, imageformat=imageformat, figdir=figdir,
+             colorscale=colorscale, norm=norm, color_range=color_range,
+             color_levels=color_levels, viewpoint=viewpoint, offset=offset,
+             margin=margin, autosize=autosize, image_dim=image_dim,
+             visxyz=visxyz, axestitle=axestitle, xyz=xyz,
+             cbar_label=cbar_label, cbar_loc=cbar_loc,
+             cbar_label_pos=cbar_label_pos, textxy=textxy, unit=unit,
+             isd=isd, fontsize=fontsize,
+             )
+
     #gd = pcn.read.grid(trim=True, quiet=True, datadir=datadir)
     ttmp=slice_obj.t[np.where(slice_obj.t<=tend)[0]]
     it=np.where(ttmp>=tstart)[0]
@@ -396,3 +420,61 @@ def plot_box(slice_obj,#slice_obj=pcn.read.slices()
              time=slice_obj.t[itt], textxy=textxy, unit=unit,
              isd=isd, fontsize=25,  
             )
+
+
+def plot_box_frames(fields=['uu1',], datadir='./data/', proc=-1, xyzplane=[],
+                    quiet=True, oldfile=False, tstart=0., tend=1e38,
+                    islice=-1, color_range=None, color_levels=None,
+                    **kwargs):
+    """
+    As plot_box, but reading the slices with read.slices_iter, so that
+    only one frame of each surface is held in memory. With
+    color_levels='common' the frames are read twice, first to find the
+    color range of each field.
+    """
+
+    from .. import read
+
+    class Foo(object):
+        pass
+
+    if len(xyzplane)==0:
+        xyzplane = ['xy', 'xy2', 'xz', 'yz']
+    if len(xyzplane)<4:
+        raise ValueError("xyzplane: rvid_box requires at least 4 surfaces.")
+    if islice == -1:
+        iter_list = None
+    else:
+        iter_list = [islice]
+
+    def frames(field):
+        streams = [read.slices_iter(field, key, datadir=datadir, proc=proc,
+                                    old_file=oldfile, iter_list=iter_list,
+                                    tmin=tstart, tmax=tend, frame_index=True)
+                   for key in xyzplane]
+        for planes in zip(*streams):
+            frame = Foo()
+            # Number the frames by their index in the slice files, as
+            # plot_box does.
+            frame.index = planes[0][0]
+            frame.t = np.array([planes[0][1]])
+            for key, (it, t, plane) in zip(xyzplane, planes):
+                surface = Foo()
+                setattr(surface, field, plane[np.newaxis])
+                setattr(frame, key, surface)
+            yield frame
+
+    for field in fields:
+        field_range = color_range
+        if color_levels=='common' and color_range is None:
+            cmin,cmax=1e38,-1e38
+            for frame in frames(field):
+                for key in xyzplane:
+                    plane = getattr(getattr(frame, key), field)
+                    cmax = max(cmax,plane.max())
+                    cmin = min(cmin,plane.min())
+            field_range = (cmin, cmax)
+        for frame in frames(field):
+            plot(frame, [field,], xyzplane, 0, [0,], quiet=quiet,
+                 color_range=field_range, color_levels=color_levels,
+                 time=frame.t[0], frame_number=frame.index, **kwargs)
@@ -0,0 +1,45 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-   vim: set fileencoding=utf-8 :
+
+"""Read a multi-processor var.dat serially and with threads."""
+
+import os
+import sys
+
+# Set up Python load path and configure a matplotlib backend that does not
+# need X11. This needs to happen before importing the pencil module.
+sys.path.append('../python')
+import matplotlib
+matplotlib.use('agg')
+import pencil as pc
+
+input_dir = 'input'
+
+
+def main(args):
+    # 2x2 processors, whose right ghost zones hold stale values.
+    datadir = os.path.join(input_dir, 'multi-proc-1')
+    serial = read_var(datadir)
+    threaded = [read_var(datadir, n_workers=n_workers)
+                for n_workers in [2, 4, 4, 4]]
+    write_summary('test2.out', serial, threaded)
+
+
+def read_var(datadir, n_workers=1):
+    return pc.read.var(datadir=datadir, quiet=True, n_workers=n_workers)
+
+
+def write_summary(filename, serial, threaded):
+    outputdir = os.path.dirname(sys.argv[0])
+    output = open(os.path.join(outputdir, filename), 'w')
+    for i, var in enumerate(threaded):
+        output.write('differing_f(%d): %d\n' % (i, (var.f != serial.f).sum()))
+        for coord in 'x', 'y', 'z':
+            output.write('differing_%s(%d): %d\n' % (
+                coord, i, (getattr(var, coord) != getattr(serial, coord)).sum()))
+        output.write('\n')
+    output.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-   vim: set fileencoding=utf-8 :
+
+"""Follow a time series which is appended to and rewritten."""
+
+import os
+import shutil
+import sys
+import tempfile
+
+# Set up Python load path and configure a matplotlib backend that does not
+# need X11. This needs to happen before importing the pencil module.
+sys.path.append('../python')
+import matplotlib
+matplotlib.use('agg')
+import pencil as pc
+
+input_dir = 'input'
+
+
+def main(args):
+    datadir = tempfile.mkdtemp()
+    try:
+        results = follow_ts(os.path.join(input_dir, 'serial-1'), datadir)
+    finally:
+        shutil.rmtree(datadir)
+    write_summary('test2.out', results)
+
+
+def follow_ts(sourcedir, datadir, filename='time-series-1.dat'):
+    lines = open(os.path.join(sourcedir, filename)).readlines()
+    file_name = os.path.join(datadir, filename)
+    results = []
+
+    # Read the header and the first three lines.
+    write_lines(file_name, lines[:4])
+    ts = pc.read.ts(datadir=datadir, file_name=filename, quiet=True,
+                    follow=True)
+    results.append(('rows_read', ts.t.size))
+
+    # Append the last line.
+    write_lines(file_name, lines)
+    results.append(('refresh_append', ts.refresh()))
+    results.append(('rows_append', ts.t.size))
+
+    # A restart rewrites the file with fewer lines.
+    write_lines(file_name, lines[:1] + lines[2:3])
+    results.append(('refresh_rewrite', ts.refresh()))
+    results.append(('rows_rewrite', ts.t.size))
+    results.append(('t_rewrite', ts.t[0]))
+
+    results.append(('refresh_unchanged', ts.refresh()))
+    return results
+
+
+def write_lines(file_name, lines):
+    with open(file_name, 'w') as output:
+        output.writelines(lines)
+
+
+def write_summary(filename, results):
+    outputdir = os.path.dirname(sys.argv[0])
+    output = open(os.path.join(outputdir, filename), 'w')
+    for key, value in results:
+        output.write('%s: %g\n' % (key, value))
+    output.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])